@@ -1,42 +1,106 @@
 import os
+import tempfile
 from datetime import datetime
 import random
-from azure.storage.blob import BlobServiceClient
+from azure.storage.blob import BlobServiceClient, ContentSettings
 from azure.core.exceptions import ResourceNotFoundError
+from sound_manifest import describe_sound, record_sound_file, sound_metadata
+from util.transcode_audio import transcode_recording
 
 class BirdSoundStorage:
-    def __init__(self):
+    def __init__(self, db=None):
         self.connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
         self.container_name = os.getenv("AZURE_STORAGE_CONTAINER_NAME", "bird-sounds")
+        # The untouched recordings and their transcoding sidecars, kept out of the folders the app plays from
+        self.originals_container_name = os.getenv("AZURE_STORAGE_ORIGINALS_CONTAINER_NAME",
+                                                  f"{self.container_name}-originals")
         self.blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
-    
+        # With a database, every upload goes into the sound manifest; see sound_manifest.py
+        self.db = db
+
     def create_container_if_not_exists(self):
-        try:    
-            container_client = self.blob_service_client.get_container_client(self.container_name)
-            container_client.get_container_properties()
-        except ResourceNotFoundError:
-            self.blob_service_client.create_container(self.container_name)
-            print(f"Created container: {self.container_name}")
-
-    def upload_sound_file(self, file_path, scientific_name, recording_id=None):
-        try:
-            # Format: bird-sounds/scientific_name/timestamp_id.mp3
-            folder_path = scientific_name.lower().replace(' ', '_')
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            blob_name = f"{folder_path}/{timestamp}_{random.randint(1000, 9999)}.mp3"
-            
-            if recording_id:
-                blob_name = f"{folder_path}/{recording_id}.mp3"
-            
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.container_name,
-                blob=blob_name
+        for container_name in (self.container_name, self.originals_container_name):
+            try:
+                container_client = self.blob_service_client.get_container_client(container_name)
+                container_client.get_container_properties()
+            except ResourceNotFoundError:
+                self.blob_service_client.create_container(container_name)
+                print(f"Created container: {container_name}")
+
+    def _blob_name(self, scientific_name, recording_id, extension=".mp3"):
+        # Format: bird-sounds/scientific_name/timestamp_id.mp3
+        folder_path = scientific_name.lower().replace(' ', '_')
+        if recording_id:
+            return f"{folder_path}/{recording_id}{extension}"
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"{folder_path}/{timestamp}_{random.randint(1000, 9999)}{extension}"
+
+    def _publish(self, file_path, blob_name, metadata=None):
+        """Upload a file the app plays, and record it in the sound manifest."""
+        blob_client = self.blob_service_client.get_blob_client(
+            container=self.container_name,
+            blob=blob_name
+        )
+
+        with open(file_path, "rb") as data:
+            size, duration, sha256 = describe_sound(data)
+            uploaded = blob_client.upload_blob(
+                data,
+                content_settings=ContentSettings(content_type="audio/mpeg"),
+                metadata={**(metadata or {}), **sound_metadata(duration, sha256)}
             )
+        if self.db is not None:
+            record_sound_file(self.db, blob_client.url, size, duration, sha256, uploaded["etag"])
+        return blob_client.url
+
+    def upload_sound_file(self, file_path, scientific_name, recording_id=None, mobile=True, transcoded=None):
+        """Upload a recording and return the URL the app plays it from.
 
-            with open(file_path, "rb") as data:
-                blob_client.upload_blob(data)
-            return blob_client.url
+        By default that is the mobile variant from util/transcode_audio.py,
+        or ``transcoded`` where transcode_recordings already made it, and the
+        original goes to the originals container. ``mobile=False`` uploads
+        the file as it is, and so does a recording that can't be transcoded
+        (no ffmpeg, or a file it can't read).
+        """
+        try:
+            if mobile:
+                with tempfile.TemporaryDirectory() as out_dir:
+                    if transcoded is None:
+                        try:
+                            transcoded = transcode_recording(file_path, out_dir)
+                        except Exception as e:
+                            print(f"Warning: could not transcode {file_path}, uploading the original: {e}")
+                    if transcoded is not None:
+                        return self.upload_transcoded(transcoded, scientific_name, recording_id)
+            return self._publish(file_path, self._blob_name(scientific_name, recording_id))
 
         except Exception as e:
             print(f"Error uploading file {file_path}: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def upload_transcoded(self, result, scientific_name, recording_id=None):
+        """Publish a transcode_recording result: the variant for the app, the original and sidecar beside it."""
+        try:
+            blob_name = self._blob_name(scientific_name, recording_id)
+            stem = os.path.splitext(blob_name)[0]
+            original_path = result["original"]["path"]
+            originals = self.blob_service_client.get_container_client(self.originals_container_name)
+
+            with open(original_path, "rb") as data:
+                originals.upload_blob(f"{stem}{os.path.splitext(original_path)[1] or '.mp3'}", data,
+                                      content_settings=ContentSettings(content_type="audio/mpeg"),
+                                      metadata={"sha256": result["original"]["sha256"]})
+            with open(result["sidecar_path"], "rb") as data:
+                originals.upload_blob(f"{stem}.json", data,
+                                      content_settings=ContentSettings(content_type="application/json"))
+
+            loudness = result["loudness"]["input_lufs"]
+            return self._publish(result["path"], blob_name, {
+                "source_sha256": result["original"]["sha256"],
+                "source_bytes": str(result["original"]["bytes"]),
+                **({"source_lufs": f"{loudness:.1f}"} if loudness is not None else {}),
+            })
+
+        except Exception as e:
+            print(f"Error uploading transcoded file {result.get('path')}: {e}")
+            return None
@@ -1,32 +1,6 @@
 from database_connection import DatabaseConnection
 
-def create_bird_observations_table(db, reset_table=False):
-    try:
-        if reset_table:
-            db.cursor.execute("DROP TABLE IF EXISTS bird_observations")
-        
-        db.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS bird_observations (
-            id SERIAL PRIMARY KEY,
-            bird_name VARCHAR(255) NOT NULL,
-            scientific_name VARCHAR(255),
-            sound_directory TEXT,
-            latitude DECIMAL(10, 7) NOT NULL,
-            longitude DECIMAL(10, 7) NOT NULL,
-            observation_date DATE NOT NULL,
-            observation_time TIME NOT NULL,
-            observer_id INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            quantity INTEGER DEFAULT 1,
-            is_test_data BOOLEAN DEFAULT FALSE,
-            test_batch_id VARCHAR(50) NULL
-        )
-        """)
-        db.commit()
-        print("Table created successfully")
-    except Exception as e:
-        print(f"Error creating table: {e}")
-        raise
+# The schema itself lives in DatabaseScripts/migrations and is applied by migrate.py
 
 def get_birds_from_database(db):
     """Get all birds from the birds table in the database"""
@@ -41,4 +15,39 @@ def get_birds_from_database(db):
         return birds
     except Exception as e:
         print(f"Error fetching birds from database: {e}")
-        return birds
\ No newline at end of file
+        return birds
+
+
+# Web Mercator tile levels the cluster aggregates are kept for; migration
+# 0002's trigger and main.py's CLUSTER_ZOOM_LEVELS must list the same levels
+CLUSTER_MIN_ZOOM, CLUSTER_MAX_ZOOM, CLUSTER_ZOOM_STEP = 2, 16, 2
+
+
+def rebuild_observation_clusters(db):
+    """Recompute every cluster aggregate from bird_observations, e.g. after a bulk load"""
+    try:
+        db.cursor.execute("LOCK TABLE observation_clusters IN EXCLUSIVE MODE")
+        db.cursor.execute("DELETE FROM observation_clusters")
+        db.cursor.execute(f"""
+        INSERT INTO observation_clusters (zoom, cell_x, cell_y, observation_count, latitude_sum, longitude_sum, species)
+        SELECT zoom, cell_x, cell_y, SUM(n), SUM(lat_sum), SUM(lon_sum), jsonb_object_agg(species_key, n)
+        FROM (
+            SELECT levels.zoom,
+                   observation_cell_x(o.longitude::float8, levels.zoom) AS cell_x,
+                   observation_cell_y(o.latitude::float8, levels.zoom) AS cell_y,
+                   COALESCE(o.scientific_name, 'unknown') AS species_key,
+                   COUNT(*) AS n,
+                   SUM(o.latitude::float8) AS lat_sum,
+                   SUM(o.longitude::float8) AS lon_sum
+            FROM bird_observations o
+            CROSS JOIN generate_series({CLUSTER_MIN_ZOOM}, {CLUSTER_MAX_ZOOM}, {CLUSTER_ZOOM_STEP}) AS levels(zoom)
+            GROUP BY 1, 2, 3, 4
+        ) per_species
+        GROUP BY zoom, cell_x, cell_y
+        """)
+        db.commit()
+        print("Observation clusters rebuilt successfully")
+    except Exception as e:
+        print(f"Error rebuilding observation clusters: {e}")
+        db.conn.rollback()
+        raise
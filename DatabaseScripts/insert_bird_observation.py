@@ -1,3 +1,4 @@
+from psycopg2.extras import execute_values
 from database_connection import DatabaseConnection
 from .util import BirdObservation
 
@@ -12,12 +13,16 @@ def insert_multiple_bird_observations(db, observations):
     try:
         tuples = [obs.to_tuple() for obs in observations]  # Convert objects to tuples
 
-        db.cursor.executemany("""
+        # execute_values sends the rows as multi-row INSERTs instead of one round trip per row.
+        # No conflict target: the unique source_id indexes are per partition (see migration 0005)
+        execute_values(db.cursor, """
             INSERT INTO bird_observations (
                 bird_name, scientific_name, sound_directory, latitude, longitude, 
-                observation_date, observation_time, observer_id, quantity, is_test_data, test_batch_id
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, tuples)
+                observation_date, observation_time, observer_id, quantity, is_test_data, test_batch_id,
+                source_id
+            ) VALUES %s
+            ON CONFLICT DO NOTHING
+        """, tuples, page_size=1000)
 
         db.commit()
         print(f"Inserted {len(observations)} bird observations successfully!")
@@ -2,8 +2,10 @@ import os
 from dotenv import load_dotenv
 from database_connection import DatabaseConnection
 from bird_sound_storage import BirdSoundStorage
-from database_operations import create_bird_observations_table
+from migrate import migrate
+from partition_maintenance import ensure_month_partitions
 from populate_sample_data import populate_sample_data
+from sound_manifest import refresh_sound_manifest
 
 def main():
     load_dotenv()
@@ -12,7 +14,7 @@ def main():
     
     sound_storage = None
     if os.getenv("AZURE_STORAGE_CONNECTION_STRING"):
-        sound_storage = BirdSoundStorage()
+        sound_storage = BirdSoundStorage(db)
         sound_storage.create_container_if_not_exists()
     else:
         print("Warning: Azure Storage connection string not found. Sounds will not be uploaded.")
@@ -45,8 +47,11 @@ def main():
             print("Created 'birds' table, but it's empty. Please add birds before running this script.")
             return
         
-        # Create or update the bird_observations table
-        create_bird_observations_table(db)
+        # Create or update bird_observations and everything around it; see migrate.py
+        migrate(db.conn)
+        ensure_month_partitions(db)
+        if sound_storage:
+            refresh_sound_manifest(db, sound_storage)
         
         # Populate sample data using birds from the database
         populate_sample_data(db, sound_storage, test_batch_count=100)
@@ -0,0 +1,282 @@
+"""Apply the SQL migrations in DatabaseScripts/migrations in order.
+
+Each file is named NNNN_description.sql and runs once; schema_migrations
+records its version, checksum and when it was applied. A file runs in a
+single transaction unless its first line is ``-- migrate: no-transaction``,
+which statements like CREATE INDEX CONCURRENTLY need; those files run
+statement by statement and must be safe to run again after a failure
+(IF NOT EXISTS and the like).
+
+Every statement waits at most ``lock_timeout`` for its locks, so a migration
+never queues the API's queries behind it for long, and is retried with
+backoff when it times out.
+
+    python DatabaseScripts/migrate.py            # apply everything pending
+    python DatabaseScripts/migrate.py status
+    python DatabaseScripts/migrate.py up --target 2
+"""
+import os
+import re
+import sys
+import time
+import random
+import hashlib
+import argparse
+
+import psycopg2
+from psycopg2 import errors
+from dotenv import load_dotenv
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+# Held while migrating, so two deploys starting at once apply each file once
+ADVISORY_LOCK_ID = 7_302_611
+
+_FILE_NAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+_NO_TRANSACTION = re.compile(r"\A\s*--\s*migrate:\s*no-transaction\b", re.IGNORECASE)
+_CONCURRENT_INDEX = re.compile(
+    r"\bCREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE)
+_RETRYABLE = (errors.LockNotAvailable, errors.DeadlockDetected)
+
+
+class MigrationError(Exception):
+    """Raised when the migrations on disk don't match what the database recorded."""
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode()).hexdigest()
+        self.transactional = not _NO_TRANSACTION.match(self.sql)
+
+    def __repr__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    migrations = []
+    for file_name in sorted(os.listdir(directory)):
+        match = _FILE_NAME.match(file_name)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, file_name)))
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise MigrationError(f"Two migrations share a version number in {directory}")
+    return migrations
+
+
+def split_statements(sql):
+    """Split a script on semicolons outside quotes, comments and $$ bodies."""
+    statements, start, i, length = [], 0, 0, len(sql)
+    while i < length:
+        char = sql[i]
+        if char == "-" and sql.startswith("--", i):
+            i = sql.find("\n", i)
+            i = length if i == -1 else i
+        elif char == "/" and sql.startswith("/*", i):
+            i = sql.find("*/", i + 2)
+            i = length if i == -1 else i + 1
+        elif char in ("'", '"'):
+            i = sql.find(char, i + 1)
+            i = length if i == -1 else i
+            # A doubled quote is an escaped one; the loop picks the string up again
+        elif char == "$":
+            tag = re.match(r"\$\w*\$", sql[i:])
+            if tag:
+                end = sql.find(tag.group(0), i + len(tag.group(0)))
+                i = length if end == -1 else end + len(tag.group(0)) - 1
+        elif char == ";":
+            statements.append(sql[start:i])
+            start = i + 1
+        i += 1
+    statements.append(sql[start:])
+    # Drop what is only whitespace and comments
+    return [s.strip() for s in statements
+            if re.sub(r"--[^\n]*|/\*.*?\*/", "", s, flags=re.DOTALL).strip()]
+
+
+def _ensure_migrations_table(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            duration_ms INTEGER
+        )
+    """)
+    cursor.close()
+
+
+def applied_migrations(conn):
+    """{version: checksum} of the migrations the database has recorded."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+    if not cursor.fetchone()[0]:
+        cursor.close()
+        return {}
+    cursor.execute("SELECT version, checksum FROM schema_migrations")
+    applied = dict(cursor.fetchall())
+    cursor.close()
+    return applied
+
+
+def _with_retries(run, description, retries):
+    for attempt in range(retries + 1):
+        try:
+            return run()
+        except _RETRYABLE as e:
+            if attempt == retries:
+                raise
+            delay = min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+            print(f"{description} couldn't get its locks ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _drop_invalid_index(cursor, statement):
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind, which
+    # IF NOT EXISTS would then happily keep
+    match = _CONCURRENT_INDEX.search(statement)
+    if not match:
+        return
+    cursor.execute("""
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace AND NOT i.indisvalid
+    """, (match.group(1),))
+    if cursor.fetchone():
+        print(f"Dropping invalid index {match.group(1)} left by an earlier attempt")
+        cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{match.group(1)}"')
+
+
+def _record(cursor, migration, started):
+    cursor.execute("""
+        INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (%s, %s, %s, %s)
+    """, (migration.version, migration.name, migration.checksum, round((time.monotonic() - started) * 1000)))
+
+
+def _apply_in_transaction(conn, migration, lock_timeout, retries):
+    def attempt():
+        started = time.monotonic()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SET LOCAL lock_timeout = %s", (lock_timeout,))
+            cursor.execute(migration.sql)
+            _record(cursor, migration, started)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    conn.autocommit = False
+    _with_retries(attempt, repr(migration), retries)
+
+
+def _apply_statements(conn, migration, lock_timeout, retries):
+    started = time.monotonic()
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET lock_timeout = %s", (lock_timeout,))
+        for number, statement in enumerate(split_statements(migration.sql), 1):
+            def attempt():
+                _drop_invalid_index(cursor, statement)
+                cursor.execute(statement)
+            _with_retries(attempt, f"{migration!r} statement {number}", retries)
+        _record(cursor, migration, started)
+    finally:
+        cursor.execute("RESET lock_timeout")
+        cursor.close()
+        conn.autocommit = False
+
+
+def migrate(conn, target=None, lock_timeout="3s", retries=10, directory=MIGRATIONS_DIR):
+    """Apply the pending migrations up to ``target`` (all by default); returns the ones applied.
+
+    Commits whatever transaction the caller left open on ``conn`` first.
+    """
+    migrations = load_migrations(directory)
+    conn.commit()
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute("SET statement_timeout = 0")
+    cursor.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_ID,))
+    applied_now = []
+    try:
+        _ensure_migrations_table(conn)
+        applied = applied_migrations(conn)
+        for migration in migrations:
+            if migration.version in applied and applied[migration.version] != migration.checksum:
+                raise MigrationError(f"{migration!r} was changed after it was applied; add a new migration instead")
+        for migration in migrations:
+            if migration.version in applied or (target is not None and migration.version > target):
+                continue
+            print(f"Applying {migration!r}{'' if migration.transactional else ' (no transaction)'}")
+            started = time.monotonic()
+            if migration.transactional:
+                _apply_in_transaction(conn, migration, lock_timeout, retries)
+            else:
+                _apply_statements(conn, migration, lock_timeout, retries)
+            print(f"Applied {migration!r} in {time.monotonic() - started:.1f}s")
+            applied_now.append(migration)
+    finally:
+        conn.autocommit = True
+        cursor.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_ID,))
+        cursor.execute("RESET statement_timeout")
+        cursor.close()
+        conn.autocommit = False
+    if not applied_now:
+        print("Database schema is up to date")
+    return applied_now
+
+
+def print_status(conn, directory=MIGRATIONS_DIR):
+    applied = applied_migrations(conn)
+    for migration in load_migrations(directory):
+        if migration.version not in applied:
+            state = "pending"
+        elif applied[migration.version] != migration.checksum:
+            state = "changed since applied"
+        else:
+            state = "applied"
+        print(f"{migration!r:<40} {state}")
+
+
+def _connect():
+    # DATABASE_URL is what the API deploys with; DatabaseConnection reads DB_HOST etc.
+    if os.getenv("DATABASE_URL"):
+        return psycopg2.connect(os.getenv("DATABASE_URL"))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "connection_and_oprations"))
+    from database_connection import DatabaseConnection
+    return DatabaseConnection().create_connection().conn
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", choices=("up", "status"), default="up")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    parser.add_argument("--lock-timeout", default=os.getenv("MIGRATION_LOCK_TIMEOUT", "3s"),
+                        help="longest a statement waits for a lock before it is retried")
+    parser.add_argument("--retries", type=int, default=int(os.getenv("MIGRATION_RETRIES", 10)))
+    args = parser.parse_args()
+
+    conn = _connect()
+    try:
+        if args.command == "status":
+            print_status(conn)
+        else:
+            migrate(conn, args.target, args.lock_timeout, args.retries)
+    except MigrationError as e:
+        sys.exit(f"Migration failed: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
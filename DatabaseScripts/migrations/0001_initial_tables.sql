@@ -0,0 +1,90 @@
+-- Tables as the create_* functions in database_operations.py used to make
+-- them; IF NOT EXISTS, so databases set up by those functions pass through.
+
+CREATE TABLE IF NOT EXISTS birds (
+    id SERIAL PRIMARY KEY,
+    common_name VARCHAR(255),
+    scientific_name VARCHAR(255),
+    danish_name VARCHAR(255),
+    region VARCHAR(255),
+    last_observed TIMESTAMP,
+    is_common BOOLEAN DEFAULT FALSE,
+    UNIQUE (scientific_name, region)
+);
+
+CREATE TABLE IF NOT EXISTS bird_observations (
+    id SERIAL PRIMARY KEY,
+    bird_name VARCHAR(255) NOT NULL,
+    scientific_name VARCHAR(255),
+    sound_directory TEXT,
+    latitude DECIMAL(10, 7) NOT NULL,
+    longitude DECIMAL(10, 7) NOT NULL,
+    observation_date DATE NOT NULL,
+    observation_time TIME NOT NULL,
+    observer_id INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    quantity INTEGER DEFAULT 1,
+    is_test_data BOOLEAN DEFAULT FALSE,
+    test_batch_id VARCHAR(50) NULL
+);
+
+-- What batch ingestion and the eBird importer deduplicate on; the unique
+-- index comes in 0003
+ALTER TABLE bird_observations ADD COLUMN IF NOT EXISTS source_id VARCHAR(255);
+
+-- Tombstone log that /observations/sync reads edits and deletions from
+CREATE TABLE IF NOT EXISTS observation_changes (
+    change_id BIGSERIAL PRIMARY KEY,
+    observation_id INTEGER NOT NULL,
+    change_type VARCHAR(10) NOT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per-region watermarks the API's eBird importer resumes from
+CREATE TABLE IF NOT EXISTS ebird_import_state (
+    region_code VARCHAR(20) PRIMARY KEY,
+    last_observed_at TIMESTAMP,
+    last_run_at TIMESTAMP,
+    imported_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- Per-zoom-level cluster aggregates behind /observations/clusters
+CREATE TABLE IF NOT EXISTS observation_clusters (
+    zoom SMALLINT NOT NULL,
+    cell_x INTEGER NOT NULL,
+    cell_y INTEGER NOT NULL,
+    observation_count INTEGER NOT NULL DEFAULT 0,
+    latitude_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    longitude_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    species JSONB NOT NULL DEFAULT '{}',
+    PRIMARY KEY (zoom, cell_x, cell_y)
+);
+
+-- Season and day-of-year filters compare month * 100 + day, which unlike
+-- the day of the year doesn't shift by one after February in leap years
+CREATE OR REPLACE FUNCTION observation_month_day(d DATE) RETURNS INTEGER AS $$
+    SELECT (EXTRACT(MONTH FROM d) * 100 + EXTRACT(DAY FROM d))::INTEGER
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Slippy map tile coordinates, clamped to the Web Mercator latitude range
+CREATE OR REPLACE FUNCTION observation_cell_x(lon DOUBLE PRECISION, zoom INTEGER) RETURNS INTEGER AS $$
+    SELECT LEAST(GREATEST(floor((lon + 180) / 360 * (2 ^ zoom))::INTEGER, 0), (2 ^ zoom)::INTEGER - 1)
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION observation_cell_y(lat DOUBLE PRECISION, zoom INTEGER) RETURNS INTEGER AS $$
+    SELECT LEAST(GREATEST(floor(
+        (1 - ln(tan(radians(LEAST(GREATEST(lat, -85.05112878), 85.05112878)))
+                + 1 / cos(radians(LEAST(GREATEST(lat, -85.05112878), 85.05112878)))) / pi()) / 2 * (2 ^ zoom)
+    )::INTEGER, 0), (2 ^ zoom)::INTEGER - 1)
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Adds two species -> count maps, dropping species whose count reaches zero
+CREATE OR REPLACE FUNCTION merge_species_counts(a JSONB, b JSONB) RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_object_agg(key, total), '{}')
+    FROM (
+        SELECT key, SUM(value::INTEGER) AS total
+        FROM (SELECT * FROM jsonb_each_text(a) UNION ALL SELECT * FROM jsonb_each_text(b)) counts
+        GROUP BY key
+        HAVING SUM(value::INTEGER) > 0
+    ) totals
+$$ LANGUAGE sql IMMUTABLE;
@@ -0,0 +1,158 @@
+-- Change log, NOTIFY and cluster triggers. Creating a trigger takes a short
+-- SHARE ROW EXCLUSIVE lock on the table, which migrate.py waits for with
+-- lock_timeout and retries.
+
+CREATE OR REPLACE FUNCTION log_observation_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO observation_changes (observation_id, change_type) VALUES (OLD.id, 'deleted');
+        RETURN OLD;
+    END IF;
+    INSERT INTO observation_changes (observation_id, change_type) VALUES (NEW.id, 'updated');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS bird_observations_change_log ON bird_observations;
+CREATE TRIGGER bird_observations_change_log
+AFTER UPDATE OR DELETE ON bird_observations
+FOR EACH ROW EXECUTE FUNCTION log_observation_change();
+
+-- NOTIFY the API on the table_changes channel whenever birds or
+-- bird_observations change; statement level, so a bulk insert sends one
+CREATE OR REPLACE FUNCTION notify_table_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('table_changes', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS birds_notify_change ON birds;
+CREATE TRIGGER birds_notify_change
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON birds
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change();
+
+DROP TRIGGER IF EXISTS bird_observations_notify_change ON bird_observations;
+CREATE TRIGGER bird_observations_notify_change
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON bird_observations
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change();
+
+-- Every inserted observation as JSON on observation_inserts, for the
+-- /observations/live stream. NOTIFY payloads are limited to 8000 bytes; an
+-- oversized row is sent with just the fields the stream filters on
+CREATE OR REPLACE FUNCTION notify_observation_inserts() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('observation_inserts', CASE
+        WHEN octet_length(row_to_json(n)::text) < 7900 THEN row_to_json(n)::text
+        ELSE json_build_object('id', n.id, 'created_at', n.created_at, 'scientific_name', n.scientific_name,
+                               'latitude', n.latitude, 'longitude', n.longitude, 'truncated', true)::text
+    END)
+    FROM new_rows n;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS bird_observations_notify_insert ON bird_observations;
+CREATE TRIGGER bird_observations_notify_insert
+AFTER INSERT ON bird_observations
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_observation_inserts();
+
+-- Keeps observation_clusters up to date. Statement level with transition
+-- tables, so a batch insert updates each affected cell once. The zoom levels
+-- (2 to 16 in steps of 2) must match CLUSTER_* in database_operations.py and
+-- CLUSTER_ZOOM_LEVELS in main.py
+CREATE OR REPLACE FUNCTION update_observation_clusters() RETURNS trigger AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changes := 'SELECT latitude, longitude, scientific_name, 1 AS delta FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        changes := 'SELECT latitude, longitude, scientific_name, -1 AS delta FROM old_rows';
+    ELSE
+        changes := 'SELECT o.latitude, o.longitude, o.scientific_name, -1 AS delta
+                    FROM old_rows o JOIN new_rows n ON n.id = o.id
+                    WHERE (o.latitude, o.longitude, o.scientific_name)
+                          IS DISTINCT FROM (n.latitude, n.longitude, n.scientific_name)
+                    UNION ALL
+                    SELECT n.latitude, n.longitude, n.scientific_name, 1
+                    FROM old_rows o JOIN new_rows n ON n.id = o.id
+                    WHERE (o.latitude, o.longitude, o.scientific_name)
+                          IS DISTINCT FROM (n.latitude, n.longitude, n.scientific_name)';
+    END IF;
+
+    EXECUTE format($query$
+        INSERT INTO observation_clusters AS c
+            (zoom, cell_x, cell_y, observation_count, latitude_sum, longitude_sum, species)
+        SELECT zoom, cell_x, cell_y, SUM(n), SUM(lat_sum), SUM(lon_sum), jsonb_object_agg(species_key, n)
+        FROM (
+            SELECT levels.zoom,
+                   observation_cell_x(ch.longitude::float8, levels.zoom) AS cell_x,
+                   observation_cell_y(ch.latitude::float8, levels.zoom) AS cell_y,
+                   COALESCE(ch.scientific_name, 'unknown') AS species_key,
+                   SUM(ch.delta) AS n,
+                   SUM(ch.latitude::float8 * ch.delta) AS lat_sum,
+                   SUM(ch.longitude::float8 * ch.delta) AS lon_sum
+            FROM (%s) ch
+            CROSS JOIN generate_series(2, 16, 2) AS levels(zoom)
+            GROUP BY 1, 2, 3, 4
+        ) per_species
+        GROUP BY zoom, cell_x, cell_y
+        ON CONFLICT (zoom, cell_x, cell_y) DO UPDATE SET
+            observation_count = c.observation_count + EXCLUDED.observation_count,
+            latitude_sum = c.latitude_sum + EXCLUDED.latitude_sum,
+            longitude_sum = c.longitude_sum + EXCLUDED.longitude_sum,
+            species = merge_species_counts(c.species, EXCLUDED.species)
+    $query$, changes);
+
+    IF TG_OP <> 'INSERT' THEN
+        DELETE FROM observation_clusters WHERE observation_count <= 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The earlier row-level version
+DROP TRIGGER IF EXISTS bird_observations_update_clusters ON bird_observations;
+DROP FUNCTION IF EXISTS apply_observation_cluster_delta(DOUBLE PRECISION, DOUBLE PRECISION, TEXT, INTEGER);
+
+-- A trigger with transition tables can only have one event
+DROP TRIGGER IF EXISTS bird_observations_clusters_insert ON bird_observations;
+CREATE TRIGGER bird_observations_clusters_insert
+AFTER INSERT ON bird_observations
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_observation_clusters();
+
+DROP TRIGGER IF EXISTS bird_observations_clusters_update ON bird_observations;
+CREATE TRIGGER bird_observations_clusters_update
+AFTER UPDATE ON bird_observations
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_observation_clusters();
+
+DROP TRIGGER IF EXISTS bird_observations_clusters_delete ON bird_observations;
+CREATE TRIGGER bird_observations_clusters_delete
+AFTER DELETE ON bird_observations
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_observation_clusters();
+
+-- Fill the aggregates for observations that predate the triggers. Empty
+-- clusters next to existing observations means they were never built; the
+-- lock keeps inserts from slipping in between the check and the fill
+LOCK TABLE observation_clusters IN EXCLUSIVE MODE;
+INSERT INTO observation_clusters (zoom, cell_x, cell_y, observation_count, latitude_sum, longitude_sum, species)
+SELECT zoom, cell_x, cell_y, SUM(n), SUM(lat_sum), SUM(lon_sum), jsonb_object_agg(species_key, n)
+FROM (
+    SELECT levels.zoom,
+           observation_cell_x(o.longitude::float8, levels.zoom) AS cell_x,
+           observation_cell_y(o.latitude::float8, levels.zoom) AS cell_y,
+           COALESCE(o.scientific_name, 'unknown') AS species_key,
+           COUNT(*) AS n,
+           SUM(o.latitude::float8) AS lat_sum,
+           SUM(o.longitude::float8) AS lon_sum
+    FROM bird_observations o
+    CROSS JOIN generate_series(2, 16, 2) AS levels(zoom)
+    WHERE NOT EXISTS (SELECT 1 FROM observation_clusters)
+    GROUP BY 1, 2, 3, 4
+) per_species
+GROUP BY zoom, cell_x, cell_y;
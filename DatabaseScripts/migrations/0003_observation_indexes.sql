@@ -0,0 +1,24 @@
+-- migrate: no-transaction
+-- The indexes the hot queries need, built CONCURRENTLY so readers and
+-- writers carry on meanwhile. That can't run inside a transaction, so each
+-- statement commits on its own; migrate.py drops an index a failed build
+-- left INVALID before retrying it.
+
+-- Keyset pagination and after_timestamp on /observations walk (created_at, id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bird_observations_created_at_id
+ON bird_observations (created_at, id);
+
+-- GiST index on a point(lon, lat) expression, used by /observations/nearby.
+-- The expression must match the one in the query exactly for the planner to use it.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bird_observations_location
+ON bird_observations USING gist (point(longitude::float8, latitude::float8));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bird_observations_month_day_time
+ON bird_observations (observation_month_day(observation_date), observation_time);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bird_observations_species_date
+ON bird_observations (scientific_name, observation_date);
+
+-- NULLs never conflict, so observations without a source_id are always inserted
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_bird_observations_source_id
+ON bird_observations (source_id);
@@ -0,0 +1,10 @@
+-- VARCHAR(n) to TEXT drops length limits nothing relies on. The types are
+-- binary compatible, so Postgres neither rewrites the table nor rebuilds its
+-- indexes; the ACCESS EXCLUSIVE lock is held for milliseconds, once
+-- lock_timeout lets the migration get it without queueing readers behind it.
+
+ALTER TABLE bird_observations
+    ALTER COLUMN bird_name TYPE TEXT,
+    ALTER COLUMN scientific_name TYPE TEXT,
+    ALTER COLUMN test_batch_id TYPE TEXT,
+    ALTER COLUMN source_id TYPE TEXT;
@@ -0,0 +1,202 @@
+-- Rebuilds bird_observations as a partitioned table:
+--
+--   bird_observations                  LIST (is_test_data)
+--     bird_observations_live           FALSE, RANGE (observation_date)
+--       bird_observations_yYYYYmMM     one per month
+--       bird_observations_live_default dates without a month partition yet
+--     bird_observations_test           TRUE, LIST (test_batch_id)
+--       bird_observations_test_<batch> one per test batch
+--       bird_observations_test_default batches without their own partition
+--
+-- Queries bounded by observation_date only touch the months they need, test
+-- batches never share pages with real observations, and partition_maintenance.py
+-- removes a batch or an old month with DETACH and DROP instead of DELETE.
+--
+-- Unique indexes on a partitioned table must contain its partition keys, so
+-- source_id is unique per (source_id, observation_date) among live rows and
+-- per (source_id, test_batch_id) among test rows; ingest_observations
+-- inserts into the two branches for ON CONFLICT.
+--
+-- The rows are copied and the new table indexed under a SHARE lock: writers
+-- wait for the migration, readers keep reading the old table until the swap
+-- at the end.
+
+LOCK TABLE bird_observations IN SHARE MODE;
+
+CREATE TABLE bird_observations_partitioned (
+    id INTEGER NOT NULL DEFAULT nextval('bird_observations_id_seq'),
+    bird_name TEXT NOT NULL,
+    scientific_name TEXT,
+    sound_directory TEXT,
+    latitude DECIMAL(10, 7) NOT NULL,
+    longitude DECIMAL(10, 7) NOT NULL,
+    observation_date DATE NOT NULL,
+    observation_time TIME NOT NULL,
+    observer_id INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    quantity INTEGER DEFAULT 1,
+    is_test_data BOOLEAN NOT NULL DEFAULT FALSE,
+    test_batch_id TEXT NULL,
+    source_id TEXT
+) PARTITION BY LIST (is_test_data);
+
+CREATE TABLE bird_observations_live PARTITION OF bird_observations_partitioned
+FOR VALUES IN (FALSE) PARTITION BY RANGE (observation_date);
+CREATE TABLE bird_observations_live_default PARTITION OF bird_observations_live DEFAULT;
+
+CREATE TABLE bird_observations_test PARTITION OF bird_observations_partitioned
+FOR VALUES IN (TRUE) PARTITION BY LIST (test_batch_id);
+CREATE TABLE bird_observations_test_default PARTITION OF bird_observations_test DEFAULT;
+
+-- Moving rows between partitions keeps their ids, so the change log must not
+-- report them as deleted; see create_*_partition below
+CREATE OR REPLACE FUNCTION log_observation_change() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('urban_echoes.moving_partitions', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO observation_changes (observation_id, change_type) VALUES (OLD.id, 'deleted');
+        RETURN OLD;
+    END IF;
+    INSERT INTO observation_changes (observation_id, change_type) VALUES (NEW.id, 'updated');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Creates the partition of ``parent`` for ``bound``. Rows the default partition
+-- already holds for it are moved over first, since Postgres refuses to add a
+-- partition whose rows sit in the default one
+CREATE OR REPLACE FUNCTION create_observation_partition(parent TEXT, name TEXT, bound TEXT, matching TEXT)
+RETURNS TEXT AS $$
+DECLARE
+    has_rows BOOLEAN;
+BEGIN
+    IF to_regclass(name) IS NOT NULL THEN
+        RETURN name;
+    END IF;
+    EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I WHERE %s)', parent || '_default', matching) INTO has_rows;
+    IF NOT has_rows THEN
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I %s', name, parent, bound);
+        RETURN name;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS)', name, parent);
+    PERFORM set_config('urban_echoes.moving_partitions', 'on', true);
+    EXECUTE format('WITH moved AS (DELETE FROM %I WHERE %s RETURNING *) INSERT INTO %I SELECT * FROM moved',
+                   parent || '_default', matching, name);
+    PERFORM set_config('urban_echoes.moving_partitions', 'off', true);
+    EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I %s', parent, name, bound);
+    RETURN name;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION observation_month_partition_name(month DATE) RETURNS TEXT AS $$
+    SELECT 'bird_observations_' || to_char(month, '"y"YYYY"m"MM')
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION create_observation_month_partition(month DATE) RETURNS TEXT AS $$
+    SELECT create_observation_partition(
+        'bird_observations_live',
+        observation_month_partition_name(month),
+        format('FOR VALUES FROM (%L) TO (%L)', date_trunc('month', month)::date,
+               (date_trunc('month', month) + INTERVAL '1 month')::date),
+        format('observation_date >= %L AND observation_date < %L', date_trunc('month', month)::date,
+               (date_trunc('month', month) + INTERVAL '1 month')::date))
+$$ LANGUAGE sql;
+
+-- Readable where the batch id allows, with a hash so distinct batches never share a name
+CREATE OR REPLACE FUNCTION test_batch_partition_name(batch TEXT) RETURNS TEXT AS $$
+    SELECT left('bird_observations_test_' || lower(regexp_replace(batch, '\W+', '_', 'g')), 54) || '_' || left(md5(batch), 8)
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION create_test_batch_partition(batch TEXT) RETURNS TEXT AS $$
+    SELECT create_observation_partition(
+        'bird_observations_test',
+        test_batch_partition_name(batch),
+        format('FOR VALUES IN (%L)', batch),
+        format('test_batch_id = %L', batch))
+$$ LANGUAGE sql;
+
+-- A partition for every month with observations and the next three, one per test batch
+SELECT create_observation_month_partition(month::date)
+FROM (
+    SELECT DISTINCT date_trunc('month', observation_date) AS month
+    FROM bird_observations WHERE NOT COALESCE(is_test_data, FALSE)
+    UNION
+    SELECT generate_series(date_trunc('month', CURRENT_DATE), date_trunc('month', CURRENT_DATE) + INTERVAL '3 months',
+                           INTERVAL '1 month')
+) months
+ORDER BY month;
+
+SELECT create_test_batch_partition(test_batch_id)
+FROM (SELECT DISTINCT test_batch_id FROM bird_observations WHERE is_test_data AND test_batch_id IS NOT NULL) batches;
+
+INSERT INTO bird_observations_partitioned (id, bird_name, scientific_name, sound_directory, latitude, longitude,
+                                           observation_date, observation_time, observer_id, created_at, quantity,
+                                           is_test_data, test_batch_id, source_id)
+SELECT id, bird_name, scientific_name, sound_directory, latitude, longitude,
+       observation_date, observation_time, observer_id, created_at, quantity,
+       COALESCE(is_test_data, FALSE), test_batch_id, source_id
+FROM bird_observations;
+
+-- Indexes and triggers go on the new table before the swap, so readers only
+-- wait for the DROP and RENAMEs below. Every partition gets these, including
+-- ones created later. The root indexes take their final names after the old
+-- table, which still holds them, is gone
+CREATE INDEX idx_bird_observations_partitioned_created_at_id ON bird_observations_partitioned (created_at, id);
+CREATE INDEX idx_bird_observations_partitioned_location
+ON bird_observations_partitioned USING gist (point(longitude::float8, latitude::float8));
+CREATE INDEX idx_bird_observations_partitioned_month_day_time
+ON bird_observations_partitioned (observation_month_day(observation_date), observation_time);
+CREATE INDEX idx_bird_observations_partitioned_species_date ON bird_observations_partitioned (scientific_name, observation_date);
+CREATE INDEX idx_bird_observations_partitioned_source_id ON bird_observations_partitioned (source_id);
+-- What is left of the primary key: id is unique within each branch, and the
+-- sequence keeps the branches apart. They also serve lookups by id
+CREATE UNIQUE INDEX idx_bird_observations_live_id ON bird_observations_live (id, observation_date);
+CREATE UNIQUE INDEX idx_bird_observations_test_id ON bird_observations_test (id, test_batch_id) NULLS NOT DISTINCT;
+-- The ON CONFLICT targets of ingest_observations
+CREATE UNIQUE INDEX idx_bird_observations_live_source_id ON bird_observations_live (source_id, observation_date);
+CREATE UNIQUE INDEX idx_bird_observations_test_source_id ON bird_observations_test (source_id, test_batch_id);
+
+-- After the copy, or the cluster triggers would count every row twice
+CREATE TRIGGER bird_observations_change_log
+AFTER UPDATE OR DELETE ON bird_observations_partitioned
+FOR EACH ROW EXECUTE FUNCTION log_observation_change();
+
+-- Statement triggers fire for the table a statement names, so they go on the
+-- root and on both branches, which ingest_observations writes to directly.
+-- Writing straight into a month or batch partition skips them.
+DO $$
+DECLARE
+    target TEXT;
+    prefix TEXT;
+BEGIN
+    FOREACH target IN ARRAY ARRAY['bird_observations_partitioned', 'bird_observations_live', 'bird_observations_test'] LOOP
+        -- Named for the table the root is about to become
+        prefix := replace(target, '_partitioned', '');
+        EXECUTE format('CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I
+                        FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change()', prefix || '_notify_change', target);
+        EXECUTE format('CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION notify_observation_inserts()', prefix || '_notify_insert', target);
+        EXECUTE format('CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION update_observation_clusters()', prefix || '_clusters_insert', target);
+        EXECUTE format('CREATE TRIGGER %I AFTER UPDATE ON %I REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION update_observation_clusters()', prefix || '_clusters_update', target);
+        EXECUTE format('CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION update_observation_clusters()', prefix || '_clusters_delete', target);
+    END LOOP;
+END;
+$$;
+
+-- Autovacuum never analyzes a partitioned parent
+ANALYZE bird_observations_partitioned;
+
+-- Swap. The sequence has to change owner first or DROP TABLE would take it along
+ALTER SEQUENCE bird_observations_id_seq OWNED BY bird_observations_partitioned.id;
+DROP TABLE bird_observations;
+ALTER TABLE bird_observations_partitioned RENAME TO bird_observations;
+ALTER INDEX idx_bird_observations_partitioned_created_at_id RENAME TO idx_bird_observations_created_at_id;
+ALTER INDEX idx_bird_observations_partitioned_location RENAME TO idx_bird_observations_location;
+ALTER INDEX idx_bird_observations_partitioned_month_day_time RENAME TO idx_bird_observations_month_day_time;
+ALTER INDEX idx_bird_observations_partitioned_species_date RENAME TO idx_bird_observations_species_date;
+ALTER INDEX idx_bird_observations_partitioned_source_id RENAME TO idx_bird_observations_source_id;
@@ -0,0 +1,11 @@
+-- The statement triggers 0005 put on bird_observations_live and
+-- bird_observations_test announced those names on table_changes, which the
+-- API's response cache doesn't know; a partition now notifies as its root
+CREATE OR REPLACE FUNCTION notify_table_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('table_changes', relname)
+    FROM pg_class
+    WHERE oid = COALESCE(pg_partition_root(TG_RELID), TG_RELID);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,22 @@
+-- The manifest behind /sounds/manifest: every sound file in blob storage,
+-- keyed by the sound_directory URL observations carry, so clients know what
+-- to play without listing the storage container themselves. BirdSoundStorage
+-- adds a row per upload and sound_manifest.py refresh reconciles the table
+-- with the container; blob_etag lets it skip blobs that haven't changed.
+
+CREATE TABLE IF NOT EXISTS sound_files (
+    sound_directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    size_bytes BIGINT NOT NULL,
+    duration_seconds REAL,
+    content_sha256 TEXT NOT NULL,
+    blob_etag TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (sound_directory, name)
+);
+
+DROP TRIGGER IF EXISTS sound_files_notify_change ON sound_files;
+CREATE TRIGGER sound_files_notify_change
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON sound_files
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change();
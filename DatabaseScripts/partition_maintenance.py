@@ -0,0 +1,207 @@
+"""Create and drop partitions of bird_observations; see migrations/0005.
+
+Live observations are partitioned by month of observation_date and test data
+by test_batch_id. Dropping a partition is a DETACH and a DROP rather than a
+DELETE of every row; the cluster aggregates and the change log that
+/observations/sync reads are brought up to date first.
+
+    python DatabaseScripts/partition_maintenance.py list
+    python DatabaseScripts/partition_maintenance.py ensure-months --ahead 3
+    python DatabaseScripts/partition_maintenance.py drop-batch TEST_BATCH_20250301_120000
+    python DatabaseScripts/partition_maintenance.py drop-months-before 2024-01
+
+Run ensure-months at least monthly (e.g. from a scheduled job), or new
+observations pile up in bird_observations_live_default, which every
+date-bounded query then has to scan.
+"""
+import os
+import sys
+import argparse
+from datetime import date
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "connection_and_oprations"))
+from database_connection import DatabaseConnection
+from database_operations import CLUSTER_MIN_ZOOM, CLUSTER_MAX_ZOOM, CLUSTER_ZOOM_STEP
+
+LIVE_PARENT = "bird_observations_live"
+TEST_PARENT = "bird_observations_test"
+
+
+def list_partitions(db):
+    """(parent, partition, bound, estimated rows, bytes) for every partition."""
+    db.cursor.execute("""
+    SELECT parent.relname, child.relname, pg_get_expr(child.relpartbound, child.oid),
+           GREATEST(child.reltuples, 0)::BIGINT, pg_total_relation_size(child.oid)
+    FROM pg_inherits i
+    JOIN pg_class parent ON parent.oid = i.inhparent
+    JOIN pg_class child ON child.oid = i.inhrelid
+    WHERE parent.relname IN (%s, %s)
+    ORDER BY parent.relname, child.relname
+    """, (LIVE_PARENT, TEST_PARENT))
+    return db.cursor.fetchall()
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure_month_partitions(db, months_ahead=3):
+    """Create the partitions up to ``months_ahead`` months out, and for any month in the default partition."""
+    try:
+        this_month = date.today().replace(day=1)
+        db.cursor.execute(f"""
+        SELECT create_observation_month_partition(month::date)
+        FROM (
+            SELECT DISTINCT date_trunc('month', observation_date) AS month FROM {LIVE_PARENT}_default
+            UNION
+            SELECT generate_series(%s::date, %s::date, INTERVAL '1 month')
+        ) months
+        ORDER BY month
+        """, (this_month, _add_months(this_month, months_ahead)))
+        created = [row[0] for row in db.cursor.fetchall()]
+        db.commit()
+        print(f"Month partitions in place up to {_add_months(this_month, months_ahead):%Y-%m}")
+        return created
+    except Exception as e:
+        print(f"Error creating month partitions: {e}")
+        db.conn.rollback()
+        raise
+
+
+def _retire_partition(db, parent, name, lock_timeout):
+    # One transaction per partition, so the parent is only locked for one DETACH
+    # at a time. The SHARE lock keeps writers out of the partition while the
+    # clusters and change log are brought up to date, without blocking readers
+    db.cursor.execute("SET LOCAL lock_timeout = %s", (lock_timeout,))
+    db.cursor.execute(f'LOCK TABLE "{name}" IN SHARE MODE')
+    # The deletion half of update_observation_clusters (migration 0002), for a
+    # whole partition; the statement triggers don't see DETACH or DROP
+    db.cursor.execute(f"""
+    INSERT INTO observation_clusters AS c (zoom, cell_x, cell_y, observation_count, latitude_sum, longitude_sum, species)
+    SELECT zoom, cell_x, cell_y, -SUM(n), -SUM(lat_sum), -SUM(lon_sum), jsonb_object_agg(species_key, -n)
+    FROM (
+        SELECT levels.zoom,
+               observation_cell_x(o.longitude::float8, levels.zoom) AS cell_x,
+               observation_cell_y(o.latitude::float8, levels.zoom) AS cell_y,
+               COALESCE(o.scientific_name, 'unknown') AS species_key,
+               COUNT(*) AS n,
+               SUM(o.latitude::float8) AS lat_sum,
+               SUM(o.longitude::float8) AS lon_sum
+        FROM "{name}" o
+        CROSS JOIN generate_series({CLUSTER_MIN_ZOOM}, {CLUSTER_MAX_ZOOM}, {CLUSTER_ZOOM_STEP}) AS levels(zoom)
+        GROUP BY 1, 2, 3, 4
+    ) per_species
+    GROUP BY zoom, cell_x, cell_y
+    ON CONFLICT (zoom, cell_x, cell_y) DO UPDATE SET
+        observation_count = c.observation_count + EXCLUDED.observation_count,
+        latitude_sum = c.latitude_sum + EXCLUDED.latitude_sum,
+        longitude_sum = c.longitude_sum + EXCLUDED.longitude_sum,
+        species = merge_species_counts(c.species, EXCLUDED.species)
+    """)
+    db.cursor.execute("DELETE FROM observation_clusters WHERE observation_count <= 0")
+    # Clients syncing from /observations/sync drop the rows too
+    db.cursor.execute(f"""
+    INSERT INTO observation_changes (observation_id, change_type) SELECT id, 'deleted' FROM "{name}"
+    """)
+    removed = db.cursor.rowcount
+    db.cursor.execute(f'ALTER TABLE "{parent}" DETACH PARTITION "{name}"')
+    db.cursor.execute(f'DROP TABLE "{name}"')
+    # The API's response cache listens for this, as it does for the triggers' notifications
+    db.cursor.execute("SELECT pg_notify('table_changes', 'bird_observations')")
+    db.commit()
+    print(f"Dropped {name} ({removed} observations)")
+    return removed
+
+
+def drop_test_batch(db, test_batch_id, lock_timeout="5s"):
+    """Remove a test batch: its partition is dropped, stray rows in the default partition deleted."""
+    try:
+        db.cursor.execute("SELECT test_batch_partition_name(%s), to_regclass(test_batch_partition_name(%s))",
+                          (test_batch_id, test_batch_id))
+        name, exists = db.cursor.fetchone()
+        removed = _retire_partition(db, TEST_PARENT, name, lock_timeout) if exists else 0
+        db.cursor.execute("SET LOCAL lock_timeout = %s", (lock_timeout,))
+        db.cursor.execute(f"DELETE FROM {TEST_PARENT} WHERE test_batch_id = %s", (test_batch_id,))
+        removed += db.cursor.rowcount
+        db.commit()
+        print(f"Removed test batch {test_batch_id}: {removed} observations")
+        return removed
+    except Exception as e:
+        print(f"Error dropping test batch {test_batch_id}: {e}")
+        db.conn.rollback()
+        raise
+
+
+def drop_months_before(db, cutoff, lock_timeout="5s"):
+    """Remove live observations dated before the month ``cutoff`` falls in.
+
+    Each month is committed as it is dropped, so an error stops the run with
+    the earlier months already gone.
+    """
+    cutoff = cutoff.replace(day=1)
+    try:
+        db.cursor.execute("""
+        SELECT child.relname
+        FROM pg_inherits i
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass AND child.relname ~ '^bird_observations_y[0-9]{4}m[0-9]{2}$'
+            AND child.relname < observation_month_partition_name(%s)
+        ORDER BY child.relname
+        """, (LIVE_PARENT, cutoff))
+        removed = 0
+        for (name,) in db.cursor.fetchall():
+            removed += _retire_partition(db, LIVE_PARENT, name, lock_timeout)
+        db.cursor.execute("SET LOCAL lock_timeout = %s", (lock_timeout,))
+        db.cursor.execute(f"DELETE FROM {LIVE_PARENT} WHERE observation_date < %s", (cutoff,))
+        removed += db.cursor.rowcount
+        db.commit()
+        print(f"Removed {removed} observations dated before {cutoff:%Y-%m}")
+        return removed
+    except Exception as e:
+        print(f"Error dropping months before {cutoff:%Y-%m}: {e}")
+        db.conn.rollback()
+        raise
+
+
+def _month(value):
+    try:
+        year, month = value.split("-")
+        return date(int(year), int(month), 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show every partition with its size")
+    ensure = commands.add_parser("ensure-months", help="create upcoming month partitions")
+    ensure.add_argument("--ahead", type=int, default=3, help="months after the current one")
+    batch = commands.add_parser("drop-batch", help="remove a test batch")
+    batch.add_argument("test_batch_id")
+    months = commands.add_parser("drop-months-before", help="remove live observations before a month")
+    months.add_argument("month", type=_month, help="YYYY-MM; that month is kept")
+    args = parser.parse_args()
+
+    db = DatabaseConnection()
+    db.create_connection()
+    try:
+        if args.command == "list":
+            for parent, name, bound, rows, size in list_partitions(db):
+                print(f"{name:<56} {bound:<58} ~{rows:>10} rows {size / 2**20:>9.1f} MB")
+        elif args.command == "ensure-months":
+            ensure_month_partitions(db, args.ahead)
+        elif args.command == "drop-batch":
+            drop_test_batch(db, args.test_batch_id)
+        else:
+            drop_months_before(db, args.month)
+    finally:
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ from datetime import datetime, time, timedelta
 import tempfile
 from tqdm import tqdm
 from database_operations import get_birds_from_database
+from sound_manifest import split_sound_url
+from util.transcode_audio import print_report, transcode_recordings
 
 AARHUS_CENTER = (56.1517, 10.2107)
 
@@ -24,6 +26,7 @@ def populate_sample_data(db, sound_storage, test_batch_count=100):
             print("Downloading and storing bird sounds...")
             # Dictionary to store sound URLs for each species
             bird_sound_urls = {}
+            downloads = []
             
             for bird in tqdm(birds_from_db):
                 bird_id, common_name, scientific_name, danish_name, region, is_common = bird
@@ -37,14 +40,27 @@ def populate_sample_data(db, sound_storage, test_batch_count=100):
                 sound_files = download_xeno.get_multiple_bird_sounds(scientific_name, temp_dir)
                 
                 bird_sound_urls[scientific_name] = []
-                for sound_file, recording_id in sound_files:
-                    if sound_storage:
-                        sound_url = sound_storage.upload_sound_file(sound_file, scientific_name, recording_id)
-                        if sound_url:
-                            bird_sound_urls[scientific_name].append(sound_url)
-                        os.remove(sound_file)  # Clean up temp file
+                downloads.extend((scientific_name, sound_file, recording_id) for sound_file, recording_id in sound_files)
+            
+            if sound_storage and downloads:
+                # Every recording at once, so the transcoding runs on all cores
+                print(f"Transcoding {len(downloads)} recordings for mobile playback...")
+                results, report = transcode_recordings([sound_file for _, sound_file, _ in downloads],
+                                                       os.path.join(temp_dir, "mobile"))
+                print_report(report)
+                for (scientific_name, sound_file, recording_id), result in zip(tqdm(downloads), results):
+                    # Where transcoding failed (result None) upload_sound_file tries once more, then uploads the original
+                    sound_url = sound_storage.upload_sound_file(sound_file, scientific_name, recording_id,
+                                                                transcoded=result)
+                    if result is not None:
+                        os.remove(result["path"])
+                    if sound_url:
+                        bird_sound_urls[scientific_name].append(sound_url)
+                    os.remove(sound_file)  # Clean up temp files
             
             print(f"Populating {test_batch_count} test observations...")
+            # The batch gets its own partition, so partition_maintenance.py drop-batch can remove it in one go
+            db.cursor.execute("SELECT create_test_batch_partition(%s)", (test_batch_id,))
             # Create random observations
             for i in tqdm(range(test_batch_count)):
                 # Randomly select a bird
@@ -58,10 +74,11 @@ def populate_sample_data(db, sound_storage, test_batch_count=100):
                 # Use danish_name if available, otherwise fall back to common_name
                 bird_name = danish_name if danish_name else common_name
                 
-                # Randomly select a sound URL if available, otherwise None
-                sound_url = None
+                # The folder holding the species' sounds, as the app stores it; the
+                # sound manifest lists its files
+                sound_directory = None
                 if scientific_name in bird_sound_urls and bird_sound_urls[scientific_name]:
-                    sound_url = random.choice(bird_sound_urls[scientific_name])
+                    sound_directory, _ = split_sound_url(bird_sound_urls[scientific_name][0])
                 
                 # Generate random location near Aarhus
                 lat = base_lat + random.uniform(-0.1, 0.1)
@@ -78,12 +95,12 @@ def populate_sample_data(db, sound_storage, test_batch_count=100):
                 
                 db.cursor.execute("""
                 INSERT INTO bird_observations 
-                (bird_name, scientific_name, sound_url, latitude, longitude, 
+                (bird_name, scientific_name, sound_directory, latitude, longitude, 
                  observation_date, observation_time, observer_id, quantity, 
                  is_test_data, test_batch_id)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """, (
-                    bird_name, scientific_name, sound_url, lat, lon,
+                    bird_name, scientific_name, sound_directory, lat, lon,
                     observation_date, observation_time,
                     random.randint(1, 10), random.randint(1, 10),
                     True, test_batch_id
@@ -91,6 +108,7 @@ def populate_sample_data(db, sound_storage, test_batch_count=100):
             
             db.commit()
             print(f"Sample data populated successfully. Test batch ID: {test_batch_id}")
+            print(f"Remove it with: python DatabaseScripts/partition_maintenance.py drop-batch {test_batch_id}")
             
             # Update the birds table with last_observed timestamp
             db.cursor.execute("""
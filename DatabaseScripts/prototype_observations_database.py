@@ -11,6 +11,7 @@ import tempfile
 
 
 from database_connection import DatabaseConnection
+from migrate import migrate
 
 # Aarhus center coordinates
 AARHUS_CENTER = (56.1517, 10.2107)
@@ -57,34 +58,6 @@ class BirdSoundStorage:
             return None
 
 
-def create_bird_observations_table(db):
-    try:
-        if reset_table:
-            db.cursor.execute("DROP TABLE IF EXISTS bird_observations")
-        
-        db.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS bird_observations (
-            id SERIAL PRIMARY KEY,
-            bird_name VARCHAR(255) NOT NULL,
-            scientific_name VARCHAR(255),
-            sound_directory TEXT,
-            latitude DECIMAL(10, 7) NOT NULL,
-            longitude DECIMAL(10, 7) NOT NULL,
-            observation_date DATE NOT NULL,
-            observation_time TIME NOT NULL,
-            observer_id INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            quantity INTEGER DEFAULT 1,
-            is_test_data BOOLEAN DEFAULT FALSE,
-            test_batch_id VARCHAR(50) NULL
-        )
-        """)
-        db.commit()
-        print("Table created successfully")
-    except Exception as e:
-        print(f"Error creating table: {e}")
-        raise
-
 def get_birds_from_database(db):
     """Get all birds from the birds table in the database"""
     birds = []
@@ -207,7 +180,13 @@ def main():
             return
         
         # Create or update the bird_observations table
-        create_bird_observations_table(db)
+        if reset_table:
+            # The cluster aggregates and the change log describe the old rows, so they go too
+            db.cursor.execute("""
+            DROP TABLE IF EXISTS bird_observations, observation_clusters, observation_changes, schema_migrations CASCADE
+            """)
+            db.commit()
+        migrate(db.conn)
         
         # Populate sample data using birds from the database
         populate_sample_data(db, sound_storage, test_batch_count=100)
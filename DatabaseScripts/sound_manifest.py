@@ -0,0 +1,157 @@
+"""Keep the sound_files manifest (migrations/0007) in step with blob storage.
+
+The API serves the manifest at /sounds/manifest, so clients learn which files
+a sound_directory holds without listing the container. BirdSoundStorage
+records every file it uploads; refresh picks up blobs that got into the
+container another way and forgets deleted ones. Blobs whose ETag matches the
+stored row are skipped, and the ones BirdSoundStorage uploaded carry their
+hash and duration as metadata, so a refresh only downloads blobs it has
+never seen.
+
+    python DatabaseScripts/sound_manifest.py refresh
+    python DatabaseScripts/sound_manifest.py list
+"""
+import os
+import io
+import sys
+import hashlib
+import argparse
+from urllib.parse import quote
+
+import mutagen
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "connection_and_oprations"))
+from database_connection import DatabaseConnection
+
+
+def describe_sound(fileobj):
+    """(size in bytes, duration in seconds or None, SHA-256 hex digest) of an open audio file."""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: fileobj.read(1 << 16), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    try:
+        audio = mutagen.File(fileobj)
+        duration = audio.info.length if audio is not None else None
+    except mutagen.MutagenError:
+        duration = None
+    fileobj.seek(0)
+    return size, duration, digest.hexdigest()
+
+
+def sound_metadata(duration, sha256):
+    """Blob metadata that saves refresh from downloading the file again."""
+    metadata = {"sha256": sha256}
+    if duration is not None:
+        metadata["duration"] = f"{duration:.3f}"
+    return metadata
+
+
+def split_sound_url(url):
+    """(sound_directory, name) of a blob URL; the directory is what observations store."""
+    directory, name = url.rsplit("/", 1)
+    return directory, name
+
+
+def _etag(value):
+    # Uploads report the ETag in quotes, container listings without
+    return value.strip('"') if value else None
+
+
+def _upsert(db, url, size, duration, sha256, etag):
+    directory, name = split_sound_url(url)
+    db.cursor.execute("""
+    INSERT INTO sound_files (sound_directory, name, url, size_bytes, duration_seconds, content_sha256, blob_etag)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (sound_directory, name) DO UPDATE SET
+        url = EXCLUDED.url,
+        size_bytes = EXCLUDED.size_bytes,
+        duration_seconds = EXCLUDED.duration_seconds,
+        content_sha256 = EXCLUDED.content_sha256,
+        blob_etag = EXCLUDED.blob_etag,
+        updated_at = CURRENT_TIMESTAMP
+    """, (directory, name, url, size, duration, sha256, _etag(etag)))
+
+
+def record_sound_file(db, url, size, duration, sha256, etag=None):
+    """Add or replace one file in the manifest."""
+    try:
+        _upsert(db, url, size, duration, sha256, etag)
+        db.commit()
+    except Exception as e:
+        print(f"Error recording {url} in the sound manifest: {e}")
+        db.conn.rollback()
+        raise
+
+
+def refresh_sound_manifest(db, storage):
+    """Bring the manifest rows for ``storage``'s container up to date with its blobs."""
+    container = storage.blob_service_client.get_container_client(storage.container_name)
+    prefix = container.url.rstrip("/") + "/"
+    try:
+        db.cursor.execute("SELECT url, blob_etag FROM sound_files WHERE starts_with(url, %s)", (prefix,))
+        known = dict(db.cursor.fetchall())
+        seen = set()
+        added = downloaded = 0
+        for blob in container.list_blobs(include=["metadata"]):
+            if blob.name.endswith("/"):
+                continue
+            # Quoted the way the SDK quotes blob_client.url, which uploads record
+            url = prefix + quote(blob.name, safe="~/")
+            seen.add(url)
+            if known.get(url) == _etag(blob.etag):
+                continue
+            metadata = blob.metadata or {}
+            if "sha256" in metadata:
+                size, sha256 = blob.size, metadata["sha256"]
+                duration = float(metadata["duration"]) if "duration" in metadata else None
+            else:
+                data = io.BytesIO(container.download_blob(blob.name).readall())
+                size, duration, sha256 = describe_sound(data)
+                downloaded += 1
+            _upsert(db, url, size, duration, sha256, blob.etag)
+            added += 1
+        gone = [url for url in known if url not in seen]
+        if gone:
+            db.cursor.execute("DELETE FROM sound_files WHERE url = ANY(%s)", (gone,))
+        db.commit()
+        print(f"Sound manifest: {added} files added or changed ({downloaded} downloaded), "
+              f"{len(gone)} removed, {len(seen)} in {storage.container_name}")
+        return added, len(gone)
+    except Exception as e:
+        print(f"Error refreshing the sound manifest: {e}")
+        db.conn.rollback()
+        raise
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("refresh", help="reconcile the manifest with the storage container")
+    commands.add_parser("list", help="show the files per sound_directory")
+    args = parser.parse_args()
+
+    db = DatabaseConnection()
+    db.create_connection()
+    try:
+        if args.command == "refresh":
+            # Imported here: bird_sound_storage imports this module
+            from bird_sound_storage import BirdSoundStorage
+            refresh_sound_manifest(db, BirdSoundStorage())
+        else:
+            db.cursor.execute("""
+            SELECT sound_directory, COUNT(*), SUM(size_bytes), SUM(duration_seconds)
+            FROM sound_files GROUP BY sound_directory ORDER BY sound_directory
+            """)
+            for directory, files, size, duration in db.cursor.fetchall():
+                print(f"{directory:<80} {files:>4} files {size / 2**20:>8.1f} MB {duration or 0:>8.0f} s")
+    finally:
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 class BirdObservation:
     def __init__(self, bird_name, scientific_name, sound_directory, latitude, longitude, 
                  observation_date, observation_time, observer_id=0, quantity=1, 
-                 is_test_data=False, test_batch_id=None):
+                 is_test_data=False, test_batch_id=None, source_id=None):
         self.bird_name = bird_name
         self.scientific_name = scientific_name
         self.sound_directory = sound_directory
@@ -13,9 +13,10 @@ class BirdObservation:
         self.quantity = quantity
         self.is_test_data = is_test_data
         self.test_batch_id = test_batch_id
+        self.source_id = source_id
 
     def to_tuple(self):
         """Converts the observation to a tuple for database insertion."""
         return (self.bird_name, self.scientific_name, self.sound_directory, self.latitude, 
                 self.longitude, self.observation_date, self.observation_time, self.observer_id, 
-                self.quantity, self.is_test_data, self.test_batch_id)
+                self.quantity, self.is_test_data, self.test_batch_id, self.source_id)
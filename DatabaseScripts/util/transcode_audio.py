@@ -0,0 +1,198 @@
+"""Turn Xeno-canto recordings into the small files the app streams while walking.
+
+Each recording is decoded with ffmpeg and re-encoded as a mono, low-bitrate
+MP3, loudness-normalised to MOBILE_LOUDNESS with a two-pass loudnorm (one
+pass measures, the second applies a linear gain) so every species plays at
+the same level. A JSON sidecar next to it records both files' size, hash and
+duration and the measured input loudness. BirdSoundStorage publishes the
+variant and keeps the original and sidecar in the originals container.
+
+Recordings are transcoded in parallel, one ffmpeg at a time per worker
+process:
+
+    python DatabaseScripts/util/transcode_audio.py recordings/*.mp3 --out mobile --workers 4
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sound_manifest import describe_sound
+
+FFMPEG = os.getenv("FFMPEG_PATH", "ffmpeg")
+MOBILE_BITRATE = os.getenv("MOBILE_AUDIO_BITRATE", "48k")
+# Keeps everything up to 11 kHz, above nearly all birdsong
+MOBILE_SAMPLE_RATE = int(os.getenv("MOBILE_AUDIO_SAMPLE_RATE", 22050))
+MOBILE_LOUDNESS = float(os.getenv("MOBILE_AUDIO_LOUDNESS", -16))  # integrated LUFS
+MOBILE_TRUE_PEAK = -1.5
+MOBILE_LOUDNESS_RANGE = 11
+
+
+def _ffmpeg(*args):
+    result = subprocess.run([FFMPEG, "-hide_banner", "-nostdin", *args], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+    return result.stderr
+
+
+def _loudnorm(**measured):
+    options = {"I": MOBILE_LOUDNESS, "TP": MOBILE_TRUE_PEAK, "LRA": MOBILE_LOUDNESS_RANGE, **measured}
+    # Downmixed first, so the mono signal is what gets measured and normalised
+    return "aformat=channel_layouts=mono,loudnorm=" + ":".join(f"{k}={v}" for k, v in options.items())
+
+
+def measure_loudness(source):
+    """loudnorm's first-pass measurements of ``source`` (input_i, input_tp, input_lra, ...)."""
+    stderr = _ffmpeg("-i", source, "-vn", "-af", _loudnorm(print_format="json"), "-f", "null", "-")
+    return json.loads(stderr[stderr.rindex("{"):stderr.rindex("}") + 1])
+
+
+def _level(value):
+    # loudnorm reports silence as -inf, which JSON can't hold
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def _describe(path):
+    with open(path, "rb") as f:
+        size, duration, sha256 = describe_sound(f)
+    return {"bytes": size, "duration": duration, "sha256": sha256}
+
+
+def transcode_recording(source, out_dir):
+    """Write the mobile variant of ``source`` and its sidecar to ``out_dir``; returns the sidecar's contents."""
+    started = time.perf_counter()
+    cpu_before = os.times()
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(source))[0]
+    variant = os.path.join(out_dir, f"{stem}.mobile.mp3")
+
+    measured = measure_loudness(source)
+    if _level(measured["input_i"]) is not None:
+        normalise = _loudnorm(measured_I=measured["input_i"], measured_TP=measured["input_tp"],
+                              measured_LRA=measured["input_lra"], measured_thresh=measured["input_thresh"],
+                              offset=measured["target_offset"], linear="true")
+    else:
+        # Silence can't be measured; loudnorm leaves it as it is
+        normalise = _loudnorm()
+    _ffmpeg("-y", "-i", source, "-vn", "-map_metadata", "-1", "-af", normalise,
+            "-ar", str(MOBILE_SAMPLE_RATE), "-c:a", "libmp3lame", "-b:a", MOBILE_BITRATE, variant)
+
+    cpu_after = os.times()
+    metadata = {
+        "source": os.path.basename(source),
+        "original": _describe(source),
+        "mobile": {
+            "file": os.path.basename(variant),
+            **_describe(variant),
+            "codec": "mp3",
+            "bitrate": MOBILE_BITRATE,
+            "sample_rate": MOBILE_SAMPLE_RATE,
+            "channels": 1,
+        },
+        "loudness": {
+            "target_lufs": MOBILE_LOUDNESS,
+            "input_lufs": _level(measured["input_i"]),
+            "input_true_peak": _level(measured["input_tp"]),
+            "input_lra": _level(measured["input_lra"]),
+        },
+        "transcoded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "seconds": round(time.perf_counter() - started, 3),
+        # ffmpeg's CPU time; 0 where the OS doesn't report children's times (Windows)
+        "cpu_seconds": round(cpu_after.children_user + cpu_after.children_system
+                             - cpu_before.children_user - cpu_before.children_system, 3),
+    }
+    sidecar = os.path.join(out_dir, f"{stem}.json")
+    with open(sidecar, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    metadata["path"] = variant
+    metadata["original"]["path"] = os.path.abspath(source)
+    metadata["sidecar_path"] = sidecar
+    return metadata
+
+
+def transcode_recordings(sources, out_dir, workers=None):
+    """Transcode ``sources`` over a process pool.
+
+    Returns (results, report): one transcode_recording result per source, in
+    order, with None for the ones that failed, and the totals from
+    transcode_report.
+    """
+    workers = workers or os.cpu_count() or 1
+    results = [None] * len(sources)
+    failed = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(transcode_recording, source, out_dir): i for i, source in enumerate(sources)}
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                print(f"Error transcoding {sources[futures[future]]}: {e}")
+                failed += 1
+    report = transcode_report([r for r in results if r is not None], time.perf_counter() - started, workers)
+    report["failed"] = failed
+    return results, report
+
+
+def transcode_report(results, wall_seconds, workers):
+    """Bytes saved and throughput, in total and per core, of a transcode_recordings run."""
+    original = sum(r["original"]["bytes"] for r in results)
+    mobile = sum(r["mobile"]["bytes"] for r in results)
+    audio = sum(r["original"]["duration"] or 0 for r in results)
+    cpu = sum(r["cpu_seconds"] for r in results)
+    core_seconds = wall_seconds * workers
+    return {
+        "files": len(results),
+        "workers": workers,
+        "wall_seconds": round(wall_seconds, 3),
+        "original_bytes": original,
+        "mobile_bytes": mobile,
+        "saved_bytes": original - mobile,
+        "saved_percent": round(100 * (original - mobile) / original, 1) if original else 0.0,
+        "audio_seconds": round(audio, 1),
+        "cpu_seconds": round(cpu, 3) or None,
+        "per_core": {
+            "files_per_second": round(len(results) / core_seconds, 3) if core_seconds else None,
+            "audio_seconds_per_second": round(audio / core_seconds, 1) if core_seconds else None,
+            "original_mb_per_second": round(original / 2**20 / core_seconds, 2) if core_seconds else None,
+        },
+    }
+
+
+def print_report(report):
+    per_core = report["per_core"]
+    print(f"Transcoded {report['files']} recordings ({report['failed']} failed) "
+          f"in {report['wall_seconds']:.1f} s on {report['workers']} workers")
+    print(f"  {report['original_bytes'] / 2**20:.1f} MB -> {report['mobile_bytes'] / 2**20:.1f} MB, "
+          f"saved {report['saved_bytes'] / 2**20:.1f} MB ({report['saved_percent']}%)")
+    print(f"  per core: {per_core['files_per_second']} files/s, "
+          f"{per_core['audio_seconds_per_second']}x realtime, {per_core['original_mb_per_second']} MB/s of originals")
+    if report["cpu_seconds"]:
+        print(f"  ffmpeg CPU time {report['cpu_seconds']:.1f} s, "
+              f"{report['audio_seconds'] / report['cpu_seconds']:.1f}x realtime per CPU second")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="recordings to transcode")
+    parser.add_argument("--out", required=True, help="directory for the variants and sidecars")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    _, report = transcode_recordings(args.sources, args.out, args.workers)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
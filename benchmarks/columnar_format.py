@@ -0,0 +1,91 @@
+"""Compare the columnar observation encoding with the current JSON payload.
+
+Builds synthetic rows shaped like psycopg2's RealDictCursor output and
+reports body size and encode time for plain JSON, gzipped JSON, the raw
+columnar encoding and the gzipped columnar encoding that the API sends.
+
+Run from the repository root:
+    python benchmarks/columnar_format.py            # 10k, 100k and 1M rows
+    python benchmarks/columnar_format.py 10000      # custom row counts
+"""
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as time_of_day
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import columnar_format  # noqa: E402
+
+SPECIES = [(f"Fugl {i}", f"Avis species{i}") for i in range(250)]
+SOUND_BASE = "https://urbanechostorage.blob.core.windows.net/bird-sounds-test/"
+
+
+def json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    return value.isoformat()
+
+
+def synthetic_rows(count, seed=42):
+    rng = random.Random(seed)
+    created = datetime(2025, 3, 1, 8, 0, 0)
+    rows = []
+    for i in range(count):
+        bird_name, scientific_name = rng.choice(SPECIES)
+        created += timedelta(milliseconds=rng.randint(1, 5000))
+        rows.append({
+            "id": i + 1,
+            "bird_name": bird_name,
+            "scientific_name": scientific_name,
+            "sound_directory": SOUND_BASE + scientific_name.lower().replace(" ", "_"),
+            "latitude": Decimal(f"{56.1517 + rng.uniform(-0.1, 0.1):.7f}"),
+            "longitude": Decimal(f"{10.2107 + rng.uniform(-0.1, 0.1):.7f}"),
+            "observation_date": date(2025, 1, 1) + timedelta(days=rng.randint(0, 364)),
+            "observation_time": time_of_day(rng.randint(5, 20), rng.randint(0, 59)),
+            "observer_id": rng.randint(1, 10),
+            "created_at": created,
+            "quantity": rng.randint(1, 10),
+            "is_test_data": False,
+            "test_batch_id": None,
+        })
+    return rows
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def run(count):
+    rows = synthetic_rows(count)
+
+    json_body, json_ms = timed(lambda: json.dumps({"observations": rows}, default=json_default).encode())
+    json_gz, json_gz_ms = timed(lambda: gzip.compress(json_body, compresslevel=6))
+    columnar_body, columnar_ms = timed(lambda: columnar_format.encode_rows(rows))
+    columnar_gz, columnar_gz_ms = timed(lambda: gzip.compress(columnar_body, compresslevel=6))
+
+    decoded, _ = columnar_format.decode_rows(columnar_body)
+    assert len(decoded) == count and decoded[-1]["latitude"] == float(rows[-1]["latitude"])
+
+    results = [
+        ("json", len(json_body), json_ms),
+        ("json+gzip", len(json_gz), json_ms + json_gz_ms),
+        ("columnar", len(columnar_body), columnar_ms),
+        ("columnar+gzip", len(columnar_gz), columnar_ms + columnar_gz_ms),
+    ]
+    print(f"\n{count:,} rows")
+    for name, size, ms in results:
+        print(f"  {name:<14} {size / 1024:>12,.1f} KiB  {size / len(json_body):>6.1%} of json  {ms:>9,.1f} ms")
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for count in counts:
+        run(count)
@@ -0,0 +1,76 @@
+"""Compare two benchmarks/suite.py result files and flag regressions.
+
+A scenario regresses when its p50 or p99 latency grows, or its throughput
+drops, by more than the threshold (10% by default). Exits with status 1 when
+anything regressed, so it can gate a CI job.
+
+Run from the repository root:
+    python benchmarks/compare.py benchmarks/results/1m-<old>.json benchmarks/results/1m-<new>.json
+    python benchmarks/compare.py old.json new.json --threshold 25
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        run = json.load(f)
+    return run, {(result["name"], result["concurrency"]): result for result in run["results"]}
+
+
+def change(old, new):
+    if not old or new is None:
+        return None
+    return (new - old) / old
+
+
+def describe(run):
+    return f"{run['commit'][:10]}{' (dirty)' if run.get('dirty') else ''} {run['scale']} {run['created_at']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10, help="percent change that counts as a regression")
+    args = parser.parse_args()
+    threshold = args.threshold / 100
+
+    old_run, old_results = load(args.baseline)
+    new_run, new_results = load(args.candidate)
+    print(f"baseline  {describe(old_run)}\ncandidate {describe(new_run)}")
+    for setting in ("rows", "species", "seed_version", "response_cache", "postgres", "machine"):
+        if old_run.get(setting) != new_run.get(setting):
+            print(f"warning: {setting} differs ({old_run.get(setting)} vs {new_run.get(setting)}), "
+                  f"so the numbers aren't directly comparable")
+
+    print(f"\n{'scenario':<32}{'c':>4}{'p50 ms':>20}{'p99 ms':>22}{'req/s':>22}")
+    regressions = []
+    for key in sorted(set(old_results) | set(new_results)):
+        old, new = old_results.get(key), new_results.get(key)
+        name, concurrency = key
+        if old is None or new is None:
+            print(f"{name:<32}{concurrency:>4}  only in {'candidate' if old is None else 'baseline'}")
+            continue
+        cells, worse = [], False
+        for metric, higher_is_worse in (("p50_ms", True), ("p99_ms", True), ("throughput_rps", False)):
+            delta = change(old.get(metric), new.get(metric))
+            if delta is not None and (delta > threshold if higher_is_worse else delta < -threshold):
+                worse = True
+            shown = f"{delta:+.0%}" if delta is not None else "n/a"
+            cells.append(f"{new.get(metric, 0):>11.2f} {shown:>7}")
+        if new.get("errors", 0) > old.get("errors", 0):
+            worse = True
+        if worse:
+            regressions.append(key)
+        print(f"{name:<32}{concurrency:>4}{'':>2}{'  '.join(cells)}{'  REGRESSION' if worse else ''}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:g}%")
+        sys.exit(1)
+    print(f"\nNo regressions over {args.threshold:g}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Compare API-side and Postgres-side JSON rendering of observation lists.
+
+Fills a temporary table shaped like bird_observations and times, per
+request, the CPU the API process spends and the wall clock for:
+
+  fastapi   RealDictCursor rows through jsonable_encoder and JSONResponse
+            (how /observations rendered before the response cache)
+  python    RealDictCursor rows through json.dumps (the previous path)
+  postgres  json_agg for one page / row_to_json through a server-side
+            cursor for the full list (the current path)
+
+Needs a database; nothing outside the temporary table is touched.
+
+Run from the repository root:
+    BENCH_DSN="host=localhost dbname=urban_echoes_db user=..." python benchmarks/db_json.py
+    BENCH_DSN=... python benchmarks/db_json.py 10000 100000    # custom row counts
+"""
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, time as time_of_day
+from decimal import Decimal
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+COLUMNS = """id, bird_name, scientific_name, sound_directory, latitude, longitude,
+             observation_date, observation_time, observer_id, created_at, quantity, is_test_data, test_batch_id"""
+PAGE_SIZE = 5000
+FETCH_SIZE = 2000
+REPEAT = int(os.getenv("REPEAT", 5))
+
+
+def json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time_of_day)):
+        return value.isoformat()
+    raise TypeError(type(value).__name__)
+
+
+def create_table(conn, count):
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS bench_observations")
+    cursor.execute("""
+        CREATE TEMPORARY TABLE bench_observations AS
+        SELECT i AS id,
+               'Fugl ' || (i %% 250) AS bird_name,
+               'Avis species' || (i %% 250) AS scientific_name,
+               'https://urbanechostorage.blob.core.windows.net/bird-sounds-test/avis_species' || (i %% 250) AS sound_directory,
+               round((56.1517 + random() * 0.2 - 0.1)::numeric, 7)::DECIMAL(10, 7) AS latitude,
+               round((10.2107 + random() * 0.2 - 0.1)::numeric, 7)::DECIMAL(10, 7) AS longitude,
+               DATE '2025-01-01' + (i %% 365) AS observation_date,
+               TIME '05:00' + (i %% 900) * INTERVAL '1 minute' AS observation_time,
+               i %% 10 AS observer_id,
+               TIMESTAMP '2025-03-01 08:00' + i * INTERVAL '2 seconds' AS created_at,
+               1 + i %% 10 AS quantity,
+               FALSE AS is_test_data,
+               NULL::VARCHAR(50) AS test_batch_id
+        FROM generate_series(1, %s) AS i
+    """, (count,))
+    cursor.execute("CREATE INDEX ON bench_observations (created_at, id)")
+    cursor.execute("ANALYZE bench_observations")
+    cursor.close()
+
+
+def fetch_dicts(conn, limit):
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute(f"SELECT {COLUMNS} FROM bench_observations ORDER BY created_at, id"
+                   + (" LIMIT %s" if limit else ""), (limit,) if limit else None)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def fastapi_path(conn, limit):
+    return JSONResponse(content=jsonable_encoder({"observations": fetch_dicts(conn, limit)})).body
+
+
+def python_path(conn, limit):
+    return json.dumps({"observations": fetch_dicts(conn, limit)}, default=json_default,
+                      ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def postgres_path(conn, limit):
+    if limit:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT COALESCE(json_agg(o), '[]')::text
+            FROM (SELECT {COLUMNS} FROM bench_observations ORDER BY created_at, id LIMIT %s) o
+        """, (limit,))
+        body = f'{{"observations":{cursor.fetchone()[0]}}}'.encode()
+        cursor.close()
+        return body
+
+    cursor = conn.cursor(name="bench_stream")
+    cursor.execute(f"SELECT row_to_json(o)::text FROM (SELECT {COLUMNS} FROM bench_observations ORDER BY created_at, id) o")
+    chunks = [b'{"observations":[']
+    first = True
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        text = ",".join(row[0] for row in rows)
+        chunks.append((text if first else "," + text).encode())
+        first = False
+    chunks.append(b"]}")
+    cursor.close()
+    return b"".join(chunks)
+
+
+def measure(conn, path, limit):
+    cpu, wall, size = [], [], 0
+    for _ in range(REPEAT):
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        size = len(path(conn, limit))
+        cpu.append((time.process_time() - cpu_start) * 1000)
+        wall.append((time.perf_counter() - wall_start) * 1000)
+        conn.commit()
+    return min(cpu), min(wall), size
+
+
+def run(conn, count):
+    create_table(conn, count)
+    for label, limit in ((f"page of {min(PAGE_SIZE, count):,}", PAGE_SIZE), (f"all {count:,}", None)):
+        print(f"\n{label} rows")
+        baseline = None
+        for name, path in (("fastapi", fastapi_path), ("python", python_path), ("postgres", postgres_path)):
+            cpu_ms, wall_ms, size = measure(conn, path, limit)
+            baseline = baseline or cpu_ms
+            print(f"  {name:<9} cpu {cpu_ms:>9,.1f} ms ({cpu_ms / baseline:>6.1%})  wall {wall_ms:>9,.1f} ms  {size / 1024:>10,.0f} KiB")
+
+
+if __name__ == "__main__":
+    dsn = os.getenv("BENCH_DSN")
+    if not dsn:
+        sys.exit("Set BENCH_DSN to a libpq connection string")
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    connection = psycopg2.connect(dsn)
+    try:
+        for count in counts:
+            run(connection, count)
+    finally:
+        connection.close()
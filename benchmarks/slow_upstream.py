@@ -0,0 +1,96 @@
+"""Show that a slow Xeno-canto does not raise latency for other endpoints.
+
+Starts a fake Xeno-canto that answers after UPSTREAM_DELAY seconds, keeps
+CONCURRENCY /birdsound requests in flight against it and meanwhile samples
+/health (and /observations when a database is configured) in the same
+event loop.
+
+Run from the repository root:
+    python benchmarks/slow_upstream.py
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("EBIRD_API_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "benchmark")
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+UPSTREAM_DELAY = float(os.getenv("UPSTREAM_DELAY", 2.0))
+CONCURRENCY = int(os.getenv("CONCURRENCY", 20))
+SAMPLES = int(os.getenv("SAMPLES", 200))
+
+
+async def slow_xeno_canto(reader, writer):
+    await reader.readuntil(b"\r\n\r\n")
+    await asyncio.sleep(UPSTREAM_DELAY)
+    body = json.dumps({"recordings": [{"id": "1", "q": "A"}]}).encode()
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                 b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+    await writer.drain()
+    writer.close()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def sample(client, path):
+    latencies = []
+    for _ in range(SAMPLES):
+        start = time.perf_counter()
+        await client.get(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+async def keep_busy(client, stop, worker):
+    requests_sent = 0
+    while not stop.is_set():
+        # A new name every time so the recording cache never answers for Xeno-canto
+        requests_sent += 1
+        await client.get("/birdsound", params={"scientific_name": f"Turdus merula {worker} {requests_sent}"})
+
+
+async def run():
+    server = await asyncio.start_server(slow_xeno_canto, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    main.XENO_CANTO_API = f"http://127.0.0.1:{port}/api/2/recordings"
+    main.upstream.max_per_host = CONCURRENCY
+
+    paths = ["/health"]
+    if os.getenv("DB_HOST"):
+        paths.append("/observations")
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=None) as client:
+        baseline = {path: await sample(client, path) for path in paths}
+
+        stop = asyncio.Event()
+        busy = [asyncio.create_task(keep_busy(client, stop, worker)) for worker in range(CONCURRENCY)]
+        await asyncio.sleep(0.1)
+        loaded = {path: await sample(client, path) for path in paths}
+        stop.set()
+        await asyncio.gather(*busy)
+
+    server.close()
+    await main.upstream.close()
+
+    for path in paths:
+        print(f"{path}: idle p50={percentile(baseline[path], 50):.2f}ms p99={percentile(baseline[path], 99):.2f}ms | "
+              f"slow upstream p50={percentile(loaded[path], 50):.2f}ms p99={percentile(loaded[path], 99):.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
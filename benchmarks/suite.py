@@ -0,0 +1,477 @@
+"""Database benchmark suite: latency, throughput and rows/s as bird_observations grows.
+
+Seeds the database in BENCH_DSN with a deterministic synthetic data set
+(observations clustered around Danish cities, a long tail of species,
+three years of dates), builds the real schema with DatabaseScripts/migrate.py
+and then measures, at each concurrency level:
+
+  sql     the statements the API endpoints run, built by main.py's query
+          functions and run directly with psycopg2
+  http    the API endpoints, served by uvicorn in a subprocess with the
+          response cache off (--cache keeps it on)
+
+Results go to benchmarks/results/<scale>-<commit>.json; compare two runs
+with benchmarks/compare.py. Seeding drops and recreates the API tables, so
+it refuses to run on a database it didn't seed itself unless it is empty.
+A seeded scale is reused by later runs, after applying any new migrations
+to it; --reseed builds it again.
+
+Run from the repository root:
+    BENCH_DSN="host=localhost dbname=urban_echoes_bench user=..." python benchmarks/suite.py --scale 10k
+    BENCH_DSN=... python benchmarks/suite.py --scale 1m --concurrency 1,8,32 --requests 400
+    BENCH_DSN=... python benchmarks/suite.py --scale 10m --only http
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Appended, so DatabaseScripts/main.py doesn't shadow the API's main.py
+sys.path.append(os.path.join(ROOT, "DatabaseScripts"))
+
+import psycopg2  # noqa: E402
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+SPECIES = int(os.getenv("BENCH_SPECIES", 1500))
+SEED_VERSION = 1
+SEED_CHUNK = 1_000_000
+FIRST_DAY = datetime(2023, 1, 1)
+DAYS = 3 * 365
+# (latitude, longitude, share of observations) for the clustered part of the data
+CITIES = [(55.6761, 12.5683, 0.30), (56.1629, 10.2039, 0.20), (55.4038, 10.4024, 0.10), (57.0488, 9.9217, 0.10)]
+DENMARK = (54.6, 8.1, 57.7, 12.7)  # min_lat, min_lon, max_lat, max_lon
+
+
+class BenchDatabase:
+    """A connection and cursor, shaped like DatabaseScripts' DatabaseConnection."""
+
+    def __init__(self, dsn):
+        self.conn = psycopg2.connect(dsn)
+        self.cursor = self.conn.cursor()
+
+    def commit(self):
+        self.conn.commit()
+
+    def close_connection(self):
+        self.cursor.close()
+        self.conn.close()
+
+
+def _table_exists(db, name):
+    db.cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+    return db.cursor.fetchone()[0]
+
+
+def seeded_scale(db):
+    if not _table_exists(db, "bench_meta"):
+        return None
+    db.cursor.execute("SELECT row_count, species_count, seed_version FROM bench_meta")
+    return db.cursor.fetchone()
+
+
+def seed(db, rows):
+    """Drop the API tables and rebuild them with ``rows`` synthetic observations."""
+    if not _table_exists(db, "bench_meta") and _table_exists(db, "bird_observations"):
+        sys.exit("bird_observations exists but wasn't seeded by this suite; use an empty database")
+    from migrate import migrate
+
+    started = time.perf_counter()
+    db.cursor.execute("""
+        DROP TABLE IF EXISTS bench_meta, schema_migrations, bird_observations, observation_clusters,
+                             observation_changes, ebird_import_state, birds CASCADE
+    """)
+    db.commit()
+    # Just the tables: loading before the triggers and indexes exist is much faster
+    migrate(db.conn, target=1)
+    db.cursor.execute("""
+        INSERT INTO birds (common_name, scientific_name, danish_name, is_common)
+        SELECT 'Bird ' || i, 'Avis species' || lpad(i::text, 4, '0'), 'Fugl ' || i, i <= 100
+        FROM generate_series(1, %s) AS i
+    """, (SPECIES,))
+    db.commit()
+
+    # The same setseed makes every run produce the same rows
+    db.cursor.execute("SELECT setseed(0.42)")
+    for start in range(0, rows, SEED_CHUNK):
+        count = min(SEED_CHUNK, rows - start)
+        db.cursor.execute(_SEED_SQL, {
+            "start": start + 1, "end": start + count, "rows": rows, "species": SPECIES, "days": DAYS,
+            "first_day": FIRST_DAY, "cities": json.dumps(CITIES),
+            "min_lat": DENMARK[0], "min_lon": DENMARK[1], "max_lat": DENMARK[2], "max_lon": DENMARK[3],
+        })
+        db.commit()
+        print(f"  {start + count:,} / {rows:,} observations ({time.perf_counter() - started:.0f}s)")
+    db.cursor.execute("SELECT setval(pg_get_serial_sequence('bird_observations', 'id'), %s)", (rows,))
+    db.commit()
+
+    # Triggers (and the cluster aggregates for the loaded rows), indexes and the rest
+    migrate(db.conn)
+    db.cursor.execute("CREATE TABLE bench_meta (row_count BIGINT, species_count INTEGER, seed_version INTEGER)")
+    db.cursor.execute("INSERT INTO bench_meta VALUES (%s, %s, %s)", (rows, SPECIES, SEED_VERSION))
+    db.commit()
+    db.conn.autocommit = True
+    db.cursor.execute("VACUUM ANALYZE")
+    db.conn.autocommit = False
+    print(f"Seeded {rows:,} observations of {SPECIES:,} species in {time.perf_counter() - started:.0f}s")
+
+
+# Species are skewed (cubing the random number makes low ids common), most
+# points sit near a city and created_at follows id, as it does in production
+_SEED_SQL = """
+    INSERT INTO bird_observations (id, bird_name, scientific_name, sound_directory, latitude, longitude,
+                                   observation_date, observation_time, observer_id, created_at, quantity,
+                                   is_test_data, source_id)
+    SELECT i, 'Fugl ' || s, 'Avis species' || lpad(s::text, 4, '0'),
+           'https://urbanechostorage.blob.core.windows.net/bird-sounds/avis_species' || lpad(s::text, 4, '0'),
+           round(lat::numeric, 7), round(lon::numeric, 7),
+           %(first_day)s::date + day, TIME '04:00' + minute * INTERVAL '1 minute', i %% 5000,
+           %(first_day)s::timestamp + (i::float8 / %(rows)s) * %(days)s * INTERVAL '1 day',
+           1 + (random() * random() * 20)::int, FALSE, 'bench:' || i
+    FROM (
+        SELECT i, 1 + floor(%(species)s * power(random(), 3))::int AS s,
+               floor(random() * %(days)s)::int AS day, floor(random() * 1080)::int AS minute,
+               CASE WHEN city IS NULL THEN %(min_lat)s + random() * (%(max_lat)s - %(min_lat)s)
+                    ELSE (city->>0)::float8 + (random() + random() + random() - 1.5) * 0.15 END AS lat,
+               CASE WHEN city IS NULL THEN %(min_lon)s + random() * (%(max_lon)s - %(min_lon)s)
+                    ELSE (city->>1)::float8 + (random() + random() + random() - 1.5) * 0.25 END AS lon
+        FROM (
+            SELECT i, (
+                SELECT c FROM (
+                    SELECT c, sum((c->>2)::float8) OVER (ORDER BY ordinality) AS cumulative
+                    FROM jsonb_array_elements(%(cities)s::jsonb) WITH ORDINALITY AS t(c, ordinality)
+                ) weighted
+                WHERE cumulative >= pick ORDER BY cumulative LIMIT 1
+            ) AS city
+            FROM (SELECT i, random() AS pick FROM generate_series(%(start)s, %(end)s) AS i) picks
+        ) placed
+    ) generated
+"""
+
+
+class Scenario:
+    def __init__(self, name, kind, make_request, requests=None, max_concurrency=None):
+        self.name = name
+        self.kind = kind
+        self.make_request = make_request  # rng -> (sql, params) or path
+        self.requests = requests
+        self.max_concurrency = max_concurrency
+
+
+def _random_point(rng):
+    lat, lon, _ = rng.choice(CITIES)
+    return lat + rng.uniform(-0.1, 0.1), lon + rng.uniform(-0.15, 0.15)
+
+
+def _random_timestamp(rng, rows, recent_rows=None):
+    # created_at is spread evenly over DAYS, so a share of the days is a share of the rows
+    share = 1 - (recent_rows / rows if recent_rows else rng.random())
+    return FIRST_DAY + timedelta(days=DAYS * max(share, 0))
+
+
+def _species(rng):
+    return f"Avis species{1 + int(SPECIES * rng.random() ** 3):04d}"
+
+
+def _viewport(rng, zoom):
+    lat, lon = _random_point(rng)
+    half = 180 / 2 ** zoom * 4
+    return lat - half / 2, lon - half, lat + half / 2, lon + half
+
+
+def _api():
+    # The API module, for the statements its endpoints run; needs the settings serve() defaults
+    os.environ.setdefault("EBIRD_API_KEY", "benchmark")
+    os.environ.setdefault("DATABASE_URL", "benchmark")
+    import main as api
+    return api
+
+
+def _filters(scientific_name=None, day_range=None, time_range=None):
+    # Shaped like main.observation_filters()
+    return {"day_range": day_range, "time_range": time_range, "scientific_name": scientific_name}
+
+
+def scenarios(rows):
+    all_rows_limit = 2 if rows <= 1_000_000 else 0
+    api = _api()
+    return [
+        # The statements main.py runs, built by the same functions, without the HTTP layer.
+        # The JSON ones return one text row, so compare those by bytes/s
+        Scenario("sql.keyset_page", "sql", lambda rng: api.observation_page_query(
+            _random_timestamp(rng, rows).isoformat(), 100, None, _filters())),
+        Scenario("sql.columnar_page", "sql", lambda rng: api.observation_rows_query(
+            _random_timestamp(rng, rows).isoformat(), 100, None, _filters())),
+        Scenario("sql.species_page", "sql", lambda rng: api.observation_page_query(
+            None, 500, None, _filters(scientific_name=_species(rng)))),
+        Scenario("sql.season_time", "sql", lambda rng: api.observation_page_query(
+            None, 500, None, _filters(day_range=(301, 531), time_range=("05:00", "07:00")))),
+        Scenario("sql.nearby", "sql", lambda rng: (lambda lat, lon: api.nearby_query(
+            lat, lon, 2000, 500, _filters()))(*_random_point(rng))),
+        Scenario("sql.clusters", "sql", lambda rng: api.cluster_query(
+            *api.cluster_cells(*_viewport(rng, 10), 10))),
+        Scenario("sql.birds", "sql", lambda rng: (api.BIRDS_QUERY, None)),
+
+        Scenario("http.observations_page", "http", lambda rng:
+            f"/observations?limit=100&after_timestamp={_random_timestamp(rng, rows).isoformat()}"),
+        Scenario("http.observations_recent", "http", lambda rng:
+            f"/observations?after_timestamp={_random_timestamp(rng, rows, 5000).isoformat()}"),
+        Scenario("http.observations_filtered", "http", lambda rng:
+            f"/observations?limit=100&season=spring&from_time=05:00&to_time=09:00&scientific_name={_species(rng)}"),
+        Scenario("http.observations_all", "http", lambda rng: "/observations",
+                 requests=all_rows_limit, max_concurrency=1),
+        Scenario("http.nearby", "http", lambda rng: (lambda lat, lon:
+            f"/observations/nearby?lat={lat:.5f}&lon={lon:.5f}&radius=2000")(*_random_point(rng))),
+        Scenario("http.clusters", "http", lambda rng: (lambda zoom: (lambda box:
+            f"/observations/clusters?min_lat={box[0]:.4f}&min_lon={box[1]:.4f}&max_lat={box[2]:.4f}"
+            f"&max_lon={box[3]:.4f}&zoom={zoom}")(_viewport(rng, zoom)))(rng.choice((8, 11, 14)))),
+        Scenario("http.birds", "http", lambda rng: "/birds"),
+        Scenario("http.search_birds", "http", lambda rng: f"/search_birds?query={_species(rng)[:rng.randint(3, 16)]}"),
+    ]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(latencies, errors, rows, size, elapsed):
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p90_ms": round(percentile(latencies, 90), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(max(latencies), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "rows_per_s": round(rows / elapsed, 1),
+        "bytes_per_s": round(size / elapsed, 1),
+    }
+
+
+def run_sql(dsn, scenario, concurrency, requests, seed_value):
+    latencies, counts = [], {"errors": 0, "rows": 0, "bytes": 0}
+    lock = threading.Lock()
+    remaining = iter(range(requests))
+
+    def worker(number):
+        rng = random.Random(seed_value * 1000 + number)
+        conn = psycopg2.connect(dsn)
+        conn.autocommit = True
+        cursor = conn.cursor()
+        try:
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                statement, params = scenario.make_request(rng)
+                started = time.perf_counter()
+                try:
+                    cursor.execute(statement, params)
+                    fetched = cursor.fetchall()
+                except psycopg2.Error:
+                    with lock:
+                        counts["errors"] += 1
+                    continue
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    counts["rows"] += len(fetched)
+                    # The JSON Postgres renders for /observations pages and /birds
+                    counts["bytes"] += sum(len(row[0]) for row in fetched if isinstance(row[0], str))
+        finally:
+            conn.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, counts["errors"], counts["rows"], counts["bytes"], time.perf_counter() - started)
+
+
+def _count_rows(body):
+    try:
+        document = json.loads(body)
+    except ValueError:
+        return 0
+    for key in ("observations", "birds", "clusters"):
+        if isinstance(document.get(key), list):
+            return len(document[key])
+    return 0
+
+
+async def run_http(base_url, scenario, concurrency, requests, seed_value):
+    import httpx
+
+    latencies, counts = [], {"errors": 0, "rows": 0, "bytes": 0}
+    remaining = iter(range(requests))
+
+    async def worker(client, number):
+        rng = random.Random(seed_value * 1000 + number)
+        while next(remaining, None) is not None:
+            path = scenario.make_request(rng)
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+            except httpx.HTTPError:
+                counts["errors"] += 1
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                counts["errors"] += 1
+                continue
+            latencies.append(elapsed)
+            counts["bytes"] += len(response.content)
+            counts["rows"] += _count_rows(response.content)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, counts["errors"], counts["rows"], counts["bytes"], elapsed)
+
+
+def serve(port):
+    """Run the API against BENCH_DSN; started by start_api() in a subprocess."""
+    os.environ.setdefault("EBIRD_API_KEY", "benchmark")
+    os.environ.setdefault("DATABASE_URL", "benchmark")
+    import uvicorn
+    from psycopg2.extensions import parse_dsn
+
+    import main
+    # Replaced in place: the listener shares this dict with the pool
+    main.db_pool.connect_kwargs.clear()
+    main.db_pool.connect_kwargs.update(parse_dsn(os.environ["BENCH_DSN"]))
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_api(concurrency, keep_cache):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = dict(os.environ, EBIRD_IMPORT_REGIONS="", WARMUP_TIMEOUT="5",
+               DB_POOL_MAX=str(max(10, concurrency)), DB_POOL_TIMEOUT="60")
+    if not keep_cache:
+        env["RESPONSE_CACHE_MAX_ENTRIES"] = "0"
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port)], env=env, cwd=ROOT)
+
+    import httpx
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit("The API exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready").status_code == 200:
+                return process, f"http://127.0.0.1:{port}"
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    sys.exit("The API wasn't ready within two minutes")
+
+
+def git_commit():
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return git("rev-parse", "HEAD") or "unknown", bool(git("status", "--porcelain", "--untracked-files=no"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--concurrency", default="1,16", help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    parser.add_argument("--only", choices=("sql", "http"), help="run one kind of scenario")
+    parser.add_argument("--filter", default="", help="run scenarios whose name contains this")
+    parser.add_argument("--reseed", action="store_true", help="seed again even if the scale is already there")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on for http scenarios")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for request parameters")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<scale>-<commit>.json)")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.serve)
+    dsn = os.getenv("BENCH_DSN")
+    if not dsn:
+        sys.exit("Set BENCH_DSN to a libpq connection string")
+
+    rows = SCALES[args.scale]
+    db = BenchDatabase(dsn)
+    if args.reseed or seeded_scale(db) != (rows, SPECIES, SEED_VERSION):
+        seed(db, rows)
+    else:
+        # Same rows, current schema, so runs either side of a migration compare
+        from migrate import migrate
+        migrate(db.conn)
+    db.cursor.execute("SHOW server_version")
+    server_version = db.cursor.fetchone()[0]
+    db.close_connection()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    selected = [s for s in scenarios(rows)
+                if (not args.only or s.kind == args.only) and args.filter in s.name]
+    commit, dirty = git_commit()
+    results = []
+    api = None
+    try:
+        for scenario in selected:
+            for level in levels:
+                if scenario.max_concurrency and level > scenario.max_concurrency:
+                    continue
+                count = args.requests if scenario.requests is None else scenario.requests
+                if not count:
+                    continue
+                if scenario.kind == "sql":
+                    summary = run_sql(dsn, scenario, level, count, args.seed)
+                else:
+                    if api is None:
+                        api = start_api(max(levels), args.cache)
+                    summary = asyncio.run(run_http(api[1], scenario, level, count, args.seed))
+                results.append({"name": scenario.name, "kind": scenario.kind, "concurrency": level, **summary})
+                print(f"{scenario.name:<30} c={level:<3} p50 {summary.get('p50_ms', 0):>9.2f} ms  "
+                      f"p99 {summary.get('p99_ms', 0):>9.2f} ms  {summary.get('throughput_rps', 0):>8.1f} req/s  "
+                      f"{summary.get('rows_per_s', 0):>11,.0f} rows/s  errors {summary['errors']}")
+    finally:
+        if api is not None:
+            api[0].terminate()
+            api[0].wait()
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{args.scale}-{commit[:10]}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "dirty": dirty,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "scale": args.scale,
+            "rows": rows,
+            "species": SPECIES,
+            "seed_version": SEED_VERSION,
+            "response_cache": args.cache,
+            "requests": args.requests,
+            "postgres": server_version,
+            "python": platform.python_version(),
+            "machine": {"platform": platform.platform(), "cpus": os.cpu_count()},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nWrote {output}")
+
+
+if __name__ == "__main__":
+    main()
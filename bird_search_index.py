@@ -0,0 +1,114 @@
+import heapq
+import unicodedata
+from bisect import bisect_left
+
+# Danish letters that don't decompose into a base letter plus an accent. Names are
+# indexed under both spellings so "maage" and "mage" both find "måge".
+_DANISH_FOLDS = str.maketrans({"æ": "ae", "ø": "oe", "å": "aa"})
+_SIMPLE_FOLDS = str.maketrans({"æ": "ae", "ø": "o", "å": "a"})
+
+# Lower ranks first: Danish names are what the app shows
+FIELDS = ("danish_name", "common_name", "scientific_name")
+
+EXACT, NAME_PREFIX, WORD_PREFIX, INFIX = range(4)
+
+# Results for queries this short are memoised; they match most of the index
+SHORT_QUERY_LENGTH = 2
+
+
+def normalize(text, folds=_DANISH_FOLDS):
+    """Fold case, Danish letters and accents so 'Grå Spætte' matches 'graa spaette'."""
+    text = (text or "").casefold().translate(folds)
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return " ".join("".join(c if c.isalnum() else " " for c in text).split())
+
+
+def _ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class BirdSearchIndex:
+    """Typeahead index over the Danish, English and scientific bird names.
+
+    Prefixes of every word are found by bisecting a sorted key list, infix
+    matches through 2- and 3-gram postings. Results rank exact matches first,
+    then name prefixes, word prefixes and infixes, then Danish before English
+    before scientific names, then shorter names.
+    """
+
+    def __init__(self, birds):
+        self.birds = [dict(bird) for bird in birds]
+        self._names = []  # (bird index, field rank, normalized name)
+        keys = []
+        self._grams = {}
+        self._short_results = {}
+
+        for bird_index, bird in enumerate(self.birds):
+            for rank, field in enumerate(FIELDS):
+                spellings = {normalize(bird.get(field)), normalize(bird.get(field), _SIMPLE_FOLDS)}
+                for name in filter(None, spellings):
+                    name_index = len(self._names)
+                    self._names.append((bird_index, rank, name))
+
+                    start = 0
+                    for word in name.split(" "):
+                        keys.append((name[start:], name_index))
+                        start += len(word) + 1
+                    for n in (2, 3):
+                        for gram in _ngrams(name, n):
+                            self._grams.setdefault(gram, set()).add(name_index)
+
+        keys.sort()
+        self._keys = [key for key, _ in keys]
+        self._key_names = [name_index for _, name_index in keys]
+
+    def __len__(self):
+        return len(self.birds)
+
+    def _prefix_matches(self, query):
+        position = bisect_left(self._keys, query)
+        while position < len(self._keys) and self._keys[position].startswith(query):
+            yield self._key_names[position]
+            position += 1
+
+    def _infix_matches(self, query):
+        n = min(3, len(query))
+        if n < 2:
+            return set()
+        postings = [self._grams.get(gram, set()) for gram in _ngrams(query, n)]
+        candidates = set.intersection(*sorted(postings, key=len))
+        return {i for i in candidates if query in self._names[i][2]}
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` birds matching ``query``, best first."""
+        query = normalize(query)
+        if not query:
+            return []
+        if len(query) <= SHORT_QUERY_LENGTH:
+            key = (query, limit)
+            if key not in self._short_results:
+                self._short_results[key] = self._search(query, limit)
+            return self._short_results[key]
+        return self._search(query, limit)
+
+    def _search(self, query, limit):
+        best = {}  # bird index -> rank tuple
+        def consider(name_index, kind):
+            bird_index, field_rank, name = self._names[name_index]
+            rank = (kind, field_rank, len(name), name)
+            if bird_index not in best or rank < best[bird_index]:
+                best[bird_index] = rank
+
+        for name_index in self._prefix_matches(query):
+            name = self._names[name_index][2]
+            if name == query:
+                consider(name_index, EXACT)
+            elif name.startswith(query):
+                consider(name_index, NAME_PREFIX)
+            else:
+                consider(name_index, WORD_PREFIX)
+        for name_index in self._infix_matches(query):
+            consider(name_index, INFIX)
+
+        top = heapq.nsmallest(limit, best.items(), key=lambda item: item[1])
+        return [self.birds[bird_index] for bird_index, _ in top]
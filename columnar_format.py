@@ -0,0 +1,160 @@
+"""Compact columnar encoding for observation payloads.
+
+A body is the magic bytes ``UEC1``, a little-endian uint32 header length,
+a UTF-8 JSON header and then one packed little-endian buffer per column.
+The header lists every column with its name, type, byte offset and length.
+
+Column types:
+    int32 / int64   plain integers, null is the type's minimum value
+    fixed7          int32 of value * 10^7 (lossless for DECIMAL(10, 7) coordinates)
+    float64         IEEE doubles, null is NaN
+    date32          int32 days since 1970-01-01
+    time32          int32 milliseconds since midnight
+    timestamp64     int64 microseconds since 1970-01-01 (naive, server local time)
+    bool            uint8 0/1, null is 255
+    dict            uint16 or uint32 indices into the column's "dictionary" list
+
+Clients should negotiate it with ``Accept: application/vnd.urbanechoes.columnar``;
+the API compresses the body with gzip on top of this encoding.
+"""
+import json
+import math
+import struct
+import sys
+from array import array
+from datetime import date, datetime, time, timedelta
+
+MEDIA_TYPE = "application/vnd.urbanechoes.columnar"
+MAGIC = b"UEC1"
+
+OBSERVATION_SCHEMA = [
+    ("id", "int64"),
+    ("bird_name", "dict"),
+    ("scientific_name", "dict"),
+    ("sound_directory", "dict"),
+    ("latitude", "fixed7"),
+    ("longitude", "fixed7"),
+    ("observation_date", "date32"),
+    ("observation_time", "time32"),
+    ("observer_id", "int32"),
+    ("created_at", "timestamp64"),
+    ("quantity", "int32"),
+    ("is_test_data", "bool"),
+    ("test_batch_id", "dict"),
+]
+
+INT32_NULL = -2 ** 31
+INT64_NULL = -2 ** 63
+BOOL_NULL = 255
+EPOCH_DATE = date(1970, 1, 1)
+EPOCH = datetime(1970, 1, 1)
+
+
+def _packed(typecode, values):
+    packed = array(typecode, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpacked(typecode, buffer):
+    values = array(typecode)
+    values.frombytes(buffer)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _encode_column(kind, values):
+    """Return (buffer, extra header fields) for one column."""
+    if kind == "int32":
+        return _packed("i", [INT32_NULL if v is None else v for v in values]), {}
+    if kind == "int64":
+        return _packed("q", [INT64_NULL if v is None else v for v in values]), {}
+    if kind == "fixed7":
+        return _packed("i", [INT32_NULL if v is None else round(v * 10_000_000) for v in values]), {}
+    if kind == "float64":
+        return _packed("d", [math.nan if v is None else float(v) for v in values]), {}
+    if kind == "date32":
+        return _packed("i", [INT32_NULL if v is None else (v - EPOCH_DATE).days for v in values]), {}
+    if kind == "time32":
+        return _packed("i", [
+            INT32_NULL if v is None else
+            ((v.hour * 60 + v.minute) * 60 + v.second) * 1000 + v.microsecond // 1000
+            for v in values
+        ]), {}
+    if kind == "timestamp64":
+        return _packed("q", [
+            INT64_NULL if v is None else (v.replace(tzinfo=None) - EPOCH) // timedelta(microseconds=1)
+            for v in values
+        ]), {}
+    if kind == "bool":
+        return bytes(BOOL_NULL if v is None else int(v) for v in values), {}
+    if kind == "dict":
+        dictionary = {}
+        indices = [dictionary.setdefault(v, len(dictionary)) for v in values]
+        typecode = "H" if len(dictionary) <= 0xFFFF else "I"
+        return _packed(typecode, indices), {"dictionary": list(dictionary), "index": typecode}
+    raise ValueError(f"Unknown column type {kind}")
+
+
+def _decode_column(spec, buffer):
+    kind = spec["type"]
+    if kind == "dict":
+        dictionary = spec["dictionary"]
+        return [dictionary[i] for i in _unpacked(spec["index"], buffer)]
+    if kind == "bool":
+        return [None if v == BOOL_NULL else bool(v) for v in buffer]
+    if kind == "float64":
+        return [None if math.isnan(v) else v for v in _unpacked("d", buffer)]
+    if kind in ("int64", "timestamp64"):
+        values = _unpacked("q", buffer)
+        if kind == "int64":
+            return [None if v == INT64_NULL else v for v in values]
+        return [None if v == INT64_NULL else EPOCH + timedelta(microseconds=v) for v in values]
+
+    values = _unpacked("i", buffer)
+    if kind == "int32":
+        return [None if v == INT32_NULL else v for v in values]
+    if kind == "fixed7":
+        return [None if v == INT32_NULL else v / 10_000_000 for v in values]
+    if kind == "date32":
+        return [None if v == INT32_NULL else EPOCH_DATE + timedelta(days=v) for v in values]
+    if kind == "time32":
+        return [None if v == INT32_NULL else
+                (datetime.min + timedelta(milliseconds=v)).time() for v in values]
+    raise ValueError(f"Unknown column type {kind}")
+
+
+def encode_rows(rows, schema=OBSERVATION_SCHEMA, extra=None):
+    """Encode a list of row dicts into the columnar body.
+
+    ``extra`` is an optional JSON-serialisable dict copied into the header,
+    e.g. a pagination cursor.
+    """
+    columns = []
+    buffers = []
+    offset = 0
+    for name, kind in schema:
+        buffer, fields = _encode_column(kind, [row[name] for row in rows])
+        columns.append({"name": name, "type": kind, "offset": offset, "length": len(buffer), **fields})
+        buffers.append(buffer)
+        offset += len(buffer)
+
+    header = json.dumps({"rows": len(rows), "columns": columns, **(extra or {})},
+                        separators=(",", ":"), ensure_ascii=False).encode()
+    return b"".join([MAGIC, struct.pack("<I", len(header)), header, *buffers])
+
+
+def decode_rows(body):
+    """Decode a columnar body back into (row dicts, header)."""
+    if body[:4] != MAGIC:
+        raise ValueError("Not a columnar observation payload")
+    (header_length,) = struct.unpack("<I", body[4:8])
+    header = json.loads(body[8:8 + header_length])
+    data = memoryview(body)[8 + header_length:]
+
+    names = [spec["name"] for spec in header["columns"]]
+    columns = [_decode_column(spec, data[spec["offset"]:spec["offset"] + spec["length"]].tobytes())
+               for spec in header["columns"]]
+    return [dict(zip(names, values)) for values in zip(*columns)], header
@@ -0,0 +1,92 @@
+import time
+import select
+import logging
+import threading
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseListener:
+    """One background connection that LISTENs on Postgres channels.
+
+    Callbacks registered with ``subscribe`` are called from the listener
+    thread with each notification's payload. ``on_connect`` and
+    ``on_disconnect`` callbacks let caches stop trusting themselves while
+    notifications could be missed.
+    """
+
+    def __init__(self, connect_kwargs, poll_interval=5.0, reconnect_delay=5.0):
+        self.connect_kwargs = connect_kwargs
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self._subscribers = {}  # channel -> [callback]
+        self._on_connect = []
+        self._on_disconnect = []
+        self._stop = threading.Event()
+        self._thread = None
+        self.connected = False
+
+    def subscribe(self, channel, callback):
+        self._subscribers.setdefault(channel, []).append(callback)
+
+    def on_connect(self, callback):
+        self._on_connect.append(callback)
+
+    def on_disconnect(self, callback):
+        self._on_disconnect.append(callback)
+
+    def _notify_all(self, callbacks, *args):
+        for callback in callbacks:
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"Database listener callback failed: {e!r}")
+
+    def _listen(self):
+        conn = psycopg2.connect(**self.connect_kwargs)
+        conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        try:
+            with conn.cursor() as cursor:
+                for channel in self._subscribers:
+                    cursor.execute(f'LISTEN "{channel}"')
+            self.connected = True
+            logger.info(f"Listening for database notifications on {', '.join(self._subscribers)}")
+            self._notify_all(self._on_connect)
+
+            while not self._stop.is_set():
+                if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                    # Nothing arrived; make sure the connection is still alive
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    self._notify_all(self._subscribers.get(notify.channel, []), notify.payload)
+        finally:
+            self.connected = False
+            conn.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                logger.warning(f"Database listener disconnected: {e!r}")
+            self._notify_all(self._on_disconnect)
+            self._stop.wait(self.reconnect_delay)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="database-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
@@ -0,0 +1,308 @@
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be checked out before the timeout."""
+
+
+class _ObservedCursor:
+    """Cursor mixin reporting every statement to the connection's query observers.
+
+    A named (server-side) cursor's execute only declares it, so its statement
+    is reported on close instead, with the time spent executing and fetching
+    and the number of rows fetched.
+    """
+
+    _streamed = None  # [statement, params, seconds, rows, error] until a named cursor closes
+
+    def _observed(self, run, statement, params):
+        started = time.perf_counter()
+        error = None
+        try:
+            return run()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            if self.name is not None and error is None:
+                self._streamed = [statement, params, duration, 0, None]
+            else:
+                self.connection.report(statement, params, duration, self.rowcount, error)
+
+    def _fetched(self, fetch, *args):
+        if self._streamed is None:
+            return fetch(*args)
+        started = time.perf_counter()
+        try:
+            rows = fetch(*args)
+        except Exception as e:
+            self._streamed[4] = e
+            raise
+        finally:
+            self._streamed[2] += time.perf_counter() - started
+        self._streamed[3] += len(rows) if isinstance(rows, list) else rows is not None
+        return rows
+
+    def execute(self, query, vars=None):
+        return self._observed(lambda: super(_ObservedCursor, self).execute(query, vars), query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._observed(lambda: super(_ObservedCursor, self).executemany(query, vars_list), query, None)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._observed(lambda: super(_ObservedCursor, self).copy_expert(sql, file, size), sql, None)
+
+    def fetchone(self):
+        return self._fetched(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetched(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._fetched(super().fetchall)
+
+    def __iter__(self):
+        if self._streamed is None:
+            return super().__iter__()
+        return self._iterate_streamed()
+
+    def _iterate_streamed(self):
+        # itersize rows per round trip, as psycopg2's own iteration does
+        while True:
+            rows = self.fetchmany(self.itersize)
+            if not rows:
+                return
+            yield from rows
+
+    def close(self):
+        streamed, self._streamed = self._streamed, None
+        try:
+            return super().close()
+        finally:
+            if streamed is not None:
+                self.connection.report(*streamed)
+
+
+_observed_cursor_classes = {}
+
+
+def _observed_cursor_class(factory):
+    cls = _observed_cursor_classes.get(factory)
+    if cls is None:
+        cls = _observed_cursor_classes[factory] = type(f"Observed{factory.__name__}", (_ObservedCursor, factory), {})
+    return cls
+
+
+class ObservedConnection(extensions.connection):
+    """Connection whose cursors, of whatever cursor_factory, report to ``observers``.
+
+    Each observer is called as observer(statement, params, seconds, rowcount,
+    error) after every execute, executemany and copy_expert, or when a named
+    cursor closes; rowcount is -1 where psycopg2 doesn't know it.
+    """
+
+    observers = ()
+
+    def cursor(self, *args, **kwargs):
+        if self.observers:
+            factory = kwargs.get("cursor_factory") or self.cursor_factory or extensions.cursor
+            kwargs["cursor_factory"] = _observed_cursor_class(factory)
+        return super().cursor(*args, **kwargs)
+
+    def report(self, statement, params, duration, rowcount, error):
+        for observer in self.observers:
+            try:
+                observer(statement, params, duration, rowcount, error)
+            except Exception as e:
+                logger.error(f"Query observer failed: {e!r}")
+
+
+class DatabasePool:
+    """Process-wide, bounded pool of PostgreSQL connections.
+
+    Connections are opened lazily up to ``maxconn``. A checkout waits at most
+    ``checkout_timeout`` seconds for a free slot and raises PoolTimeoutError
+    instead of hanging. Idle connections are pinged before reuse and
+    connections older than ``max_lifetime`` are recycled. Callbacks added
+    with ``add_query_observer`` see every statement run on pool connections.
+    """
+
+    def __init__(self, connect_kwargs, minconn=1, maxconn=10, checkout_timeout=5.0,
+                 max_idle=60.0, max_lifetime=1800.0):
+        if minconn > maxconn:
+            raise ValueError("minconn must not be larger than maxconn")
+        self.connect_kwargs = connect_kwargs
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.checkout_timeout = checkout_timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._idle = deque()  # (conn, created_at, last_used)
+        self._created_at = {}  # id(conn) -> created_at for checked out connections
+        self._in_use = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._query_observers = []
+        self._closed = False
+
+    def add_query_observer(self, observer):
+        """Call ``observer`` after every statement; see ObservedConnection."""
+        self._query_observers.append(observer)
+
+    def _connect(self):
+        conn = psycopg2.connect(connection_factory=ObservedConnection, **self.connect_kwargs)
+        # Shared list, so observers added later reach existing connections too
+        conn.observers = self._query_observers
+        return conn, time.monotonic()
+
+    def _is_healthy(self, conn, created_at, last_used):
+        """Return True if an idle connection can be handed out again."""
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if now - created_at > self.max_lifetime:
+            return False
+        if now - last_used > self.max_idle:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _discard(self, conn):
+        # Called without the lock held: closing can wait on the network
+        with self._lock:
+            self._discarded += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _checkout(self):
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeoutError(
+                f"No database connection available within {self.checkout_timeout}s")
+        waited = time.monotonic() - start
+
+        try:
+            conn = None
+            while True:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    conn, created_at = self._connect()
+                    break
+                if self._is_healthy(*entry):
+                    conn, created_at, _ = entry
+                    break
+                self._discard(entry[0])
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._created_at[id(conn)] = created_at
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def _release(self, conn, broken=False):
+        if not broken and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                broken = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+
+        with self._lock:
+            created_at = self._created_at.pop(id(conn), time.monotonic())
+            self._in_use -= 1
+            discard = broken or conn.closed or self._closed
+            if not discard:
+                self._idle.append((conn, created_at, time.monotonic()))
+        if discard:
+            self._discard(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection, committing on success and rolling back on error."""
+        conn = self._checkout()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            # A dropped server connection can't be trusted even if rollback succeeds
+            if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                broken = True
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+            raise
+        finally:
+            self._release(conn, broken=broken)
+
+    def warmup(self):
+        """Open connections until at least ``minconn`` are idle."""
+        opened = []
+        try:
+            for _ in range(self.minconn - len(self._idle)):
+                opened.append(self._checkout())
+        finally:
+            for conn in opened:
+                self._release(conn)
+        return len(opened)
+
+    def stats(self):
+        """Return a snapshot of pool usage for monitoring."""
+        with self._lock:
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "wait_ms_avg": round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "wait_ms_max": round(self._wait_max * 1000, 3),
+            }
+
+    def close_all(self):
+        """Close every idle connection, and the checked out ones as they are released."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, deque()
+        for conn, _, _ in idle:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
@@ -0,0 +1,181 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from observation_ingest import INSERTED, UPDATED, ingest_observations
+
+logger = logging.getLogger(__name__)
+
+EBIRD_RECENT_URL = "https://api.ebird.org/v2/data/obs/{region}/recent"
+MAX_BACK_DAYS = 30  # the most eBird's recent observations endpoint accepts
+
+
+def parse_observation(observation, taxonomy):
+    """Map one eBird recent observation to a bird_observations record, or None if unusable."""
+    species_code = observation.get("speciesCode")
+    obs_id = observation.get("obsId") or (
+        f"{observation['subId']}:{species_code}" if observation.get("subId") and species_code else None
+    )
+    if not obs_id or observation.get("lat") is None or observation.get("lng") is None:
+        return None
+    try:
+        # obsDt is "YYYY-MM-DD HH:MM", or just the date when no time was recorded
+        observed_at = datetime.fromisoformat(observation["obsDt"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    return {
+        "bird_name": taxonomy.lookup(species_code, observation.get("comName") or species_code),
+        "scientific_name": observation.get("sciName"),
+        "sound_directory": None,
+        "latitude": round(observation["lat"], 7),
+        "longitude": round(observation["lng"], 7),
+        "observation_date": observed_at.date(),
+        "observation_time": observed_at.time(),
+        "observer_id": None,
+        "quantity": observation.get("howMany") or 1,
+        "is_test_data": False,
+        "test_batch_id": None,
+        "source_id": f"ebird:{obs_id}",
+        "observed_at": observed_at,
+    }
+
+
+class EbirdImporter:
+    """Background task that copies recent eBird observations into bird_observations.
+
+    Every ``interval`` seconds each region is polled for observations since its
+    watermark in ebird_import_state, with at least ``request_interval`` seconds
+    between eBird requests. Rows are upserted on their eBird observation id, so
+    overlapping polls and several API workers never duplicate anything; a
+    region another worker imported within the last half interval is skipped.
+    """
+
+    def __init__(self, client, pool, taxonomy, api_key, regions, interval=1800.0,
+                 request_interval=1.0, max_back_days=7):
+        self.client = client
+        self.pool = pool
+        self.taxonomy = taxonomy
+        self.api_key = api_key
+        self.regions = regions
+        self.interval = interval
+        self.request_interval = request_interval
+        self.max_back_days = min(max_back_days, MAX_BACK_DAYS)
+        self._next_request_at = 0.0
+        self._task = None
+        self.runs = 0
+        self.failures = 0
+        self.inserted = 0
+        self.updated = 0
+
+    async def _throttle(self):
+        delay = self._next_request_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._next_request_at = time.monotonic() + self.request_interval
+
+    def _load_state(self, region):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            # Compared on the database clock, which every worker shares
+            cursor.execute("""
+                SELECT last_observed_at, last_run_at > LOCALTIMESTAMP - make_interval(secs => %s)
+                FROM ebird_import_state WHERE region_code = %s
+            """, (self.interval / 2, region))
+            row = cursor.fetchone()
+            cursor.close()
+        return row or (None, False)
+
+    def _back_days(self, watermark):
+        if watermark is None:
+            return self.max_back_days
+        # eBird counts whole days back from today; one extra day covers time zones
+        days = (datetime.now() - watermark).days + 2
+        return max(1, min(days, self.max_back_days))
+
+    def _store(self, region, records):
+        watermark = max((record["observed_at"] for record in records), default=None)
+        with self.pool.connection() as conn:
+            results = ingest_observations(conn, records, update_existing=True)
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO ebird_import_state (region_code, last_observed_at, last_run_at, imported_count)
+                VALUES (%s, %s, LOCALTIMESTAMP, %s)
+                ON CONFLICT (region_code) DO UPDATE SET
+                    last_observed_at = GREATEST(ebird_import_state.last_observed_at, EXCLUDED.last_observed_at),
+                    last_run_at = EXCLUDED.last_run_at,
+                    imported_count = ebird_import_state.imported_count + EXCLUDED.imported_count
+            """, (region, watermark, sum(1 for _, status in results if status == INSERTED)))
+            cursor.close()
+        return results
+
+    async def import_region(self, region):
+        """Poll one region and store what is new. Returns the number of rows inserted or updated."""
+        watermark, ran_recently = await asyncio.to_thread(self._load_state, region)
+        if ran_recently:
+            logger.info(f"Skipping eBird import for {region}; another worker just imported it")
+            return 0
+
+        await self._throttle()
+        observations = await self.client.get_json(
+            EBIRD_RECENT_URL.format(region=region),
+            headers={"X-eBirdApiToken": self.api_key},
+            params={"back": self._back_days(watermark), "includeProvisional": "true", "fmt": "json"}
+        )
+        try:
+            await self.taxonomy.get_names()
+        except Exception as e:
+            logger.warning(f"No taxonomy for the eBird import, keeping English names: {e!r}")
+
+        records = []
+        for observation in observations:
+            record = parse_observation(observation, self.taxonomy)
+            # Keep a day of overlap below the watermark for late-reviewed sightings
+            if record and (watermark is None or record["observed_at"] >= watermark - timedelta(days=1)):
+                records.append(record)
+
+        results = await asyncio.to_thread(self._store, region, records)
+        inserted = sum(1 for _, status in results if status == INSERTED)
+        updated = sum(1 for _, status in results if status == UPDATED)
+        self.inserted += inserted
+        self.updated += updated
+        logger.info(f"eBird import for {region}: {len(observations)} fetched, {inserted} inserted, {updated} updated")
+        return inserted + updated
+
+    async def run_once(self):
+        for region in self.regions:
+            try:
+                await self.import_region(region)
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"eBird import for {region} failed: {e!r}")
+        self.runs += 1
+
+    async def _run_periodically(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None and self.regions:
+            self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "regions": self.regions,
+            "running": self._task is not None,
+            "runs": self.runs,
+            "failures": self.failures,
+            "inserted": self.inserted,
+            "updated": self.updated,
+        }
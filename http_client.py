@@ -0,0 +1,97 @@
+import time
+import asyncio
+import logging
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def _httpx():
+    # httpx adds ~50ms to importing the API; only pay for it on the first upstream request
+    import httpx
+    return httpx
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream API (Xeno-canto, eBird) fails or times out."""
+
+
+class UpstreamClient:
+    """One shared async HTTP client for every upstream API call.
+
+    Connections are kept alive and reused, every request has strict
+    connect/read timeouts and each upstream host gets its own concurrency
+    limit so one slow service can't take every connection. Callbacks in
+    ``observers`` are called as observer(host, seconds, error) after every
+    request.
+    """
+
+    def __init__(self, max_connections=20, max_per_host=5, connect_timeout=3.0,
+                 read_timeout=10.0, pool_timeout=5.0):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_timeout = pool_timeout
+        self._client = None
+        self._host_limits = {}
+        self.observers = []
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            httpx = _httpx()
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(connect=self.connect_timeout, read=self.read_timeout,
+                                      write=self.read_timeout, pool=self.pool_timeout),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                follow_redirects=True
+            )
+        return self._client
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_limits[host]
+
+    async def get(self, url, **kwargs):
+        """GET ``url`` and return the response, raising UpstreamError on failure."""
+        limit = self._host_limit(url)
+        try:
+            await asyncio.wait_for(limit.acquire(), timeout=self.pool_timeout)
+        except asyncio.TimeoutError:
+            raise UpstreamError(f"Too many concurrent requests to {urlsplit(url).netloc}")
+        started = time.perf_counter()
+        error = None
+        try:
+            response = await self._get_client().get(url, **kwargs)
+            response.raise_for_status()
+            return response
+        except _httpx().HTTPError as e:
+            error = e
+            logger.warning(f"Upstream request to {url} failed: {e!r}")
+            raise UpstreamError(str(e) or type(e).__name__) from e
+        finally:
+            limit.release()
+            self._report(urlsplit(url).netloc, time.perf_counter() - started, error)
+
+    def _report(self, host, duration, error):
+        for observer in self.observers:
+            try:
+                observer(host, duration, error)
+            except Exception as e:
+                logger.error(f"Upstream observer failed: {e!r}")
+
+    async def get_json(self, url, **kwargs):
+        """GET ``url`` and decode the JSON body."""
+        response = await self.get(url, **kwargs)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise UpstreamError(f"Invalid JSON from {url}") from e
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
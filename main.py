@@ -1,17 +1,86 @@
-﻿from fastapi import FastAPI, HTTPException, Query, Depends
-import requests
-import psycopg2
+﻿from time import monotonic, perf_counter
+_import_started = perf_counter()
+
+from fastapi import FastAPI, HTTPException, Query, Depends, Request, Response
 import random
 import os
+import json
+import math
+import gzip
+import base64
+import hashlib
+import hmac
+import asyncio
 import logging
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import List, Optional
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import partial
 
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
 from psycopg2.extras import RealDictCursor
+from pydantic import BaseModel, Field
+
+import columnar_format
+import metrics
+from bird_search_index import BirdSearchIndex, normalize
+from database_listener import DatabaseListener
+from database_pool import DatabasePool, PoolTimeoutError
+from ebird_importer import EbirdImporter
+from http_client import UpstreamClient, UpstreamError
+from observation_ingest import INSERTED, ingest_observations
+from observation_stream import ObservationBroadcaster
+from taxonomy_cache import TaxonomyCache
+from recording_cache import RecordingCache
+from replica_router import ReplicaRouter
+from response_cache import ResponseCache
+from slow_query_log import SlowQueryLog
 
 load_dotenv()
 
-app = FastAPI()
+# Shared client for Xeno-canto and eBird; see http_client.py
+upstream = UpstreamClient(
+    max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 20)),
+    max_per_host=int(os.getenv("UPSTREAM_MAX_PER_HOST", 5)),
+    connect_timeout=float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", 3)),
+    read_timeout=float(os.getenv("UPSTREAM_READ_TIMEOUT", 10))
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup["imported_in"] = round(perf_counter() - _import_started, 3)
+    logger.info(f"API imported in {startup['imported_in']}s")
+    taxonomy.start()
+    observation_broadcaster.bind(asyncio.get_running_loop())
+    db_listener.start()
+    ebird_importer.start()
+    db_router.start()
+    if slow_query_log:
+        slow_query_log.start()
+    # Serve /health right away; /ready answers 200 once this finishes
+    warmup_task = asyncio.create_task(warm_up())
+    search_index_task = asyncio.create_task(refresh_bird_search_index_periodically())
+    yield
+    warmup_task.cancel()
+    search_index_task.cancel()
+    await ebird_importer.stop()
+    if slow_query_log:
+        await asyncio.to_thread(slow_query_log.stop)
+    await asyncio.to_thread(db_listener.stop)
+    await asyncio.to_thread(db_router.stop)
+    for pool in [db_pool, *replica_pools.values()]:
+        await asyncio.to_thread(pool.close_all)
+    await taxonomy.stop()
+    await upstream.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,22 +89,139 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so the timings include CORS and the whole streamed body
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Database connection function
-def get_db_connection():
-    return psycopg2.connect(
+DB_POOL_SETTINGS = dict(
+    minconn=int(os.getenv("DB_POOL_MIN", 1)),
+    maxconn=int(os.getenv("DB_POOL_MAX", 10)),
+    checkout_timeout=float(os.getenv("DB_POOL_TIMEOUT", 5)),
+    max_idle=float(os.getenv("DB_POOL_MAX_IDLE", 60)),
+    max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", 1800))
+)
+
+# Shared connection pool, opened lazily on first checkout
+db_pool = DatabasePool(
+    connect_kwargs=dict(
         user=os.getenv("DB_USER"),
         password=os.getenv("DB_PASSWORD"),
         host=os.getenv("DB_HOST"),
         port=os.getenv("DB_PORT", 5432),
         database=os.getenv("DB_NAME ", "urban_echoes_db "),
-        sslmode="require"
+        sslmode="require",
+        connect_timeout=int(os.getenv("DB_CONNECT_TIMEOUT", 10))
+    ),
+    **DB_POOL_SETTINGS
+)
+
+# Streaming replicas of DB_HOST for reads, e.g. "replica-1.example.com,replica-2.example.com:6432";
+# each gets a pool like the primary's, with the same credentials
+replica_pools = {}
+for replica in filter(None, (host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(","))):
+    replica_host, _, replica_port = replica.partition(":")
+    replica_pools[replica] = DatabasePool(
+        connect_kwargs=dict(db_pool.connect_kwargs, host=replica_host,
+                            port=replica_port or db_pool.connect_kwargs["port"]),
+        **DB_POOL_SETTINGS
     )
 
+db_router = ReplicaRouter(
+    db_pool,
+    replica_pools,
+    max_lag=float(os.getenv("DB_REPLICA_MAX_LAG", 10)),
+    check_interval=float(os.getenv("DB_REPLICA_CHECK_INTERVAL", 2))
+)
+
+for pool in [db_pool, *replica_pools.values()]:
+    pool.add_query_observer(metrics.observe_query)
+upstream.observers.append(metrics.observe_upstream)
+
+# Opt-in: set SLOW_QUERY_MS to record slower statements at /admin/slow_queries
+slow_query_log = None
+if os.getenv("SLOW_QUERY_MS"):
+    slow_query_log = SlowQueryLog(
+        db_pool.connect_kwargs,
+        threshold_ms=float(os.getenv("SLOW_QUERY_MS")),
+        sample_rate=float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", 0.1)),
+        capacity=int(os.getenv("SLOW_QUERY_LOG_SIZE", 200))
+    )
+    # Read-only endpoints run on the replicas; their statements are explained on the primary
+    db_pool.add_query_observer(slow_query_log.observe)
+    for name, pool in replica_pools.items():
+        pool.add_query_observer(partial(slow_query_log.observe, server=name))
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def require_admin(request: Request):
+    """Let a request through only with the ADMIN_TOKEN in its X-Admin-Token header."""
+    supplied = request.headers.get("X-Admin-Token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+# While _cached renders, one entry per connection it read from: the monotonic time up to which
+# that connection had all of the primary's writes. None outside of _cached
+_read_as_of = ContextVar("read_as_of", default=None)
+
+@contextmanager
+def get_db_connection(read_only=False, after=None):
+    """Check out a pooled connection, answering 503 when the pool is exhausted.
+
+    ``read_only`` work may go to a replica; ``after`` is the (created_at,
+    change_id) sync position it must already hold. See replica_router.py.
+    """
+    try:
+        with db_router.connection(read_only, after) as conn:
+            as_of = _read_as_of.get()
+            if as_of is not None:
+                as_of.append(monotonic() - conn.staleness)
+            yield conn
+    except PoolTimeoutError as e:
+        logger.warning(f"Database pool exhausted: {str(e)}")
+        raise HTTPException(status_code=503, detail="Database busy, try again shortly")
+
+# Rendered responses of the read endpoints, dropped when the tables they read change
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 256)),
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_MB", 64)) * 1024 * 1024
+)
+
+# The cache is only trusted while notifications can reach it
+db_listener = DatabaseListener(db_pool.connect_kwargs)
+db_listener.subscribe("table_changes", response_cache.invalidate)
+db_listener.on_connect(lambda: response_cache.set_enabled(True))
+db_listener.on_disconnect(lambda: response_cache.set_enabled(False))
+
+# Fans inserted rows out to /observations/live streams; see observation_stream.py
+observation_broadcaster = ObservationBroadcaster(
+    max_subscribers=int(os.getenv("LIVE_MAX_SUBSCRIBERS", 1000)),
+    max_queue=int(os.getenv("LIVE_MAX_QUEUE", 1000))
+)
+db_listener.subscribe("observation_inserts", observation_broadcaster.publish)
+db_listener.on_disconnect(observation_broadcaster.disconnect_all)
+
+# Numbers the pool, cache and broadcaster already keep, read at scrape time
+metrics.REGISTRY.gauge("db_pool_connections", "Pooled database connections by state.",
+                       lambda: {state: db_pool.stats()[state] for state in ("in_use", "idle")}, "state")
+metrics.REGISTRY.gauge("db_pool_checkout_timeouts", "Checkouts that timed out waiting for a connection so far.",
+                       lambda: db_pool.stats()["timeouts"])
+metrics.REGISTRY.gauge("db_replica_healthy", "Whether each read replica passed its last check.",
+                       lambda: {r["name"]: int(r["healthy"]) for r in db_router.stats()["replicas"]}, "replica")
+metrics.REGISTRY.gauge("db_replica_staleness_seconds", "How far each read replica may trail the primary.",
+                       lambda: {r["name"]: r["staleness_seconds"] for r in db_router.stats()["replicas"]
+                                if r["staleness_seconds"] is not None}, "replica")
+metrics.REGISTRY.gauge("db_replica_fallback_reads", "Reads sent to the primary because no replica qualified so far.",
+                       lambda: db_router.stats()["fallbacks"])
+metrics.REGISTRY.gauge("response_cache_entries", "Responses held in the response cache.",
+                       lambda: response_cache.stats()["entries"])
+metrics.REGISTRY.gauge("response_cache_bytes", "Bytes held in the response cache.",
+                       lambda: response_cache.stats()["bytes"])
+metrics.REGISTRY.gauge("live_subscribers", "Open /observations/live streams.",
+                       lambda: observation_broadcaster.stats()["subscribers"])
+
 EBIRD_API_URL = "https://api.ebird.org/v2/data/obs/geo/recent"
 EBIRD_TAXONOMY_URL = "https://api.ebird.org/v2/ref/taxonomy/ebird"
 XENO_CANTO_API = "https://www.xeno-canto.org/api/2/recordings"
@@ -51,127 +237,1141 @@ if not DATABASE_URL:
 LAT = 56.2639 # Copenhagen coordinates TODO change to your location
 LON = 9.5018 # Copenhagen coordinates  TODO change to your location
 
-async def get_danish_taxonomy():
-    """Fetch the eBird taxonomy with Danish names."""
+OBSERVATION_COLUMNS = """id, bird_name, scientific_name, sound_directory, latitude, longitude, 
+                       observation_date, observation_time, observer_id, created_at, 
+                       quantity, is_test_data, test_batch_id"""
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+MAX_NEARBY_RADIUS_M = 50000
+
+MAX_PAGE_SIZE = 5000
+EXPORT_FETCH_SIZE = 2000  # rows per round trip on the server-side export cursor
+
+# created_at is the inserting transaction's start time, so rows can become visible
+# out of order. Sync tokens never move past rows younger than this many seconds.
+SYNC_SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", 5))
+
+async def fetch_danish_taxonomy():
+    """Download the eBird taxonomy with Danish names."""
     headers = {"X-eBirdApiToken": EBIRD_API_KEY}
     params = {
         "fmt": "json",
         "locale": "da"  # Request Danish names
     }
+    taxonomy_data = await upstream.get_json(EBIRD_TAXONOMY_URL, headers=headers, params=params)
     
+    # Create a mapping of species codes to Danish names
+    return {species["speciesCode"]: species["comName"] for species in taxonomy_data}
+
+# Loaded from disk at startup and refreshed in the background; see taxonomy_cache.py
+taxonomy = TaxonomyCache(
+    fetch=fetch_danish_taxonomy,
+    path=os.getenv("TAXONOMY_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "ebird_taxonomy_da.json")),
+    ttl=float(os.getenv("TAXONOMY_TTL_HOURS", 24)) * 3600
+)
+
+# Polls eBird for EBIRD_IMPORT_REGIONS (e.g. "DK,SE-M") into bird_observations; off when empty
+ebird_importer = EbirdImporter(
+    client=upstream,
+    pool=db_pool,
+    taxonomy=taxonomy,
+    api_key=EBIRD_API_KEY,
+    regions=[region.strip() for region in os.getenv("EBIRD_IMPORT_REGIONS", "").split(",") if region.strip()],
+    interval=float(os.getenv("EBIRD_IMPORT_INTERVAL_MINUTES", 30)) * 60,
+    request_interval=float(os.getenv("EBIRD_IMPORT_REQUEST_INTERVAL", 1)),
+    max_back_days=int(os.getenv("EBIRD_IMPORT_MAX_BACK_DAYS", 7))
+)
+
+async def get_danish_taxonomy():
+    """Species code -> Danish name mapping, served from the taxonomy cache."""
     try:
-        response = requests.get(EBIRD_TAXONOMY_URL, headers=headers, params=params)
-        response.raise_for_status()
-        taxonomy_data = response.json()
-        
-        # Create a mapping of species codes to Danish names
-        return {species["speciesCode"]: species["comName"] for species in taxonomy_data}
-    except requests.exceptions.RequestException as e:
+        return await taxonomy.get_names()
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail=f"Error fetching taxonomy: {str(e)}")
     
-@app.get("/observations")
-def get_observations(after_timestamp: str = Query(None, description="Fetch only observations created after this timestamp")):
-    """Fetch bird observations from the database, with optional filtering by timestamp."""
+
+def _json_default(value):
+    """Encode the Postgres types psycopg2 hands back the same way FastAPI does."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_entry(payload, headers=None):
+    """Render ``payload`` like FastAPI would, as a (body, media type, headers) entry."""
+    body = json.dumps(payload, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode()
+    return body, "application/json", headers or {}
+
+
+def _accept_qualities(accept):
+    """{media range: q} of an Accept header; entries with a malformed q are left out."""
+    qualities = {}
+    for item in accept.split(","):
+        media_range, *parameters = [part.strip() for part in item.split(";")]
+        if not media_range:
+            continue
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = None
+        if quality is not None:
+            qualities[media_range.lower()] = quality
+    return qualities
+
+
+def _wants_columnar(request):
+    """True if Accept names the columnar media type with a q above 0 and no lower than JSON's."""
+    qualities = _accept_qualities(request.headers.get("accept", ""))
+    columnar = qualities.get(columnar_format.MEDIA_TYPE, 0.0)
+    # JSON's q is that of its most specific range; */* alone never selects columnar
+    as_json = next((qualities[media_range] for media_range in ("application/json", "application/*", "*/*")
+                    if media_range in qualities), 0.0)
+    return columnar > 0 and columnar >= as_json
+
+
+def _columnar_entry(rows, schema=columnar_format.OBSERVATION_SCHEMA, extra=None):
+    """Render rows in the gzip-compressed columnar encoding from columnar_format.py."""
+    body = gzip.compress(columnar_format.encode_rows(rows, schema, extra), compresslevel=6)
+    return body, columnar_format.MEDIA_TYPE, {"Content-Encoding": "gzip", "Vary": "Accept"}
+
+
+def _columnar_response(rows, schema=columnar_format.OBSERVATION_SCHEMA, extra=None):
+    body, media_type, headers = _columnar_entry(rows, schema, extra)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def _cached(key, tables, render):
+    """Serve a response from the response cache, calling ``render()`` on a miss.
+
+    ``render`` returns a (body, media type, headers) entry and ``tables`` lists
+    every table it reads, so a write to any of them drops the entry.
+    """
+    entry = response_cache.get(key)
+    if entry is None:
+        snapshot = response_cache.begin(tables)
+        reads = _read_as_of.set([])
+        try:
+            entry = render()
+            as_of = min(_read_as_of.get(), default=None)
+        finally:
+            _read_as_of.reset(reads)
+        response_cache.put(key, entry, snapshot, len(entry[0]), as_of)
+    body, media_type, headers = entry
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def _cached_stream(key, tables, open_stream, media_type, headers):
+    """Like _cached, for bodies that are streamed while they are read.
+
+    ``open_stream()`` returns (chunks, resources) as _stream_json_rows does. A
+    complete body small enough for the cache is stored once streamed.
+    """
+    entry = response_cache.get(key)
+    if entry is not None:
+        body, media_type, headers = entry
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    snapshot = response_cache.begin(tables)
+    reads = _read_as_of.set([])
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        if after_timestamp:
-            # If timestamp is provided, only get observations created after that time
-            cursor.execute("""
-                SELECT id, bird_name, scientific_name, sound_directory, latitude, longitude, 
-                       observation_date, observation_time, observer_id, created_at, 
-                       quantity, is_test_data, test_batch_id
-                FROM bird_observations
-                WHERE created_at > %s
-                ORDER BY created_at ASC
-            """, (after_timestamp,))
-            
-            logger.info(f"Fetching observations created after {after_timestamp}")
+        chunks, resources = open_stream()
+        as_of = min(_read_as_of.get(), default=None)
+    finally:
+        _read_as_of.reset(reads)
+    max_size = response_cache.max_bytes // 4
+
+    def tee():
+        parts, size = [], 0
+        for chunk in chunks:
+            if parts is not None:
+                size += len(chunk)
+                if size <= max_size:
+                    parts.append(chunk)
+                else:
+                    parts = None
+            yield chunk
+        if parts is not None:
+            response_cache.put(key, (b"".join(parts), media_type, headers), snapshot, size, as_of)
+
+    return StreamingResponse(tee(), media_type=media_type, headers=headers,
+                             background=BackgroundTask(resources.close))
+
+
+def _encode_token(*parts):
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_token(token, part_count):
+    raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+    parts = raw.split("|")
+    if len(parts) != part_count:
+        raise ValueError("Wrong number of token parts")
+    return parts
+
+
+def encode_cursor(created_at, observation_id):
+    """Encode a (created_at, id) keyset position as an opaque token."""
+    return _encode_token(created_at.isoformat(), observation_id)
+
+
+def decode_cursor(token):
+    """Decode a token from encode_cursor, answering 400 if it is malformed."""
+    try:
+        created_at, observation_id = _decode_token(token, 2)
+        return datetime.fromisoformat(created_at), int(observation_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_sync_token(created_at, observation_id, change_id):
+    """Encode how far a client has synced: the last (created_at, id) and change log entry."""
+    return _encode_token("v1", created_at.isoformat() if created_at else None, observation_id, change_id)
+
+
+def decode_sync_token(token):
+    """Decode a token from encode_sync_token, answering 400 if it is malformed."""
+    try:
+        version, created_at, observation_id, change_id = _decode_token(token, 4)
+        if version != "v1":
+            raise ValueError(f"Unknown sync token version {version}")
+        if not created_at:
+            return None, None, int(change_id)
+        return datetime.fromisoformat(created_at), int(observation_id), int(change_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+
+class Season(str, Enum):
+    spring = "spring"
+    summer = "summer"
+    autumn = "autumn"
+    winter = "winter"
+    all = "all"
+
+
+# Month-day (MMDD) ranges matching SeasonService in the app; winter wraps around New Year
+SEASON_RANGES = {
+    Season.spring: (301, 531),
+    Season.summer: (601, 831),
+    Season.autumn: (901, 1130),
+    Season.winter: (1201, 229),
+}
+
+
+def _month_day(value, name):
+    """Parse an "MM-DD" query value into the MMDD integer observation_month_day() returns."""
+    try:
+        month, day = (int(part) for part in value.split("-"))
+        date(2000, month, day)  # a leap year, so 02-29 is allowed
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a MM-DD day of the year")
+    return month * 100 + day
+
+
+def observation_filters(
+    season: Season = Query(None, description="Only observations made in this season, in any year"),
+    from_day: str = Query(None, description="First day of the year to include, as MM-DD"),
+    to_day: str = Query(None, description="Last day of the year to include, as MM-DD"),
+    from_time: time = Query(None, description="Start of the time-of-day window"),
+    to_time: time = Query(None, description="End of the time-of-day window (exclusive)"),
+    scientific_name: str = Query(None, description="Only return this species")
+):
+    """Season, day-of-year, time-of-day and species filters shared by the observation endpoints.
+
+    Day and time ranges whose start is after their end wrap around, so
+    12-01..02-28 or 22:00..04:00 work as expected.
+    """
+    day_range = None
+    if season and season != Season.all:
+        day_range = SEASON_RANGES[season]
+    if from_day or to_day:
+        if day_range:
+            raise HTTPException(status_code=400, detail="Use either season or from_day/to_day")
+        day_range = (_month_day(from_day or "01-01", "from_day"), _month_day(to_day or "12-31", "to_day"))
+    time_range = (from_time or time.min, to_time) if from_time or to_time else None
+    return {"day_range": day_range, "time_range": time_range, "scientific_name": scientific_name}
+
+
+def _range_condition(expression, low, high, upper_operator, wraps):
+    if wraps:
+        return f"({expression} >= {low} OR {expression} {upper_operator} {high})"
+    return f"{expression} >= {low} AND {expression} {upper_operator} {high}"
+
+
+def _filter_conditions(filters, params):
+    """SQL conditions for observation_filters(); adds their values to the ``params`` dict.
+
+    The expressions match idx_bird_observations_month_day_time and
+    idx_bird_observations_species_date so the planner can use them.
+    """
+    conditions = []
+    if filters["day_range"]:
+        from_day, to_day = params["from_day"], params["to_day"] = filters["day_range"]
+        conditions.append(_range_condition(
+            "observation_month_day(observation_date)", "%(from_day)s", "%(to_day)s", "<=", from_day > to_day
+        ))
+    if filters["time_range"]:
+        from_time, to_time = params["from_time"], params["to_time"] = filters["time_range"]
+        if to_time is None:
+            conditions.append("observation_time >= %(from_time)s")
         else:
-            # Otherwise, get all observations
-            cursor.execute("""
-                SELECT id, bird_name, scientific_name, sound_directory, latitude, longitude, 
-                       observation_date, observation_time, observer_id, created_at, 
-                       quantity, is_test_data, test_batch_id
-                FROM bird_observations
-                ORDER BY created_at ASC
-            """)
-            
-            logger.info("Fetching all observations")
-        
-        observations = cursor.fetchall()
-        logger.info(f"Returning {len(observations)} observations")
-        
-        cursor.close()
-        conn.close()
-        
-        return {"observations": observations}
+            conditions.append(_range_condition(
+                "observation_time", "%(from_time)s", "%(to_time)s", "<", from_time > to_time
+            ))
+    if filters["scientific_name"]:
+        params["scientific_name"] = filters["scientific_name"]
+        conditions.append("scientific_name = %(scientific_name)s")
+    return conditions
+
+
+@app.get("/observations")
+def get_observations(
+    request: Request,
+    after_timestamp: str = Query(None, description="Fetch only observations created after this timestamp"),
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables keyset pagination"),
+    cursor: str = Query(None, description="next_cursor from the previous page"),
+    filters: dict = Depends(observation_filters)
+):
+    """Fetch bird observations from the database, with optional filtering by timestamp.
+
+    Without ``limit`` or ``cursor`` every matching row is returned at once. With
+    them, pages are ordered by (created_at, id) and ``next_cursor`` points at the
+    next page, or is null on the last one. Clients that send the columnar media
+    type in Accept get columnar_format.py's encoding instead of JSON. See
+    observation_filters() for the season, day, time and species filters.
+    """
+    columnar = _wants_columnar(request)
+    paginated = limit is not None or cursor is not None
+    key = ("observations", after_timestamp, limit, cursor, columnar, tuple(sorted(filters.items())))
+    try:
+        if columnar:
+            return _cached(key, ("bird_observations",),
+                           lambda: _render_observations_columnar(after_timestamp, limit, cursor, filters))
+        if paginated:
+            return _cached(key, ("bird_observations",),
+                           lambda: _render_observation_page(after_timestamp, limit, cursor, filters))
+        return _cached_stream(key, ("bird_observations",),
+                              lambda: _stream_all_observations(after_timestamp, filters),
+                              "application/json", {"Vary": "Accept"})
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching observations: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 
-@app.get("/birds")
-def get_birds():
+def _observation_conditions(after_timestamp, cursor, filters):
+    params = {}
+    conditions = _filter_conditions(filters, params)
+    if after_timestamp:
+        # If timestamp is provided, only get observations created after that time
+        conditions.append("created_at > %(after_timestamp)s")
+        params["after_timestamp"] = after_timestamp
+    if cursor:
+        conditions.append("(created_at, id) > (%(cursor_created_at)s, %(cursor_id)s)")
+        params["cursor_created_at"], params["cursor_id"] = decode_cursor(cursor)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where, params
+
+
+def observation_page_query(after_timestamp, limit, cursor, filters):
+    """(statement, params) of one keyset page of /observations as JSON; see _render_observation_page.
+
+    Also run by benchmarks/suite.py, so it measures what the API runs.
+    """
+    where, params = _observation_conditions(after_timestamp, cursor, filters)
+    page_size = limit or MAX_PAGE_SIZE
+    params.update(page_size=page_size, limit=page_size + 1)
+    return f"""
+            SELECT COALESCE(json_agg(p.observation ORDER BY p.position) FILTER (WHERE p.position <= %(page_size)s), '[]')::text,
+                   count(*) > %(page_size)s,
+                   max(p.created_at) FILTER (WHERE p.position = %(page_size)s),
+                   max(p.id) FILTER (WHERE p.position = %(page_size)s)
+            FROM (
+                SELECT row_to_json(o) AS observation, o.created_at, o.id,
+                       row_number() OVER (ORDER BY o.created_at, o.id) AS position
+                FROM (
+                    SELECT {OBSERVATION_COLUMNS}
+                    FROM bird_observations
+                    {where}
+                    ORDER BY created_at ASC, id ASC
+                    LIMIT %(limit)s
+                ) o
+            ) p
+        """, params
+
+
+def _render_observation_page(after_timestamp, limit, cursor, filters):
+    """One keyset page as JSON, assembled by Postgres with json_agg.
+
+    Fetches one extra row to learn whether another page follows; the body is a
+    single text value, so no Python object is built per row.
+    """
+    page_size = limit or MAX_PAGE_SIZE
+    with get_db_connection(read_only=True) as conn:
+        db_cursor = conn.cursor()
+        db_cursor.execute(*observation_page_query(after_timestamp, limit, cursor, filters))
+        observations, has_more, last_created_at, last_id = db_cursor.fetchone()
+        db_cursor.close()
+
+    next_cursor = encode_cursor(last_created_at, last_id) if has_more else None
+    logger.info(f"Returning a page of up to {page_size} observations")
+    body = f'{{"observations":{observations},"next_cursor":{json.dumps(next_cursor)}}}'.encode()
+    return body, "application/json", {"Vary": "Accept"}
+
+
+def _stream_all_observations(after_timestamp, filters):
+    where, params = _observation_conditions(after_timestamp, None, filters)
+    logger.info(f"Streaming observations created after {after_timestamp}" if after_timestamp else "Streaming all observations")
+    return _stream_json_rows(f"""
+        SELECT row_to_json(o)::text
+        FROM (
+            SELECT {OBSERVATION_COLUMNS}
+            FROM bird_observations
+            {where}
+            ORDER BY created_at ASC, id ASC
+        ) o
+    """, params, "observations_stream", prefix='{"observations":[', separator=",", suffix="]}")
+
+
+def observation_rows_query(after_timestamp, limit, cursor, filters):
+    """(statement, params) of the rows the columnar /observations encodes.
+
+    A page fetches one extra row to learn whether another page follows.
+    """
+    where, params = _observation_conditions(after_timestamp, cursor, filters)
+    if limit is None and cursor is None:
+        return f"""
+            SELECT {OBSERVATION_COLUMNS}
+            FROM bird_observations
+            {where}
+            ORDER BY created_at ASC, id ASC
+        """, params
+    params["limit"] = (limit or MAX_PAGE_SIZE) + 1
+    return f"""
+            SELECT {OBSERVATION_COLUMNS}
+            FROM bird_observations
+            {where}
+            ORDER BY created_at ASC, id ASC
+            LIMIT %(limit)s
+        """, params
+
+
+def _render_observations_columnar(after_timestamp, limit, cursor, filters):
+    paginated = limit is not None or cursor is not None
+    page_size = limit or MAX_PAGE_SIZE
+
+    with get_db_connection(read_only=True) as conn:
+        db_cursor = conn.cursor(cursor_factory=RealDictCursor)
+        db_cursor.execute(*observation_rows_query(after_timestamp, limit, cursor, filters))
+        observations = db_cursor.fetchall()
+        db_cursor.close()
+
+    logger.info(f"Returning {len(observations)} observations")
+    if not paginated:
+        return _columnar_entry(observations)
+    next_cursor = None
+    if len(observations) > page_size:
+        observations = observations[:page_size]
+        last = observations[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return _columnar_entry(observations, extra={"next_cursor": next_cursor})
+
+
+def _stream_json_rows(query, params, name, prefix="", separator="", suffix=""):
+    """Stream the JSON text rows of ``query`` through a server-side cursor.
+
+    ``query`` selects one text column, typically row_to_json(...)::text, so
+    rows go to the socket as Postgres rendered them. Returns (chunks,
+    resources); the connection is checked out here so an exhausted pool is
+    still a clean 503, and ``resources.close()`` returns it if the client
+    disconnects before the first chunk.
+    """
+    resources = ExitStack()
+    conn = resources.enter_context(get_db_connection(read_only=True))
+
+    def generate():
+        # Closed even when the client goes away mid-stream, which is when the
+        # query observers hear about it
+        with resources, conn.cursor(name=name) as db_cursor:
+            db_cursor.itersize = EXPORT_FETCH_SIZE
+            db_cursor.execute(query, params)
+            yield prefix.encode()
+            rows = 0
+            while True:
+                chunk = db_cursor.fetchmany(EXPORT_FETCH_SIZE)
+                if not chunk:
+                    break
+                text = separator.join(row[0] for row in chunk)
+                yield (separator + text if rows else text).encode()
+                rows += len(chunk)
+            yield suffix.encode()
+            logger.info(f"Streamed {rows} observations")
+
+    return generate(), resources
+
+
+@app.get("/observations/export")
+def export_observations(after_timestamp: str = Query(None, description="Export only observations created after this timestamp")):
+    """Stream every observation as newline-delimited JSON.
+
+    Rows are read through a server-side cursor EXPORT_FETCH_SIZE at a time, so
+    the API never holds the whole table in memory.
+    """
+    where = "WHERE created_at > %(after_timestamp)s" if after_timestamp else ""
+    # Postgres renders each line, newline included
+    chunks, resources = _stream_json_rows(f"""
+        SELECT row_to_json(o)::text || E'\\n'
+        FROM (
+            SELECT {OBSERVATION_COLUMNS}
+            FROM bird_observations
+            {where}
+            ORDER BY created_at ASC, id ASC
+        ) o
+    """, {"after_timestamp": after_timestamp}, "observations_export")
+
+    # Closing twice is harmless; this covers clients that disconnect before the first chunk
+    return StreamingResponse(chunks, media_type="application/x-ndjson",
+                             background=BackgroundTask(resources.close))
+
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", 10000))
+
+
+class ObservationIn(BaseModel):
+    """One observation as the app records it; mirrors BirdObservation."""
+    bird_name: str = Field(..., max_length=255)
+    scientific_name: Optional[str] = Field(None, max_length=255)
+    sound_directory: Optional[str] = None
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    observation_date: date
+    observation_time: time
+    observer_id: Optional[int] = None
+    quantity: int = 1
+    is_test_data: bool = False
+    test_batch_id: Optional[str] = Field(None, max_length=50)
+    source_id: Optional[str] = Field(None, max_length=255)
+
+
+class ObservationBatch(BaseModel):
+    observations: List[ObservationIn] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+@app.post("/observations/batch")
+def ingest_observation_batch(batch: ObservationBatch):
+    """Insert many observations in one request.
+
+    Records whose source_id is already stored (or repeated earlier in the
+    batch) are not inserted again; the response lists, in request order, the
+    id each record ended up with and whether it was inserted or a duplicate.
+    """
+    records = [observation.model_dump() for observation in batch.observations]
+    try:
+        with get_db_connection() as conn:
+            results = ingest_observations(conn, records)
+
+        inserted = sum(1 for _, status in results if status == INSERTED)
+        logger.info(f"Ingested batch of {len(records)} observations: {inserted} inserted, {len(records) - inserted} duplicates")
+        return {
+            "results": [{"id": observation_id, "status": status} for observation_id, status in results],
+            "inserted": inserted,
+            "duplicates": len(records) - inserted
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error ingesting observation batch: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@app.get("/observations/sync")
+def sync_observations(
+    request: Request,
+    response: Response,
+    token: str = Query(None, description="next_token from the previous sync; omit for a full sync"),
+    limit: int = Query(1000, ge=1, le=MAX_PAGE_SIZE, description="Maximum new observations and changes per call")
+):
+    """Incremental sync for clients that keep a local copy of the observations.
+
+    Returns observations created or edited since ``token``, the ids of deleted
+    ones and a ``next_token`` to send on the next call. Keep calling while
+    ``has_more`` is true. Clients should upsert by id, because rows close to
+    the settle window can be sent twice. Send the ETag back in If-None-Match to
+    get a bodiless 304 while nothing has changed.
+    """
+    created_at, observation_id, change_id = decode_sync_token(token) if token else (None, None, None)
+
+    try:
+        # A replica that hasn't caught up with the token's position is skipped
+        with get_db_connection(read_only=True, after=(created_at, change_id)) as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            # On a replica, rows may still be missing for as long as it trails the primary
+            cursor.execute("SELECT LOCALTIMESTAMP - make_interval(secs => %s) AS cutoff",
+                           (SYNC_SETTLE_SECONDS + conn.staleness,))
+            cutoff = cursor.fetchone()["cutoff"]
+
+            if change_id is None:
+                # A full sync already contains every edit made so far
+                cursor.execute("""
+                    SELECT COALESCE(MAX(change_id), 0) AS change_id
+                    FROM observation_changes
+                    WHERE changed_at <= %s
+                """, (cutoff,))
+                change_id = cursor.fetchone()["change_id"]
+
+            if created_at is None:
+                cursor.execute(f"""
+                    SELECT {OBSERVATION_COLUMNS}
+                    FROM bird_observations
+                    ORDER BY created_at ASC, id ASC
+                    LIMIT %s
+                """, (limit,))
+            else:
+                cursor.execute(f"""
+                    SELECT {OBSERVATION_COLUMNS}
+                    FROM bird_observations
+                    WHERE (created_at, id) > (%s, %s)
+                    ORDER BY created_at ASC, id ASC
+                    LIMIT %s
+                """, (created_at, observation_id, limit))
+            observations = cursor.fetchall()
+
+            cursor.execute("""
+                SELECT change_id, observation_id, changed_at
+                FROM observation_changes
+                WHERE change_id > %s
+                ORDER BY change_id ASC
+                LIMIT %s
+            """, (change_id, limit))
+            changes = cursor.fetchall()
+
+            changed_ids = list({change["observation_id"] for change in changes})
+            edited = []
+            if changed_ids:
+                cursor.execute(f"""
+                    SELECT {OBSERVATION_COLUMNS}
+                    FROM bird_observations
+                    WHERE id = ANY(%s)
+                """, (changed_ids,))
+                edited = cursor.fetchall()
+            cursor.close()
+
+        # Only move the token past rows and changes that are old enough to be final
+        row_position, sent_change_id = (created_at, observation_id), change_id
+        for row in observations:
+            if row["created_at"] > cutoff:
+                break
+            created_at, observation_id = row["created_at"], row["id"]
+        for change in changes:
+            if change["changed_at"] > cutoff:
+                break
+            change_id = change["change_id"]
+
+        returned_ids = {row["id"] for row in observations}
+        observations.extend(row for row in edited if row["id"] not in returned_ids)
+        edited_ids = {row["id"] for row in edited}
+        deleted = sorted(i for i in changed_ids if i not in edited_ids)
+
+        next_token = encode_sync_token(created_at, observation_id, change_id)
+        fingerprint = f"{next_token}:{sorted(row['id'] for row in observations)}:{deleted}"
+        etag = f'"{hashlib.sha1(fingerprint.encode()).hexdigest()}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        response.headers["ETag"] = etag
+        logger.info(f"Sync returning {len(observations)} observations and {len(deleted)} deletions")
+        return {
+            "observations": observations,
+            "deleted": deleted,
+            "next_token": next_token,
+            # A full page newer than the cutoff leaves the token where it was; asking
+            # again before the settle window passes would only return the same page
+            "has_more": (len(returned_ids) == limit and (created_at, observation_id) != row_position)
+                        or (len(changes) == limit and change_id != sent_change_id)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error syncing observations: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+LIVE_KEEPALIVE_SECONDS = 15
+LIVE_CATCHUP_PAGE = 1000
+
+
+def _live_catchup(after, bbox, scientific_name):
+    """Observations after the (created_at, id) position ``after``, as raw row JSON like the NOTIFY payloads."""
+    conditions = ["(created_at, id) > (%(created_at)s, %(id)s)"]
+    params = {"created_at": after[0], "id": after[1], "limit": LIVE_CATCHUP_PAGE}
+    if bbox:
+        conditions.append("point(longitude::float8, latitude::float8) <@ box(point(%(min_lon)s, %(min_lat)s), point(%(max_lon)s, %(max_lat)s))")
+        params["min_lat"], params["min_lon"], params["max_lat"], params["max_lon"] = bbox
+    if scientific_name:
+        conditions.append("scientific_name = %(scientific_name)s")
+        params["scientific_name"] = scientific_name
+
+    # From the primary: a replica could miss rows whose notifications were already sent
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT o.id, o.created_at, row_to_json(o)::text
+            FROM bird_observations o
+            WHERE {" AND ".join(conditions)}
+            ORDER BY created_at ASC, id ASC
+            LIMIT %(limit)s
+        """, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+
+def _sse_event(created_at, observation_id, payload):
+    return f"id: {encode_cursor(created_at, observation_id)}\nevent: observation\ndata: {payload}\n\n"
+
+
+@app.get("/observations/live")
+async def stream_live_observations(
+    request: Request,
+    min_lat: float = Query(None, ge=-90, le=90, description="South edge of the area to watch"),
+    min_lon: float = Query(None, ge=-180, le=180, description="West edge of the area to watch"),
+    max_lat: float = Query(None, ge=-90, le=90, description="North edge of the area to watch"),
+    max_lon: float = Query(None, ge=-180, le=180, description="East edge of the area to watch"),
+    scientific_name: str = Query(None, description="Only stream this species"),
+    cursor: str = Query(None, description="Resume after this event id; browsers send Last-Event-ID instead")
+):
+    """Server-Sent Events stream of newly inserted observations.
+
+    Every event's id is a keyset cursor. Reconnecting with it (Last-Event-ID or
+    ``cursor``) first replays what was inserted in between, then continues
+    live. The replay also repeats rows from the SYNC_SETTLE_SECONDS before the
+    cursor, which may have committed after it, so clients should skip ids
+    they already have. New rows arrive through the one shared LISTEN connection, so open
+    streams cost no queries. A client that falls too far behind is
+    disconnected and catches up the same way.
+    """
+    edges = (min_lat, min_lon, max_lat, max_lon)
+    if any(edge is None for edge in edges) and not all(edge is None for edge in edges):
+        raise HTTPException(status_code=400, detail="Give all of min_lat, min_lon, max_lat and max_lon, or none")
+    bbox = None if min_lat is None else edges
+    resume_from = cursor or request.headers.get("last-event-id")
+    after = decode_cursor(resume_from) if resume_from else None
+
+    subscription = observation_broadcaster.subscribe(bbox, scientific_name)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many live streams, try again later")
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            # Subscribed before catching up, so nothing inserted meanwhile is lost;
+            # rows the catch-up already sent are skipped when they come by live.
+            # Rows commit out of created_at order, so the catch-up starts
+            # SYNC_SETTLE_SECONDS before the cursor and sends those rows again
+            replayed = set()
+            position = None
+            if after is not None:
+                replayed.add(after[1])
+                position = (after[0] - timedelta(seconds=SYNC_SETTLE_SECONDS), 0)
+            while position is not None:
+                rows = await asyncio.to_thread(_live_catchup, position, bbox, scientific_name)
+                for observation_id, created_at, payload in rows:
+                    if observation_id not in replayed:
+                        replayed.add(observation_id)
+                        yield _sse_event(created_at, observation_id, payload)
+                position = (rows[-1][1], rows[-1][0]) if len(rows) == LIVE_CATCHUP_PAGE else None
+
+            while not subscription.closed:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                row, payload = event
+                if row["id"] not in replayed:
+                    yield _sse_event(datetime.fromisoformat(row["created_at"]), row["id"], payload)
+        except Exception as e:
+            logger.error(f"Error streaming live observations: {str(e)}")
+        finally:
+            observation_broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _bounding_boxes(lat, lon, radius):
+    """Return the (min_lon, min_lat, max_lon, max_lat) boxes enclosing a circle of ``radius`` metres.
+
+    One box, or two where the circle crosses the antimeridian: one on either
+    side of it.
+    """
+    dlat = radius / METERS_PER_DEGREE_LAT
+    min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    cos_lat = math.cos(math.radians(lat))
+    # Around a pole a longitude span is meaningless, so take all of it
+    if cos_lat < 1e-6 or max_lat == 90.0 or min_lat == -90.0:
+        return [(-180.0, min_lat, 180.0, max_lat)]
+    dlon = radius / (METERS_PER_DEGREE_LAT * cos_lat)
+    if dlon >= 180.0:
+        return [(-180.0, min_lat, 180.0, max_lat)]
+    if lon - dlon < -180.0:
+        return [(lon - dlon + 360.0, min_lat, 180.0, max_lat), (-180.0, min_lat, lon + dlon, max_lat)]
+    if lon + dlon > 180.0:
+        return [(lon - dlon, min_lat, 180.0, max_lat), (-180.0, min_lat, lon + dlon - 360.0, max_lat)]
+    return [(lon - dlon, min_lat, lon + dlon, max_lat)]
+
+
+def nearby_query(lat, lon, radius, limit, filters):
+    """(statement, params) of /observations/nearby, nearest first."""
+    params = {"lat": lat, "lon": lon, "radius": radius, "limit": limit, "earth_radius": EARTH_RADIUS_M}
+    boxes = []
+    for i, box in enumerate(_bounding_boxes(lat, lon, radius)):
+        params[f"min_lon{i}"], params[f"min_lat{i}"], params[f"max_lon{i}"], params[f"max_lat{i}"] = box
+        boxes.append(f"point(longitude::float8, latitude::float8) <@ "
+                     f"box(point(%(min_lon{i})s, %(min_lat{i})s), point(%(max_lon{i})s, %(max_lat{i})s))")
+    conditions = [f"({' OR '.join(boxes)})"]
+    conditions.extend(_filter_conditions(filters, params))
+    return f"""
+        SELECT * FROM (
+            SELECT {OBSERVATION_COLUMNS},
+                   2 * %(earth_radius)s * asin(least(1.0, sqrt(
+                       power(sin(radians(latitude - %(lat)s) / 2), 2) +
+                       cos(radians(%(lat)s)) * cos(radians(latitude)) *
+                       power(sin(radians(longitude - %(lon)s) / 2), 2)
+                   ))) AS distance_m
+            FROM bird_observations
+            WHERE {" AND ".join(conditions)}
+        ) nearby
+        WHERE distance_m <= %(radius)s
+        ORDER BY distance_m ASC
+        LIMIT %(limit)s
+    """, params
+
+
+@app.get("/observations/nearby")
+def get_nearby_observations(
+    request: Request,
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the search centre"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the search centre"),
+    radius: float = Query(50, gt=0, le=MAX_NEARBY_RADIUS_M, description="Search radius in metres"),
+    limit: int = Query(500, ge=1, le=5000, description="Maximum number of observations"),
+    filters: dict = Depends(observation_filters)
+):
+    """Fetch observations within ``radius`` metres of a point, nearest first.
+
+    The bounding box, two where the circle crosses the antimeridian, is answered
+    by the GiST index on point(longitude, latitude); the haversine distance then
+    drops the corners outside the circle.
+    """
     try:
-        conn = get_db_connection()
+        with get_db_connection(read_only=True) as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute(*nearby_query(lat, lon, radius, limit, filters))
+            observations = cursor.fetchall()
+            cursor.close()
+
+        logger.info(f"Returning {len(observations)} observations within {radius}m of ({lat}, {lon})")
+        response.headers["Vary"] = "Accept"
+        if _wants_columnar(request):
+            return _columnar_response(observations, columnar_format.OBSERVATION_SCHEMA + [("distance_m", "float64")])
+        return {"observations": observations, "count": len(observations)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching nearby observations: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+# Tile levels kept in observation_clusters; must match the trigger in migration 0002
+CLUSTER_ZOOM_LEVELS = tuple(range(2, 17, 2))
+CLUSTER_LEVEL_OFFSET = 2  # a cluster cell is a quarter of a map tile wide
+MAX_CLUSTER_CELLS = int(os.getenv("MAX_CLUSTER_CELLS", 1024))
+CLUSTER_TOP_SPECIES = 5
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def _cell_x(lon, level):
+    """Slippy map tile column of ``lon``, the same formula as observation_cell_x()."""
+    n = 2 ** level
+    return min(max(math.floor((lon + 180) / 360 * n), 0), n - 1)
+
+
+def _cell_y(lat, level):
+    """Slippy map tile row of ``lat``, the same formula as observation_cell_y()."""
+    n = 2 ** level
+    lat = math.radians(min(max(lat, -MAX_MERCATOR_LAT), MAX_MERCATOR_LAT))
+    y = math.floor((1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * n)
+    return min(max(y, 0), n - 1)
+
+
+def cluster_cells(min_lat, min_lon, max_lat, max_lon, zoom):
+    """Pick the precomputed level for a map ``zoom`` and the cell range covering the box.
+
+    Steps to coarser levels until the box spans at most MAX_CLUSTER_CELLS cells.
+    """
+    wanted = zoom + CLUSTER_LEVEL_OFFSET
+    levels = [level for level in CLUSTER_ZOOM_LEVELS if level <= wanted] or [CLUSTER_ZOOM_LEVELS[0]]
+    for level in reversed(levels):
+        # Tile rows grow southwards, so the north edge has the smaller row
+        x_range = (_cell_x(min_lon, level), _cell_x(max_lon, level))
+        y_range = (_cell_y(max_lat, level), _cell_y(min_lat, level))
+        cells = (x_range[1] - x_range[0] + 1) * (y_range[1] - y_range[0] + 1)
+        if cells <= MAX_CLUSTER_CELLS:
+            break
+    return level, x_range, y_range
+
+
+def cluster_query(level, x_range, y_range):
+    """(statement, params) of the cells /observations/clusters reads; see cluster_cells."""
+    return """
+        SELECT cell_x, cell_y, observation_count, latitude_sum, longitude_sum, species
+        FROM observation_clusters
+        WHERE zoom = %s AND cell_x BETWEEN %s AND %s AND cell_y BETWEEN %s AND %s
+    """, (level, *x_range, *y_range)
+
+
+def _render_clusters(level, x_range, y_range):
+    with get_db_connection(read_only=True) as conn:
         cursor = conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("SELECT common_name, scientific_name, danish_name FROM birds")
-        birds = cursor.fetchall()
+        cursor.execute(*cluster_query(level, x_range, y_range))
+        rows = cursor.fetchall()
         cursor.close()
-        conn.close()
-        return {"birds": birds}
+
+    clusters = []
+    for row in rows:
+        count = row["observation_count"]
+        species = sorted(row["species"].items(), key=lambda item: (-item[1], item[0]))
+        clusters.append({
+            "cell_x": row["cell_x"],
+            "cell_y": row["cell_y"],
+            "count": count,
+            "latitude": row["latitude_sum"] / count,
+            "longitude": row["longitude_sum"] / count,
+            "species_count": len(species),
+            "top_species": [{"scientific_name": name, "count": n} for name, n in species[:CLUSTER_TOP_SPECIES]],
+        })
+    return _json_entry({"zoom_level": level, "clusters": clusters, "count": len(clusters)})
+
+
+@app.get("/observations/clusters")
+def get_observation_clusters(
+    min_lat: float = Query(..., ge=-90, le=90, description="South edge of the visible map"),
+    min_lon: float = Query(..., ge=-180, le=180, description="West edge of the visible map"),
+    max_lat: float = Query(..., ge=-90, le=90, description="North edge of the visible map"),
+    max_lon: float = Query(..., ge=-180, le=180, description="East edge of the visible map"),
+    zoom: int = Query(..., ge=0, le=22, description="Map zoom level")
+):
+    """Aggregated observation clusters for a map viewport.
+
+    Counts, centroids and species mix per cell are kept up to date by a trigger
+    on bird_observations, so this is one primary key range scan whatever the
+    zoom. Responses are cached per cell range, which panning mostly reuses.
+    """
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="min_lat/min_lon must not exceed max_lat/max_lon")
+
+    level, x_range, y_range = cluster_cells(min_lat, min_lon, max_lat, max_lon, zoom)
+    try:
+        return _cached(("clusters", level, x_range, y_range), ("bird_observations",),
+                       lambda: _render_clusters(level, x_range, y_range))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching observation clusters: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+# Postgres assembles the whole body; no Python object per bird
+BIRDS_QUERY = """
+    SELECT json_build_object('birds', COALESCE(json_agg(b), '[]'))::text
+    FROM (SELECT common_name, scientific_name, danish_name FROM birds) b
+"""
+
+
+def _render_birds():
+    with get_db_connection(read_only=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(BIRDS_QUERY)
+        body = cursor.fetchone()[0]
+        cursor.close()
+    return body.encode(), "application/json", {}
+
+
+@app.get("/birds")
+def get_birds():
+    try:
+        return _cached(("birds",), ("birds",), _render_birds)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching birds: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
-@app.get("/birdsound")
-def get_bird_sound(scientific_name: str):
-    params = {"query": scientific_name}
-    response = requests.get(XENO_CANTO_API, params=params)
+def _render_sound_manifest(directories):
+    with get_db_connection(read_only=True) as conn:
+        cursor = conn.cursor()
+        # Assembled in Postgres like /birds
+        cursor.execute("""
+            SELECT json_build_object('directories', COALESCE(json_object_agg(sound_directory, files), '{}'))::text
+            FROM (
+                SELECT sound_directory, json_agg(json_build_object(
+                    'name', name, 'url', url, 'size', size_bytes,
+                    'duration', duration_seconds, 'sha256', content_sha256
+                ) ORDER BY name) AS files
+                FROM sound_files
+                WHERE %(everything)s OR sound_directory = ANY(%(directories)s)
+                GROUP BY sound_directory
+            ) d
+        """, {"everything": directories is None, "directories": directories or []})
+        body = cursor.fetchone()[0].encode()
+        cursor.close()
+    # Cached with the body, so a revalidation costs no query
+    return body, "application/json", {"ETag": f'"{hashlib.sha1(body).hexdigest()}"'}
 
-    if response.status_code != 200:
-        return {"error": "Failed to fetch recordings"}
 
-    data = response.json()
-    recordings = data.get("recordings", [])
+@app.get("/sounds/manifest")
+def get_sound_manifest(
+    request: Request,
+    directory: Optional[List[str]] = Query(None, description="sound_directory values to include; all when omitted")
+):
+    """The sound files in each sound_directory, with size in bytes, duration in seconds and SHA-256.
 
-    if not recordings:
-        return {"error": "No recordings found"}
+    Clients look up an observation's sound_directory here instead of listing
+    the storage container. Send the ETag back in If-None-Match to get a
+    bodiless 304 while the manifest is unchanged.
+    """
+    directories = sorted({d.rstrip("/") for d in directory}) if directory else None
+    try:
+        response = _cached(("sound_manifest", tuple(directories) if directories else None), ("sound_files",),
+                           lambda: _render_sound_manifest(directories))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching sound manifest: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+    etag = response.headers["etag"]
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return response
+
+async def fetch_high_quality_recordings(scientific_name):
+    """Query Xeno-canto and keep only what /birdsound needs from the answer."""
+    params = {"query": scientific_name}
+    data = await upstream.get_json(XENO_CANTO_API, params=params)
+    recordings = data.get("recordings", [])
 
     # Filter by quality (q:A is the best)
-    high_quality = [rec for rec in recordings if rec.get("q") in ["A", "B"]]
+    high_quality = [rec["id"] for rec in recordings if rec.get("q") in ["A", "B"]]
+    return {"found": bool(recordings), "high_quality_ids": high_quality}
 
-    if not high_quality:
+# Filtered recording lists per species; see recording_cache.py
+recording_cache = RecordingCache(
+    fetch=fetch_high_quality_recordings,
+    ttl=float(os.getenv("XENO_CANTO_CACHE_TTL_HOURS", 6)) * 3600,
+    max_entries=int(os.getenv("XENO_CANTO_CACHE_MAX_SPECIES", 2000))
+)
+
+@app.get("/birdsound")
+async def get_bird_sound(scientific_name: str):
+    try:
+        recordings = await recording_cache.get(scientific_name)
+    except UpstreamError:
+        return {"error": "Failed to fetch recordings"}
+
+    if not recordings["found"]:
+        return {"error": "No recordings found"}
+
+    if not recordings["high_quality_ids"]:
         return {"error": "No high-quality recordings available"}
 
     # Pick a random high-quality recording
-    selected = random.choice(high_quality)
-    sound_url = f"https://www.xeno-canto.org/{selected['id']}/download"
+    selected = random.choice(recordings["high_quality_ids"])
+    sound_url = f"https://www.xeno-canto.org/{selected}/download"
 
     return sound_url
 
+# Built from the birds table at startup and rebuilt every BIRD_SEARCH_REFRESH_SECONDS
+bird_search_index = None
+_bird_search_index_lock = threading.Lock()
+BIRD_SEARCH_REFRESH_SECONDS = float(os.getenv("BIRD_SEARCH_REFRESH_SECONDS", 300))
+
+def refresh_bird_search_index(read_only=True):
+    """Rebuild the bird search index from the birds table."""
+    global bird_search_index
+    with get_db_connection(read_only=read_only) as conn:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute("SELECT common_name, scientific_name, danish_name FROM birds")
+        birds = cursor.fetchall()
+        cursor.close()
+    bird_search_index = BirdSearchIndex(birds)
+    logger.info(f"Bird search index built with {len(birds)} birds")
+    return bird_search_index
+
+def get_bird_search_index():
+    """Return the search index, building it first if startup hasn't yet."""
+    if bird_search_index is not None:
+        return bird_search_index
+    with _bird_search_index_lock:
+        return bird_search_index or refresh_bird_search_index()
+
+_bird_search_refresh_pending = threading.Event()
+
+def _rebuild_bird_search_index():
+    # Changes notified from here on start another rebuild
+    _bird_search_refresh_pending.clear()
+    try:
+        # One rebuild at a time, so an older read can't replace a newer index. On the
+        # primary: a replica may not have replayed the change it was notified of yet
+        with _bird_search_index_lock:
+            refresh_bird_search_index(read_only=False)
+        # Drops /search_birds responses rendered from the old index while this ran
+        response_cache.invalidate("birds")
+    except Exception as e:
+        logger.warning(f"Refreshing the bird search index failed: {str(e)}")
+
+def _on_birds_change(table):
+    # Runs on the listener's thread, which must get back to the other notifications
+    if table == "birds" and not _bird_search_refresh_pending.is_set():
+        _bird_search_refresh_pending.set()
+        threading.Thread(target=_rebuild_bird_search_index, name="bird-search-refresh", daemon=True).start()
+
+db_listener.subscribe("table_changes", _on_birds_change)
+
+async def refresh_bird_search_index_periodically():
+    # The first build is part of warm_up()
+    while True:
+        await asyncio.sleep(BIRD_SEARCH_REFRESH_SECONDS)
+        try:
+            await asyncio.to_thread(refresh_bird_search_index)
+        except Exception as e:
+            logger.warning(f"Refreshing the bird search index failed: {str(e)}")
+
 @app.get("/search_birds")
 def search_birds(query: str = Query(..., min_length=1, description="Bird search query")):
-    """Search birds by Danish name dynamically"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT common_name, scientific_name 
-            FROM birds 
-            WHERE common_name ILIKE %s
-            LIMIT 10
-        """, (f"%{query}%",))
-
-        birds = [{"common_name": row[0], "scientificName": row[1]} for row in cursor.fetchall()]
-        
-        cursor.close()
-        conn.close()
+    """Search birds by Danish, English or scientific name using the in-memory index"""
+    def render():
+        birds = [
+            {"common_name": bird["common_name"], "scientificName": bird["scientific_name"], "danish_name": bird["danish_name"]}
+            for bird in get_bird_search_index().search(query, limit=10)
+        ]
+        return _json_entry({"birds": birds})
 
-        return {"birds": birds}
+    try:
+        return _cached(("search_birds", normalize(query)), ("birds",), render)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error searching birds: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -190,9 +1390,7 @@ async def get_bird_list():
 
     try:
         danish_names = await get_danish_taxonomy()
-        response = requests.get(EBIRD_API_URL, headers=headers, params=params)
-        response.raise_for_status()
-        bird_data = response.json()
+        bird_data = await upstream.get_json(EBIRD_API_URL, headers=headers, params=params)
 
         birds = []
         for bird in bird_data:
@@ -214,11 +1412,123 @@ async def get_bird_list():
             "location": f"Coordinates: {LAT}, {LON}"
         }
 
-    except requests.exceptions.RequestException as e:
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail=f"Error fetching bird data: {str(e)}")
 
 
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", 2))
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", 30))
+
+startup = {"ready": False, "imported_in": None, "warmed_up_in": None}
+
+
+async def _warm_birds():
+    # Cache entries are only kept while the LISTEN connection is up
+    deadline = perf_counter() + WARMUP_TIMEOUT
+    while not db_listener.connected and perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+    await asyncio.to_thread(_cached, ("birds",), ("birds",), _render_birds)
+
+
+async def _warm_taxonomy():
+    await asyncio.wait_for(taxonomy.get_names(), WARMUP_TIMEOUT)
+
+
+async def warm_up():
+    """Open pool connections and prime the bird list, search index and taxonomy.
+
+    Waits for the database however long it takes. Steps after that only log
+    their failures: a missing taxonomy or a cold cache shouldn't keep the
+    instance out of rotation.
+    """
+    started = perf_counter()
+    while True:
+        try:
+            opened = await asyncio.to_thread(db_pool.warmup)
+            break
+        except Exception as e:
+            logger.warning(f"Warmup could not reach the database, retrying: {e!r}")
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+    logger.info(f"Warmup opened {opened} database connections in {perf_counter() - started:.3f}s")
+
+    steps = {
+        "search index": asyncio.to_thread(refresh_bird_search_index),
+        "bird list": _warm_birds(),
+        "taxonomy": _warm_taxonomy(),
+    }
+    results = await asyncio.gather(*steps.values(), return_exceptions=True)
+    for name, result in zip(steps, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"Warmup of the {name} failed: {result!r}")
+
+    startup["warmed_up_in"] = round(perf_counter() - started, 3)
+    startup["ready"] = True
+    logger.info(f"API ready {perf_counter() - _import_started:.3f}s after import started "
+                f"(import {startup['imported_in']}s, warmup {startup['warmed_up_in']}s)")
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint to verify that the API is running."""
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """Readiness probe: 503 until warm_up() has finished, so traffic waits for a warm instance."""
+    if not startup["ready"]:
+        response.status_code = 503
+    return {"status": "ready" if startup["ready"] else "warming up", **startup}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Request, query and upstream latency histograms in the Prometheus text format."""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/stats/pool")
+async def pool_stats():
+    """Connection pool usage (in use, idle, checkout wait times) for monitoring."""
+    return db_pool.stats()
+
+
+@app.get("/stats/replicas")
+async def replica_stats():
+    """Read replica health, staleness and how reads were routed."""
+    return db_router.stats()
+
+
+@app.get("/stats/cache")
+async def cache_stats():
+    """Response cache hit/miss/eviction counters."""
+    return response_cache.stats()
+
+
+@app.get("/stats/import")
+async def import_stats():
+    """eBird importer runs, failures and row counts."""
+    return ebird_importer.stats()
+
+
+@app.get("/stats/live")
+async def live_stats():
+    """Open /observations/live streams and how many rows were broadcast."""
+    return observation_broadcaster.stats()
+
+
+@app.get("/admin/slow_queries", dependencies=[Depends(require_admin)])
+async def slow_queries():
+    """Recent statements slower than SLOW_QUERY_MS, newest first, with sampled EXPLAIN plans."""
+    if slow_query_log is None:
+        raise HTTPException(status_code=404, detail="Slow query log is off; set SLOW_QUERY_MS")
+    return {**slow_query_log.stats(), "queries": slow_query_log.entries()}
+
+
+@app.delete("/admin/slow_queries", dependencies=[Depends(require_admin)])
+async def clear_slow_queries():
+    """Empty the slow query log."""
+    if slow_query_log is None:
+        raise HTTPException(status_code=404, detail="Slow query log is off; set SLOW_QUERY_MS")
+    slow_query_log.clear()
+    return {"status": "cleared"}
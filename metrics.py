@@ -0,0 +1,209 @@
+import re
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            position = bisect_left(self.buckets, value)
+            if position < len(self.buckets):
+                series[position] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', _number(bound))])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-2])}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Holds the metrics and renders them in the Prometheus text format.
+
+    ``gauge(name, documentation, read)`` adds a gauge whose value is read
+    from ``read()`` (a number, or a {label value: number} dict for the single
+    label ``labelname``) at scrape time, for numbers other objects already keep.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._gauges = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, documentation, read, labelname=None):
+        self._gauges.append((name, documentation, read, labelname))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, documentation, read, labelname in self._gauges:
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+            try:
+                value = read()
+            except Exception:
+                continue
+            if isinstance(value, dict):
+                for label, item in sorted(value.items()):
+                    lines.append(f"{name}{_labels((labelname,), (label,))} {_number(item)}")
+            else:
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_request_duration = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time from request to the last byte of the response.",
+    ("route", "method", "status")))
+http_response_bytes = REGISTRY.register(Counter(
+    "http_response_bytes_total", "Response body bytes sent.", ("route",)))
+db_query_duration = REGISTRY.register(Histogram(
+    "db_query_duration_seconds",
+    "Time spent executing a statement, and fetching from it on server-side cursors, by statement kind and table.",
+    ("query",)))
+db_query_rows = REGISTRY.register(Histogram(
+    "db_query_rows", "Rows returned, affected or fetched from a server-side cursor per statement.", ("query",),
+    ROW_BUCKETS))
+db_query_errors = REGISTRY.register(Counter(
+    "db_query_errors_total", "Statements that raised an error.", ("query",)))
+upstream_request_duration = REGISTRY.register(Histogram(
+    "upstream_request_duration_seconds", "Upstream API call latency.", ("host", "outcome")))
+upstream_errors = REGISTRY.register(Counter(
+    "upstream_errors_total", "Upstream API calls that failed or timed out.", ("host",)))
+
+
+_STATEMENT_TABLE = re.compile(r"\b(?:from|into|update|join|table)\s+(?:only\s+)?([a-z_][a-z0-9_.]*)", re.IGNORECASE)
+
+
+def query_name(statement):
+    """Name a statement by its verb and first table, e.g. "select bird_observations"."""
+    if isinstance(statement, bytes):
+        statement = statement.decode(errors="replace")
+    words = statement.split(None, 1)
+    verb = words[0].lower() if words else "unknown"
+    table = _STATEMENT_TABLE.search(statement)
+    return f"{verb} {table.group(1).lower()}" if table else verb
+
+
+def observe_query(statement, params, duration, rows, error):
+    """DatabasePool query observer.
+
+    Server-side cursors report once they close, so a streamed query is timed
+    over all its fetches and counted by the rows actually read; see
+    database_pool.ObservedConnection.
+    """
+    name = query_name(statement)
+    db_query_duration.observe(duration, name)
+    if error is not None:
+        db_query_errors.inc(name)
+    elif rows is not None and rows >= 0:
+        db_query_rows.observe(rows, name)
+
+
+def observe_upstream(host, duration, error):
+    """UpstreamClient request observer."""
+    upstream_request_duration.observe(duration, host, "error" if error is not None else "ok")
+    if error is not None:
+        upstream_errors.inc(host)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every request until its last body byte is sent.
+
+    Requests are labelled with the route template (/observations/nearby), not
+    the raw path, so label values stay bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = perf_counter()
+        status = 500
+        sent = 0
+
+        async def counting_send(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, counting_send)
+        finally:
+            route = scope.get("route")
+            label = route.path if route is not None else "unmatched"
+            http_request_duration.observe(perf_counter() - started, label, scope["method"], str(status))
+            http_response_bytes.inc(label, amount=sent)
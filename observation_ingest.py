@@ -0,0 +1,165 @@
+import io
+
+# Columns a client or importer supplies; id and created_at come from the database
+INGEST_COLUMNS = (
+    "bird_name", "scientific_name", "sound_directory", "latitude", "longitude",
+    "observation_date", "observation_time", "observer_id", "quantity",
+    "is_test_data", "test_batch_id", "source_id",
+)
+
+# The partitions of bird_observations by is_test_data, and the unique index each
+# has on source_id. Unique indexes must include the partition keys below them, so
+# a live observation is identified by its source_id and date
+BRANCHES = (
+    (False, "bird_observations_live", "(source_id, observation_date)"),
+    (True, "bird_observations_test", "(source_id, test_batch_id)"),
+)
+
+INSERTED = "inserted"
+UPDATED = "updated"
+DUPLICATE = "duplicate"
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+# A stored row b for the staged record s, by the key of its branch's unique index
+_SAME_SOURCE = """b.source_id = s.source_id AND b.is_test_data = COALESCE(s.is_test_data, FALSE)
+    AND (NOT b.is_test_data OR b.test_batch_id IS NOT DISTINCT FROM s.test_batch_id)"""
+
+
+def _copy_value(value):
+    """Format one value for COPY's text format."""
+    if value is None:
+        return "\\N"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _copy_buffer(records):
+    buffer = io.StringIO()
+    for position, record in enumerate(records):
+        values = [position] + [record.get(column) for column in INGEST_COLUMNS]
+        buffer.write("\t".join(_copy_value(value) for value in values))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def _on_conflict(update_existing):
+    if not update_existing:
+        return "DO NOTHING"
+    columns = [column for column in INGEST_COLUMNS if column != "source_id"]
+    # Rows that would not change are left alone, so they don't show up as edits in /observations/sync
+    return f"""DO UPDATE SET ({', '.join(columns)}) = ROW({', '.join(f'EXCLUDED.{c}' for c in columns)})
+            WHERE ({', '.join(f'b.{c}' for c in columns)})
+                IS DISTINCT FROM ({', '.join(f'EXCLUDED.{c}' for c in columns)})"""
+
+
+def ingest_observations(conn, records, update_existing=False):
+    """Bulk insert observation dicts, skipping ones whose source_id already exists.
+
+    Records are COPYed into a temporary staging table and moved into
+    bird_observations with INSERT ... ON CONFLICT DO NOTHING, one per branch
+    of the partitioned table the batch touches (see BRANCHES). Ids are drawn
+    from the table's sequence while staging so every record can be matched to
+    its row. Returns one (id, status) pair per record, in order; a duplicate
+    gets the id of the row that already holds its source_id.
+    With ``update_existing`` such rows are overwritten instead when any column
+    differs, and reported as updated. The caller commits.
+    """
+    if not records:
+        return []
+
+    cursor = conn.cursor()
+    try:
+        # Lives as long as the pooled connection; emptied by every commit
+        cursor.execute("""
+            CREATE TEMPORARY TABLE IF NOT EXISTS observation_staging (
+                position INTEGER NOT NULL,
+                bird_name TEXT,
+                scientific_name TEXT,
+                sound_directory TEXT,
+                latitude DECIMAL(10, 7),
+                longitude DECIMAL(10, 7),
+                observation_date DATE,
+                observation_time TIME,
+                observer_id INTEGER,
+                quantity INTEGER,
+                is_test_data BOOLEAN,
+                test_batch_id TEXT,
+                source_id TEXT,
+                id INTEGER
+            ) ON COMMIT DELETE ROWS
+        """)
+        cursor.execute("TRUNCATE observation_staging")
+        cursor.copy_expert(
+            f"COPY observation_staging (position, {', '.join(INGEST_COLUMNS)}) FROM STDIN",
+            _copy_buffer(records)
+        )
+        if update_existing:
+            # An edit that changes an observation's date moves it to another
+            # partition: the old row goes and the record is inserted again
+            cursor.execute("""
+                DELETE FROM bird_observations b
+                USING observation_staging s
+                WHERE b.source_id = s.source_id AND NOT b.is_test_data AND NOT COALESCE(s.is_test_data, FALSE)
+                    AND b.observation_date <> s.observation_date
+            """)
+        # Only the first record of a source_id (and test batch) repeated within the batch gets a row,
+        # and without update_existing none whose source_id is stored under another date
+        cursor.execute(f"""
+            UPDATE observation_staging s
+            SET id = nextval(pg_get_serial_sequence('bird_observations', 'id'))
+            FROM (
+                SELECT position, row_number() OVER (
+                    PARTITION BY source_id, COALESCE(is_test_data, FALSE),
+                                 CASE WHEN is_test_data THEN test_batch_id END
+                    ORDER BY position
+                ) AS occurrence
+                FROM observation_staging
+            ) ranked
+            WHERE ranked.position = s.position AND (s.source_id IS NULL OR ranked.occurrence = 1)
+                {'' if update_existing else f'AND NOT EXISTS (SELECT 1 FROM bird_observations b WHERE {_SAME_SOURCE})'}
+            RETURNING COALESCE(s.is_test_data, FALSE)
+        """)
+        staged_branches = {row[0] for row in cursor.fetchall()}
+        written = set()
+        for is_test_data, table, unique_columns in BRANCHES:
+            if is_test_data not in staged_branches:
+                continue
+            cursor.execute(f"""
+                INSERT INTO {table} AS b (id, {', '.join(INGEST_COLUMNS)})
+                SELECT id, {', '.join(c if c != 'is_test_data' else 'COALESCE(is_test_data, FALSE)'
+                                      for c in INGEST_COLUMNS)}
+                FROM observation_staging
+                WHERE id IS NOT NULL AND COALESCE(is_test_data, FALSE) = %s
+                ORDER BY position
+                ON CONFLICT {unique_columns} {_on_conflict(update_existing)}
+                RETURNING id
+            """, (is_test_data,))
+            written.update(row[0] for row in cursor.fetchall())
+        # Look under the record's own date first, which only probes one month's partition
+        cursor.execute(f"""
+            SELECT s.id, COALESCE(
+                (SELECT min(b.id) FROM bird_observations b
+                 WHERE {_SAME_SOURCE} AND b.observation_date = s.observation_date),
+                (SELECT min(b.id) FROM bird_observations b WHERE {_SAME_SOURCE})
+            )
+            FROM observation_staging s
+            ORDER BY s.position
+        """)
+        rows = cursor.fetchall()
+        # Ids written that weren't drawn while staging belong to overwritten rows
+        updated = written - {staged_id for staged_id, _ in rows}
+        results = []
+        for staged_id, existing_id in rows:
+            if staged_id in written:
+                results.append((staged_id, INSERTED))
+            elif existing_id in updated:
+                updated.discard(existing_id)
+                results.append((existing_id, UPDATED))
+            else:
+                results.append((existing_id, DUPLICATE))
+        return results
+    finally:
+        cursor.close()
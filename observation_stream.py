@@ -0,0 +1,115 @@
+import json
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One live stream client: its filters and a bounded queue of (row, payload) events."""
+
+    def __init__(self, bbox=None, scientific_name=None, max_queue=1000):
+        self.bbox = bbox  # (min_lat, min_lon, max_lat, max_lon)
+        self.scientific_name = scientific_name
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False  # set when events were dropped; the client has to resume
+
+    def matches(self, row):
+        if self.scientific_name and row.get("scientific_name") != self.scientific_name:
+            return False
+        if self.bbox:
+            min_lat, min_lon, max_lat, max_lon = self.bbox
+            try:
+                latitude, longitude = float(row["latitude"]), float(row["longitude"])
+            except (KeyError, TypeError, ValueError):
+                return False
+            return min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon
+        return True
+
+    def close(self):
+        self.closed = True
+        # Wake the stream so it notices
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class ObservationBroadcaster:
+    """Fans rows from the observation_inserts NOTIFY channel out to live stream clients.
+
+    ``publish`` is called from the DatabaseListener thread; each payload is
+    parsed once and handed to the event loop, which queues it for every
+    matching subscriber. A subscriber that falls ``max_queue`` events behind,
+    or all of them when the LISTEN connection drops, is closed so the client
+    reconnects and catches up from its last event id instead of silently
+    missing rows.
+    """
+
+    def __init__(self, max_subscribers=1000, max_queue=1000):
+        self.max_subscribers = max_subscribers
+        self.max_queue = max_queue
+        self._loop = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def bind(self, loop):
+        self._loop = loop
+
+    def subscribe(self, bbox=None, scientific_name=None):
+        """Register a subscriber, or return None when the limit is reached."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscription = Subscription(bbox, scientific_name, self.max_queue)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, payload):
+        try:
+            row = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed observation notification: {payload[:200]!r}")
+            return
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._fan_out, row, payload)
+
+    def _fan_out(self, row, payload):
+        self.published += 1
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if subscription.closed or not subscription.matches(row):
+                continue
+            try:
+                subscription.queue.put_nowait((row, payload))
+            except asyncio.QueueFull:
+                self.dropped_subscribers += 1
+                subscription.close()
+
+    def disconnect_all(self):
+        """Close every subscriber; called when notifications may have been missed."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._close_all)
+
+    def _close_all(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if not subscription.closed:
+                subscription.close()
+
+    def stats(self):
+        with self._lock:
+            subscribers = len(self._subscribers)
+        return {
+            "subscribers": subscribers,
+            "published": self.published,
+            "dropped_subscribers": self.dropped_subscribers,
+        }
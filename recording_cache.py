@@ -0,0 +1,64 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class RecordingCache:
+    """Per-species cache of Xeno-canto recording lists.
+
+    Concurrent misses for the same species share one upstream request. Once an
+    entry is older than ``ttl`` seconds it is still returned immediately while
+    a background request refreshes it. At most ``max_entries`` species are
+    kept, least recently used first out.
+    """
+
+    def __init__(self, fetch, ttl, max_entries=2000):
+        self._fetch = fetch  # async callable(scientific_name) -> cached value
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, fetched_at)
+        self._inflight = {}  # key -> Future of a running fetch
+
+    @staticmethod
+    def _key(scientific_name):
+        return " ".join(scientific_name.lower().split())
+
+    async def _load(self, key):
+        value = await self._fetch(key)
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def _finish(self, key, future):
+        self._inflight.pop(key, None)
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"Refreshing recordings for {key} failed: {future.exception()!r}")
+
+    def _start_load(self, key):
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._load(key))
+            future.add_done_callback(lambda f: self._finish(key, f))
+            self._inflight[key] = future
+        return future
+
+    async def get(self, scientific_name):
+        key = self._key(scientific_name)
+        entry = self._entries.get(key)
+        if entry is None:
+            return await asyncio.shield(self._start_load(key))
+
+        value, fetched_at = entry
+        self._entries.move_to_end(key)
+        if time.monotonic() - fetched_at > self.ttl:
+            # Serve the stale copy now and refresh behind it
+            self._start_load(key)
+        return value
+
+    def stats(self):
+        return {"species": len(self._entries), "refreshing": len(self._inflight)}
@@ -0,0 +1,217 @@
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+
+def parse_lsn(lsn):
+    """Turn a WAL position like '16/B374D848' into an integer that orders the same way."""
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+class _Replica:
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.healthy = False
+        self.error = None
+        self.checked_at = None
+        # Monotonic time of the newest primary WAL sample this replica had replayed
+        self.caught_up_at = None
+        self.behind_bytes = None
+        # The newest data it held at the last check, for sync tokens
+        self.max_created_at = None
+        self.max_change_id = None
+        self.reads = 0
+        self.conn = None
+
+    def staleness(self, now):
+        """Upper bound on how far, in seconds, this replica's data trails the primary."""
+        return None if self.caught_up_at is None else now - self.caught_up_at
+
+    def holds(self, created_at, change_id):
+        """Whether the replica had everything up to a sync position at its last check."""
+        if created_at is not None and (self.max_created_at is None or created_at > self.max_created_at):
+            return False
+        return change_id is None or (self.max_change_id is not None and change_id <= self.max_change_id)
+
+
+class ReplicaRouter:
+    """Sends read-only work to replicas round-robin and everything else to the primary.
+
+    ``primary`` and every value of ``replicas`` (name -> pool) is a DatabasePool;
+    replicas must be streaming standbys of the primary. A background thread
+    samples the primary's WAL position every ``check_interval`` seconds and asks
+    each replica how far it has replayed: a replica is as fresh as the newest
+    sample it has reached, which bounds its lag even when the primary is idle.
+
+    A read skips replicas that failed their last check, trail by more than
+    ``max_lag`` seconds, or lacked the sync position the caller needs at their
+    last check, and goes to the primary when none is left. Connections handed
+    out carry ``staleness``: how many seconds of the primary's writes they may
+    be missing (0 on the primary).
+    """
+
+    def __init__(self, primary, replicas, max_lag=10.0, check_interval=2.0):
+        self.primary = primary
+        self.replicas = [_Replica(name, pool) for name, pool in replicas.items()]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        # Enough primary samples to measure lags up to max_lag
+        self._samples = deque(maxlen=int(max_lag / check_interval) + 2)  # (monotonic time, lsn)
+        self._primary_conn = None
+        self._lock = threading.Lock()
+        self._next = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.primary_reads = 0
+        self.fallbacks = 0
+
+    def choose(self, after=None):
+        """Pick a replica for a read needing sync position ``after`` (created_at, change_id), or None."""
+        created_at, change_id = after or (None, None)
+        with self._lock:
+            now = time.monotonic()
+            for offset in range(len(self.replicas)):
+                replica = self.replicas[(self._next + offset) % len(self.replicas)]
+                staleness = replica.staleness(now)
+                if replica.healthy and staleness is not None and staleness <= self.max_lag \
+                        and replica.holds(created_at, change_id):
+                    self._next = (self._next + offset + 1) % len(self.replicas)
+                    replica.reads += 1
+                    return replica
+            self.primary_reads += 1
+            if self.replicas:
+                self.fallbacks += 1
+            return None
+
+    @contextmanager
+    def connection(self, read_only=False, after=None):
+        """Check out a connection like DatabasePool.connection, from a replica when ``read_only`` allows."""
+        replica = self.choose(after) if read_only and self.replicas else None
+        with ExitStack() as stack:
+            conn = None
+            if replica is not None:
+                try:
+                    conn = stack.enter_context(replica.pool.connection())
+                    conn.staleness = replica.staleness(time.monotonic())
+                except psycopg2.OperationalError as e:
+                    logger.warning(f"Replica {replica.name} unreachable, reading from the primary: {e!r}")
+                    self._take_out(replica, e)
+                    with self._lock:
+                        self.fallbacks += 1
+                    replica = None
+            if conn is None:
+                conn = stack.enter_context(self.primary.connection())
+                conn.staleness = 0.0
+            try:
+                yield conn
+            except psycopg2.OperationalError as e:
+                # Went down since the last check; the next check that reaches it puts it back
+                if replica is not None:
+                    self._take_out(replica, e)
+                raise
+
+    def _take_out(self, replica, error):
+        with self._lock:
+            replica.healthy = False
+            replica.error = repr(error)
+
+    def _query(self, conn, connect_kwargs, statement):
+        # The checks keep their own connections, so a busy pool can't fail them
+        if conn is None or conn.closed:
+            conn = psycopg2.connect(**connect_kwargs)
+            conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(statement)
+            return conn, cursor.fetchone()
+
+    def check(self):
+        """Sample the primary's WAL position and refresh every replica's state once."""
+        try:
+            self._primary_conn, (lsn,) = self._query(
+                self._primary_conn, self.primary.connect_kwargs, "SELECT pg_current_wal_lsn()::text")
+            self._samples.append((time.monotonic(), parse_lsn(lsn)))
+        except psycopg2.Error as e:
+            # Without a sample the replicas' freshness just ages until the primary is back
+            logger.warning(f"Replica check could not reach the primary: {e!r}")
+            self._primary_conn = None
+        for replica in self.replicas:
+            try:
+                replica.conn, (in_recovery, replayed, max_created_at, max_change_id) = self._query(
+                    replica.conn, replica.pool.connect_kwargs, """
+                    SELECT pg_is_in_recovery(), pg_last_wal_replay_lsn()::text,
+                           (SELECT max(created_at) FROM bird_observations),
+                           (SELECT COALESCE(max(change_id), 0) FROM observation_changes)
+                """)
+                if not in_recovery or replayed is None:
+                    raise RuntimeError("not a streaming standby, so its lag can't be measured")
+                replayed = parse_lsn(replayed)
+                reached = [at for at, lsn in self._samples if lsn <= replayed]
+                with self._lock:
+                    if reached:
+                        replica.caught_up_at = max(reached[-1], replica.caught_up_at or reached[-1])
+                    if self._samples:
+                        replica.behind_bytes = max(0, self._samples[-1][1] - replayed)
+                    replica.max_created_at = max_created_at
+                    replica.max_change_id = max_change_id
+                    replica.healthy = True
+                    replica.error = None
+            except Exception as e:
+                if replica.healthy:
+                    logger.warning(f"Replica {replica.name} taken out of rotation: {e!r}")
+                with self._lock:
+                    replica.healthy = False
+                    replica.error = repr(e)
+                if replica.conn is not None and not replica.conn.closed:
+                    replica.conn.close()
+                replica.conn = None
+            replica.checked_at = time.monotonic()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Replica check failed: {e!r}")
+            self._stop.wait(self.check_interval)
+        for conn in [self._primary_conn] + [replica.conn for replica in self.replicas]:
+            if conn is not None and not conn.closed:
+                conn.close()
+
+    def start(self):
+        if self.replicas and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="replica-check", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        if self._thread is not None:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+            thread.join(timeout)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "max_lag_seconds": self.max_lag,
+                "primary_reads": self.primary_reads,
+                "fallbacks": self.fallbacks,
+                "replicas": [{
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "staleness_seconds": None if replica.caught_up_at is None
+                    else round(replica.staleness(now), 3),
+                    "behind_bytes": replica.behind_bytes,
+                    "reads": replica.reads,
+                    "checked_seconds_ago": None if replica.checked_at is None else round(now - replica.checked_at, 3),
+                    "error": replica.error,
+                } for replica in self.replicas],
+            }
@@ -0,0 +1,111 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of rendered responses, invalidated per table.
+
+    Every entry is tagged with the tables it was read from. ``invalidate(tag)``
+    drops those entries and bumps the tag's generation, so a response computed
+    from a read that raced the write (``begin()`` before, ``put()`` after) is
+    not stored. The cache only answers while enabled, which main.py ties to the
+    LISTEN connection being up.
+
+    A response read from a replica may predate the write that last invalidated
+    its tags; ``put(..., as_of=...)`` says how current the read was, and older
+    ones are served but not stored.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, size, tags)
+        self._generations = {}
+        self._invalidated_at = {}  # tag -> monotonic time
+        self._cleared_at = time.monotonic()
+        self._epoch = 0  # bumped when everything is dropped at once
+        self._bytes = 0
+        self._enabled = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def set_enabled(self, enabled):
+        with self._lock:
+            self._enabled = enabled
+            if not enabled:
+                self._clear()
+
+    def begin(self, tags):
+        """Snapshot the generations of ``tags`` before reading from the database."""
+        with self._lock:
+            since = max([self._cleared_at] + [self._invalidated_at.get(tag, 0.0) for tag in tags])
+            return self._epoch, tuple((tag, self._generations.get(tag, 0)) for tag in tags), since
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key) if self._enabled else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, snapshot, size, as_of=None):
+        """Store ``value`` unless a tag in ``snapshot`` was invalidated meanwhile.
+
+        ``as_of`` is the monotonic time up to which the data ``value`` was read
+        from is known to contain every write; None means it is current.
+        """
+        with self._lock:
+            epoch, generations, since = snapshot
+            if not self._enabled or size > self.max_bytes // 4 or epoch != self._epoch:
+                return False
+            if as_of is not None and as_of < since:
+                return False
+            if any(self._generations.get(tag, 0) != generation for tag, generation in generations):
+                return False
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size, tuple(tag for tag, _ in generations))
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+            return True
+
+    def invalidate(self, tag):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            self._invalidated_at[tag] = time.monotonic()
+            stale = [key for key, (_, _, tags) in self._entries.items() if tag in tags]
+            for key in stale:
+                self._bytes -= self._entries.pop(key)[1]
+            self.invalidations += 1
+
+    def _clear(self):
+        self._epoch += 1
+        self._cleared_at = time.monotonic()
+        self._entries.clear()
+        self._bytes = 0
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self._enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,184 @@
+import re
+import queue
+import random
+import logging
+import threading
+from collections import deque
+from datetime import date, datetime, time
+from decimal import Decimal
+from time import monotonic
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# Quoted literals, identifiers and dollar-quoted bodies, which keep their
+# whitespace, or a run of whitespace outside them
+_TOKEN = re.compile(r"""\b[eE]'(?:[^'\\]|\\.|'')*'|'(?:[^']|'')*'|"(?:[^"]|"")*"|(\$(?:[A-Za-z_]\w*)?\$).*?\1|\s+""",
+                    re.DOTALL)
+_SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+# EXPLAIN ANALYZE runs the statement again, so only plain reads are replayed
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+MAX_PARAM_LENGTH = 100
+MAX_PARAM_ITEMS = 10
+
+
+def normalize_statement(statement):
+    """Collapse whitespace outside quotes so one query shape always reads the same."""
+    if isinstance(statement, bytes):
+        statement = statement.decode(errors="replace")
+    return _TOKEN.sub(lambda m: " " if m.group(0)[0].isspace() else m.group(0), statement).strip()
+
+
+def normalize_params(params):
+    """Make parameters JSON-friendly and short: long strings and lists are cut."""
+    if params is None or isinstance(params, (bool, int, float)):
+        return params
+    if isinstance(params, Decimal):
+        return float(params)
+    if isinstance(params, (datetime, date, time)):
+        return params.isoformat()
+    if isinstance(params, dict):
+        return {str(key): normalize_params(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        items = [normalize_params(value) for value in params[:MAX_PARAM_ITEMS]]
+        if len(params) > MAX_PARAM_ITEMS:
+            items.append(f"... {len(params)} items")
+        return items
+    text = str(params)
+    return text if len(text) <= MAX_PARAM_LENGTH else text[:MAX_PARAM_LENGTH] + "..."
+
+
+class SlowQueryLog:
+    """DatabasePool query observer that keeps the last ``capacity`` slow statements.
+
+    Statements taking ``threshold_ms`` or longer are recorded with their
+    normalised parameters. A ``sample_rate`` share of the slow SELECTs are
+    replayed with EXPLAIN (ANALYZE, BUFFERS) on a background thread with its
+    own connection, in a read-only transaction that is rolled back; each query
+    shape is explained at most once per ``explain_interval`` seconds. The plan
+    shows how the query runs at replay time, which may differ from when it was
+    slow (warmer cache, less load). Replays run on ``connect_kwargs``, the
+    primary in main.py, which can run anything its read replicas can.
+    """
+
+    def __init__(self, connect_kwargs, threshold_ms=500.0, sample_rate=0.1, capacity=200,
+                 explain_interval=60.0, explain_timeout_ms=30000):
+        self.connect_kwargs = connect_kwargs
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.explain_interval = explain_interval
+        self.explain_timeout_ms = explain_timeout_ms
+        self._entries = deque(maxlen=capacity)
+        self._last_explained = {}  # statement -> monotonic time
+        self._lock = threading.Lock()
+        self._pending = queue.Queue(maxsize=16)
+        self._thread = None
+        self._conn = None
+        self.recorded = 0
+        self.explained = 0
+        self.explain_failures = 0
+
+    def observe(self, statement, params, duration, rowcount, error, server="primary"):
+        # Runs on the request's thread after every statement, so stay cheap below the threshold
+        if duration < self.threshold or not isinstance(statement, (str, bytes)):
+            return
+        text = normalize_statement(statement)
+        entry = {
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "duration_ms": round(duration * 1000, 1),
+            "server": server,
+            "statement": text,
+            "params": normalize_params(params),
+            "rows": rowcount if rowcount is not None and rowcount >= 0 else None,
+            "error": repr(error) if error is not None else None,
+            "plan": None,
+            "seq_scans": [],
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+            explain = self._should_explain(text, error)
+        logger.warning(f"Slow query ({entry['duration_ms']} ms): {text[:200]}")
+        if explain:
+            entry["plan"] = "pending"
+            try:
+                self._pending.put_nowait((entry, statement, params))
+            except queue.Full:
+                entry["plan"] = None
+
+    def _should_explain(self, text, error):
+        if error is not None or self._thread is None or not _EXPLAINABLE.match(text):
+            return False
+        if random.random() >= self.sample_rate:
+            return False
+        now = monotonic()
+        if now - self._last_explained.get(text, float("-inf")) < self.explain_interval:
+            return False
+        self._last_explained[text] = now
+        return True
+
+    def _explain(self, statement, params):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(**self.connect_kwargs)
+        try:
+            cursor = self._conn.cursor()
+            cursor.execute("SET TRANSACTION READ ONLY")
+            cursor.execute("SET LOCAL statement_timeout = %s", (self.explain_timeout_ms,))
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + normalize_statement(statement), params)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+            cursor.close()
+            return plan
+        finally:
+            if not self._conn.closed:
+                self._conn.rollback()
+
+    def _run(self):
+        while True:
+            job = self._pending.get()
+            if job is None:
+                break
+            entry, statement, params = job
+            try:
+                plan = self._explain(statement, params)
+                self.explained += 1
+            except Exception as e:
+                self.explain_failures += 1
+                plan = f"EXPLAIN failed: {e!r}"
+                logger.warning(f"Could not explain slow query: {e!r}")
+            with self._lock:
+                entry["plan"] = plan
+                entry["seq_scans"] = sorted(set(_SEQ_SCAN.findall(plan)))
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="slow-query-explain", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        if self._thread is not None:
+            thread, self._thread = self._thread, None
+            self._pending.put(None)
+            thread.join(timeout)
+
+    def entries(self):
+        """The recorded statements, newest first."""
+        with self._lock:
+            return [dict(entry) for entry in reversed(self._entries)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "sample_rate": self.sample_rate,
+            "recorded": self.recorded,
+            "explained": self.explained,
+            "explain_failures": self.explain_failures,
+        }
@@ -0,0 +1,102 @@
+import os
+import json
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TaxonomyCache:
+    """eBird species code -> name lookup shared by the whole process.
+
+    The mapping is kept in memory and persisted to ``path`` so a restart can
+    serve lookups without the network. A background task refreshes it once it
+    is older than ``ttl`` seconds; requests only wait on a download when no
+    copy exists at all.
+    """
+
+    def __init__(self, fetch, path, ttl):
+        self._fetch = fetch  # async callable returning {species_code: name}
+        self.path = path
+        self.ttl = ttl
+        self._names = {}
+        self._updated_at = 0.0
+        self._refreshing = None
+        self._task = None
+
+    @property
+    def is_stale(self):
+        return time.time() - self._updated_at > self.ttl
+
+    def load_from_disk(self):
+        """Load the persisted copy, if any. Returns True if something was loaded."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._names = data["names"]
+            self._updated_at = data["updated_at"]
+            logger.info(f"Loaded {len(self._names)} taxonomy entries from {self.path}")
+            return True
+        except FileNotFoundError:
+            return False
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable taxonomy cache {self.path}: {e}")
+            return False
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"updated_at": self._updated_at, "names": self._names}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    async def _do_refresh(self):
+        names = await self._fetch()
+        self._names = names
+        self._updated_at = time.time()
+        try:
+            await asyncio.to_thread(self._save)
+        except OSError as e:
+            logger.warning(f"Could not persist taxonomy cache to {self.path}: {e}")
+        logger.info(f"Refreshed taxonomy cache with {len(names)} entries")
+
+    async def refresh(self):
+        """Download the taxonomy again; concurrent callers share one download."""
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._do_refresh())
+            self._refreshing.add_done_callback(lambda _: setattr(self, "_refreshing", None))
+        await asyncio.shield(self._refreshing)
+
+    async def get_names(self):
+        """Return the full mapping, downloading it only if there is no copy yet."""
+        if not self._names:
+            await self.refresh()
+        return self._names
+
+    def lookup(self, species_code, default=None):
+        return self._names.get(species_code, default)
+
+    async def _refresh_periodically(self):
+        while True:
+            if self.is_stale:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logger.warning(f"Background taxonomy refresh failed: {e}")
+            await asyncio.sleep(min(self.ttl, 3600))
+
+    def start(self):
+        """Load the persisted copy and start the background refresh loop."""
+        self.load_from_disk()
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
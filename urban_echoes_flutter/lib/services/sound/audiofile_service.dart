@@ -1,8 +1,8 @@
 import 'package:flutter/foundation.dart';
-import 'package:urban_echoes/services/storage&database/azure_storage_service.dart';
+import 'package:urban_echoes/services/sound/sound_manifest_service.dart';
 
 class AudioFileService {
-  final AzureStorageService _storageService = AzureStorageService();
+  final SoundManifestService _manifestService = SoundManifestService();
   
   // Cache for sound directories
   final Map<String, List<String>> _audioFileCache = {};
@@ -23,7 +23,7 @@ class AudioFileService {
     
     try {
       debugPrint('Fetching audio files for: $directory');
-      final files = await _storageService.listFiles(directory);
+      final files = await _manifestService.getFiles(directory);
       
       // Cache the result
       _audioFileCache[directory] = files;
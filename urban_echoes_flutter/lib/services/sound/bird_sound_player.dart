@@ -3,7 +3,7 @@ import 'dart:math';
 import 'package:audioplayers/audioplayers.dart';
 import 'package:flutter/foundation.dart';
 import 'package:urban_echoes/services/service_config.dart';
-import 'package:urban_echoes/services/storage&database/azure_storage_service.dart';
+import 'package:urban_echoes/services/sound/sound_manifest_service.dart';
 
 class BirdSoundPlayer {
   // Get config instance once
@@ -18,7 +18,7 @@ class BirdSoundPlayer {
   final Map<String, _SoundRequest> _activeRequests = {};
   
   // Services & utilities
-  final AzureStorageService _storageService = AzureStorageService();
+  final SoundManifestService _manifestService = SoundManifestService();
   final Random _random = Random();
   
   // Sound file cache
@@ -378,7 +378,7 @@ void _verifyPlayerPool() {
   Future<void> _loadSoundFiles(String folderPath) async {
     try {
       _log('📁 Fetching audio files for: $folderPath');
-      final files = await _storageService.listFiles(folderPath);
+      final files = await _manifestService.getFiles(folderPath);
       
       // Prioritize MP3 files when available
       final mp3Files = files.where((file) => 
@@ -0,0 +1,124 @@
+import 'dart:async';
+import 'dart:convert';
+import 'package:flutter/foundation.dart';
+import 'package:http/http.dart' as http;
+import 'package:shared_preferences/shared_preferences.dart';
+import 'package:urban_echoes/services/service_config.dart';
+import 'package:urban_echoes/services/storage&database/azure_storage_service.dart';
+
+/// Sound files per sound_directory, from the backend's /sounds/manifest.
+///
+/// The manifest is kept in SharedPreferences between runs, so playback doesn't
+/// wait for a container listing per species. Once there is a saved copy it is
+/// answered from straight away and revalidated with its ETag in the
+/// background; only the very first run waits for the download. Directories
+/// the manifest doesn't know yet are still listed from Azure Storage.
+class SoundManifestService {
+  static const String _manifestKey = 'sound_manifest';
+  static const String _etagKey = 'sound_manifest_etag';
+  static const Duration refreshInterval = Duration(minutes: 30);
+
+  final AzureStorageService _storageService = AzureStorageService();
+
+  Map<String, List<String>> _files = {};
+  bool _hasManifest = false;
+  bool _savedLoaded = false;
+  String? _etag;
+  DateTime? _checkedAt;
+  Future<void>? _loading;
+
+  // Singleton pattern
+  static final SoundManifestService _instance = SoundManifestService._internal();
+
+  factory SoundManifestService() {
+    return _instance;
+  }
+
+  SoundManifestService._internal();
+
+  /// URLs of the sound files in [directory].
+  Future<List<String>> getFiles(String directory) async {
+    await _loadSaved();
+    if (_hasManifest) {
+      // Answered from the saved copy; a newer manifest serves the next call
+      unawaited(_ensureFresh());
+    } else {
+      await _ensureFresh();
+    }
+    final key = directory.endsWith('/') ? directory.substring(0, directory.length - 1) : directory;
+    final files = _files[key];
+    if (files != null) {
+      return files;
+    }
+    debugPrint('$key is not in the sound manifest, listing it from storage');
+    return _storageService.listFiles(directory);
+  }
+
+  Future<void> _loadSaved() async {
+    if (_savedLoaded) {
+      return;
+    }
+    final prefs = await SharedPreferences.getInstance();
+    // Another caller may have loaded it meanwhile
+    if (_savedLoaded) {
+      return;
+    }
+    _savedLoaded = true;
+    final saved = prefs.getString(_manifestKey);
+    if (saved != null) {
+      _files = _parse(saved);
+      _etag = prefs.getString(_etagKey);
+      _hasManifest = true;
+    }
+  }
+
+  Future<void> _ensureFresh() {
+    final checkedAt = _checkedAt;
+    if (checkedAt != null && DateTime.now().difference(checkedAt) < refreshInterval) {
+      return Future.value();
+    }
+    // Concurrent callers share one request
+    return _loading ??= _refresh().whenComplete(() => _loading = null);
+  }
+
+  Future<void> _refresh() async {
+    try {
+      final config = ServiceConfig();
+      final url = Uri.parse('${config.getApiUrl(config.debugMode)}/sounds/manifest');
+      final response = await http.get(url, headers: {
+        if (_etag != null) 'If-None-Match': _etag!,
+      }).timeout(Duration(seconds: 10));
+
+      if (response.statusCode == 200) {
+        final body = utf8.decode(response.bodyBytes);
+        _files = _parse(body);
+        _hasManifest = true;
+        _etag = response.headers['etag'];
+        final prefs = await SharedPreferences.getInstance();
+        await prefs.setString(_manifestKey, body);
+        if (_etag != null) {
+          await prefs.setString(_etagKey, _etag!);
+        }
+        debugPrint('Sound manifest loaded: ${_files.length} directories');
+      } else if (response.statusCode != 304) {
+        debugPrint('Failed to fetch sound manifest: HTTP ${response.statusCode}');
+      }
+      _checkedAt = DateTime.now();
+    } catch (e) {
+      // The saved manifest, if any, is used until the next attempt
+      debugPrint('Error fetching sound manifest: $e');
+      _checkedAt = DateTime.now();
+    }
+  }
+
+  Map<String, List<String>> _parse(String body) {
+    try {
+      final directories = json.decode(body)['directories'] as Map<String, dynamic>;
+      return directories.map((directory, files) => MapEntry(
+          directory, [for (final file in files as List) file['url'] as String]));
+    } catch (e) {
+      debugPrint('Error parsing sound manifest: $e');
+      return {};
+    }
+  }
+}